@@ -41,20 +41,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'store.middleware.MetricsMiddleware',
+    'store.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.HtmlCompressionMiddleware',
+    'store.middleware.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'store.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timed for the request profiler's Server-Timing header.
+        'BACKEND': 'store.profiling.ProfiledDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],  # <--- Change this line
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,6 +87,111 @@ DATABASES = {
     }
 }
 
+# Optional read replica for catalog and analytics reads. Locally a second
+# SQLite file stands in for it: copy db.sqlite3 (re-copy after migrating) and
+# point DJANGO_REPLICA_DB at the copy. Tests mirror it onto the test database.
+if os.environ.get('DJANGO_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DJANGO_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['store.routers.PrimaryReplicaRouter']
+
+# Models whose reads may be served by the replica. Cart, checkout and order
+# models are deliberately absent so they always read from the primary.
+REPLICA_READ_MODELS = [
+    'store.product',
+    'store.storesettings',
+    'store.sitebanner',
+]
+
+# Replica lag protection: after a client writes, keep its reads on the
+# primary for this many seconds.
+REPLICA_PIN_SECONDS = int(os.environ.get('DJANGO_REPLICA_PIN_SECONDS', 5))
+
+
+# How long adding an item to the bag holds its units for that shopper.
+STOCK_RESERVATION_TTL_SECONDS = int(os.environ.get('DJANGO_STOCK_RESERVATION_TTL', 15 * 60))
+
+# Request profiling: Server-Timing headers on a sample of requests and a
+# slow-request log (logger "store.slow_requests") with the top SQL statements.
+PROFILING_ENABLED = os.environ.get('DJANGO_PROFILING', '1') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('DJANGO_PROFILING_SAMPLE_RATE', 1.0 if DEBUG else 0.05))
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('DJANGO_SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_TOP_SQL = 5
+
+# Metrics at /metrics/ in Prometheus text format, for staff or for a scraper
+# sending "Authorization: Bearer <DJANGO_METRICS_TOKEN>". With several
+# worker processes, point DJANGO_METRICS_DIR at a directory they all share
+# (emptied on restart) so a scrape reports every worker, not just one.
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get('DJANGO_METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = 5
+
+
+# Cache
+# Per-process memory by default. Set DJANGO_REDIS_URL to share one cache
+# between workers, so invalidation reaches every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['DJANGO_REDIS_URL'],
+    }
+
+# Sessions and messages
+# With a shared cache (DJANGO_REDIS_URL) sessions are read from the cache
+# and written through to the database, so browsing costs no session query.
+# A per-process cache can't do that: a logout in one worker would leave the
+# session cached and valid in the others, so without Redis sessions are
+# read from the database. Set DJANGO_SESSION_ENGINE to
+# django.contrib.sessions.backends.signed_cookies to keep no server-side
+# session state at all. Messages live in a signed cookie, so flashing one
+# never writes the session row.
+SESSION_ENGINE = os.environ.get(
+    'DJANGO_SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if os.environ.get('DJANGO_REDIS_URL')
+    else 'django.contrib.sessions.backends.db',
+)
+MESSAGE_STORAGE = os.environ.get('DJANGO_MESSAGE_STORAGE', 'django.contrib.messages.storage.cookie.CookieStorage')
+
+# JSON catalog API (/api/v1/). Serialized products are cached until the
+# product is saved or deleted.
+CATALOG_API_CACHE_SECONDS = int(os.environ.get('DJANGO_CATALOG_API_CACHE_SECONDS', 60 * 60))
+CATALOG_API_PAGE_SIZE = 24
+CATALOG_API_MAX_PAGE_SIZE = 100
+# The changes feed holds back rows this recent, so transactions that
+# stamped them have time to commit before a client's token moves past them.
+CATALOG_SYNC_SETTLE_SECONDS = int(os.environ.get('DJANGO_CATALOG_SYNC_SETTLE_SECONDS', 2))
+
+# Default lifetime of entries in the tagged cache (store/cache.py). Saves
+# and deletes retire entries early through their model tags.
+STORE_CACHE_SECONDS = int(os.environ.get('DJANGO_STORE_CACHE_SECONDS', 5 * 60))
+
+# Rendered product cards; a product's save retires its cached cards.
+PRODUCT_CARD_CACHE_SECONDS = int(os.environ.get('DJANGO_PRODUCT_CARD_CACHE_SECONDS', 60 * 60))
+
+# Live stock stream (/stream/stock/, ASGI only): most products one client may
+# watch, and how often an idle stream sends a keep-alive comment.
+STOCK_STREAM_MAX_PRODUCTS = 50
+STOCK_STREAM_HEARTBEAT_SECONDS = 15
+
+# Studio bulk actions can be undone from the dashboard for this long.
+BULK_UNDO_WINDOW_SECONDS = int(os.environ.get('DJANGO_BULK_UNDO_WINDOW_SECONDS', 10 * 60))
+
+# archive_orders moves paid orders older than this out of the hot Order tables.
+ORDER_RETENTION_DAYS = int(os.environ.get('DJANGO_ORDER_RETENTION_DAYS', 365))
+
+# Trending score: a favorite or a sale counts half as much after this many
+# hours. recompute_trending refreshes the scores; run it hourly.
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('DJANGO_TRENDING_HALF_LIFE_HOURS', 72))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -117,6 +228,25 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside DEBUG, collectstatic writes content-hashed names plus .gz/.br
+# copies (brotli if the package is installed), and StaticAssetMiddleware
+# serves them with far-future immutable cache headers.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'store.staticfiles.CompressedManifestStaticFilesStorage'
+        ),
+    },
+}
+SERVE_STATIC_ASSETS = os.environ.get('DJANGO_SERVE_STATIC', '0' if DEBUG else '1') == '1'
+# HTML responses at least this large are gzipped on the way out.
+HTML_COMPRESSION_MIN_BYTES = int(os.environ.get('DJANGO_HTML_COMPRESSION_MIN_BYTES', 1024))
 # Redirects
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'landing'
@@ -144,6 +274,13 @@ DEFAULT_FROM_EMAIL = 'Thrift Elegance <hello@thriftelegance.com>'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are served by store.media.serve_media. Set DJANGO_MEDIA_SENDFILE to
+# X-Accel-Redirect (nginx, with an internal location at the prefix below
+# aliased to MEDIA_ROOT) or X-Sendfile (Apache, lighttpd) to have the web
+# server send the bytes instead of an app worker.
+MEDIA_SENDFILE_HEADER = os.environ.get('DJANGO_MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get('DJANGO_MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_CACHE_SECONDS = int(os.environ.get('DJANGO_MEDIA_CACHE_SECONDS', 24 * 60 * 60))
 
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'landing'
@@ -1,7 +1,10 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from store.media import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -10,6 +13,8 @@ urlpatterns = [
     path('', include('store.urls')), 
 ]
 
-# This allows images to display during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Uploaded images, in development and production alike: conditional and
+# range requests, optionally handed off to the web server (see store.media).
+urlpatterns += [
+    re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', serve_media, name='media'),
+]
@@ -0,0 +1,112 @@
+// Progressive enhancement for the bag: links marked with data-cart-endpoint
+// post to the JSON cart endpoints and patch the page in place. Without
+// JavaScript, or if the request fails, the link's own href still works.
+(function () {
+  function csrfToken() {
+    const input = document.querySelector('input[name="csrfmiddlewaretoken"]');
+    return input ? input.value : '';
+  }
+
+  function money(value) {
+    return '₦' + value;
+  }
+
+  function setText(selector, text) {
+    document.querySelectorAll(selector).forEach(function (el) {
+      el.textContent = text;
+    });
+  }
+
+  function toast(message, ok) {
+    if (!message) {
+      return;
+    }
+    const el = document.createElement('div');
+    el.className = 'fixed bottom-6 left-1/2 -translate-x-1/2 z-50 px-6 py-3 rounded-full text-xs font-black uppercase tracking-widest shadow-xl ' +
+      (ok ? 'bg-gray-900 text-white' : 'bg-red-500 text-white');
+    el.textContent = message;
+    document.body.appendChild(el);
+    setTimeout(function () { el.remove(); }, 3000);
+  }
+
+  function updateItem(row, item) {
+    if (item.removed) {
+      row.remove();
+      return;
+    }
+    row.querySelectorAll('[data-cart-quantity]').forEach(function (el) {
+      el.textContent = item.quantity;
+    });
+    row.querySelectorAll('[data-cart-line-total]').forEach(function (el) {
+      el.textContent = money(item.line_total);
+    });
+    const atLimit = item.quantity >= item.max_quantity;
+    row.querySelectorAll('[data-cart-increment]').forEach(function (el) {
+      el.classList.toggle('hidden', atLimit);
+    });
+    row.querySelectorAll('[data-cart-max]').forEach(function (el) {
+      el.classList.toggle('hidden', !atLimit);
+    });
+  }
+
+  function updateTotals(cart) {
+    setText('[data-cart-lines]', cart.lines + ' Item' + (cart.lines === 1 ? '' : 's'));
+    setText('[data-cart-subtotal]', money(cart.subtotal));
+    // Coupons are applied per page load, so a changed bag drops back to the subtotal.
+    document.querySelectorAll('[data-cart-discount]').forEach(function (el) {
+      el.remove();
+    });
+    document.querySelectorAll('[data-cart-grand-total]').forEach(function (el) {
+      el.textContent = money(cart.subtotal);
+      el.dataset.amount = cart.subtotal;
+    });
+    document.querySelectorAll('[data-cart-count]').forEach(function (el) {
+      el.textContent = cart.lines;
+      el.classList.toggle('hidden', cart.lines === 0);
+    });
+  }
+
+  document.addEventListener('click', function (event) {
+    const link = event.target.closest('a[data-cart-endpoint]');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    if (link.dataset.cartBusy) {
+      return;
+    }
+    link.dataset.cartBusy = '1';
+
+    fetch(link.dataset.cartEndpoint, {
+      method: 'POST',
+      credentials: 'same-origin',
+      headers: { 'X-CSRFToken': csrfToken(), 'Accept': 'application/json' },
+    })
+      .then(function (response) {
+        const type = response.headers.get('Content-Type') || '';
+        if (response.redirected || type.indexOf('application/json') === -1) {
+          throw new Error('Not a cart response');
+        }
+        return response.json();
+      })
+      .then(function (data) {
+        const row = link.closest('[data-cart-item]');
+        if (row && data.item) {
+          updateItem(row, data.item);
+        }
+        updateTotals(data.cart);
+        if (row && data.cart.lines === 0) {
+          // Show the empty-bag state rendered by the server.
+          window.location.reload();
+          return;
+        }
+        toast(data.message, data.ok);
+      })
+      .catch(function () {
+        window.location.href = link.href;
+      })
+      .finally(function () {
+        delete link.dataset.cartBusy;
+      });
+  });
+})();
@@ -0,0 +1,61 @@
+// Studio bulk actions: before a bulk form posts, ask the server how many of
+// the ticked rows the action would change and confirm that count with the
+// owner. Without JavaScript the form simply posts, and can still be undone.
+(function () {
+  function checkboxes(formId) {
+    return document.querySelectorAll('input[data-bulk-item][form="' + formId + '"]');
+  }
+
+  document.addEventListener('change', function (event) {
+    const toggle = event.target.closest('input[data-bulk-select-all]');
+    if (!toggle) {
+      return;
+    }
+    checkboxes(toggle.dataset.bulkSelectAll).forEach(function (box) {
+      box.checked = toggle.checked;
+    });
+  });
+
+  document.addEventListener('submit', function (event) {
+    const form = event.target.closest('form[data-bulk-form]');
+    if (!form) {
+      return;
+    }
+    event.preventDefault();
+    const data = new FormData(form);
+    if (!data.getAll('ids').length) {
+      window.alert('Tick the ' + form.dataset.bulkNoun + ' to change first.');
+      return;
+    }
+    data.append('preview', '1');
+
+    fetch(form.action, {
+      method: 'POST',
+      body: data,
+      credentials: 'same-origin',
+      headers: { 'Accept': 'application/json' },
+    })
+      .then(function (response) {
+        return response.json().then(function (body) {
+          return { ok: response.ok, body: body };
+        });
+      })
+      .then(function (result) {
+        if (!result.ok) {
+          window.alert(result.body.error);
+          return;
+        }
+        const count = result.body.count;
+        if (count === 0) {
+          window.alert('None of the selected ' + form.dataset.bulkNoun + ' would change.');
+          return;
+        }
+        if (window.confirm('This will change ' + count + ' ' + form.dataset.bulkNoun + '. Continue?')) {
+          form.submit();
+        }
+      })
+      .catch(function () {
+        form.submit();
+      });
+  });
+})();
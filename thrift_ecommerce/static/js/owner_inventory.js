@@ -0,0 +1,52 @@
+// Swap the studio inventory panel in place when searching, sorting or
+// paging, instead of reloading the whole dashboard. The panel's form and
+// links are plain GET requests, so everything still works without this.
+(function () {
+  function panel() {
+    return document.querySelector('[data-inventory-panel]');
+  }
+
+  function load(params) {
+    const current = panel();
+    if (!current) {
+      return;
+    }
+    const query = params.toString();
+    fetch(current.dataset.inventoryUrl + (query ? '?' + query : ''), {
+      credentials: 'same-origin',
+      headers: { 'X-Requested-With': 'XMLHttpRequest' },
+    })
+      .then(function (response) {
+        if (!response.ok || response.redirected) {
+          throw new Error('Inventory request failed');
+        }
+        return response.text();
+      })
+      .then(function (html) {
+        current.outerHTML = html;
+        // Keep the address bar shareable and the back button meaningful.
+        history.replaceState(null, '', window.location.pathname + (query ? '?' + query : ''));
+      })
+      .catch(function () {
+        window.location.search = query;
+      });
+  }
+
+  document.addEventListener('submit', function (event) {
+    const form = event.target.closest('[data-inventory-form]');
+    if (!form) {
+      return;
+    }
+    event.preventDefault();
+    load(new URLSearchParams(new FormData(form)));
+  });
+
+  document.addEventListener('click', function (event) {
+    const link = event.target.closest('a[data-inventory-link]');
+    if (!link) {
+      return;
+    }
+    event.preventDefault();
+    load(new URL(link.href).searchParams);
+  });
+})();
@@ -0,0 +1,49 @@
+// Live stock for the products on screen. Elements marked data-stock-product
+// are updated from the server-sent events stream; the page works unchanged
+// (with stock as of page load) when EventSource or the stream isn't available.
+(function () {
+  const root = document.querySelector('[data-stock-stream]');
+  if (!root || !window.EventSource) {
+    return;
+  }
+  const ids = new Set();
+  document.querySelectorAll('[data-stock-product]').forEach(function (el) {
+    ids.add(el.dataset.stockProduct);
+  });
+  if (!ids.size) {
+    return;
+  }
+
+  function label(event) {
+    if (!event.is_available) {
+      return 'Sold Out';
+    }
+    return event.quantity < 3 ? 'Only ' + event.quantity + ' left' : 'In Stock';
+  }
+
+  function apply(event) {
+    document.querySelectorAll('[data-stock-product="' + event.product_id + '"]').forEach(function (el) {
+      el.querySelectorAll('[data-stock-label]').forEach(function (labelEl) {
+        labelEl.textContent = label(event);
+      });
+      el.querySelectorAll('[data-stock-when-available]').forEach(function (target) {
+        target.classList.toggle('hidden', !event.is_available);
+      });
+      el.querySelectorAll('[data-stock-when-sold-out]').forEach(function (target) {
+        target.classList.toggle('hidden', event.is_available);
+      });
+    });
+  }
+
+  const url = root.dataset.stockStream + '?products=' + Array.from(ids).join(',');
+  const source = new EventSource(url);
+  source.addEventListener('stock', function (message) {
+    apply(JSON.parse(message.data));
+  });
+  source.onerror = function () {
+    // A 503 (no ASGI server) or 400 closes the stream for good; don't retry.
+    if (source.readyState === EventSource.CLOSED) {
+      source.close();
+    }
+  };
+})();
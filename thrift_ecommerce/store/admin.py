@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, Product, Order, OrderItem
+from .models import User, Product, Order, OrderItem, InventoryMovement, ArchivedOrder
+from .inventory import save_product
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin): # Corrected from admin.admin.ModelAdmin
@@ -9,8 +10,13 @@ class UserAdmin(admin.ModelAdmin): # Corrected from admin.admin.ModelAdmin
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'size', 'price', 'is_available', 'created_at')
-    list_filter = ('category', 'size', 'is_available')
+    list_filter = ('category', 'size', 'is_available', 'vendor')
     search_fields = ('name', 'description')
+    readonly_fields = ('favorites_count', 'units_sold', 'trending_score')
+
+    def save_model(self, request, obj, form, change):
+        # Quantity edits here go through the ledger like the studio's.
+        save_product(obj, note=f'Edited in admin by {request.user.email}')
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -19,5 +25,29 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_id', 'user', 'total_paid', 'is_completed', 'created_at')
-    list_filter = ('is_completed', 'created_at')
-    inlines = [OrderItemInline]
\ No newline at end of file
+    search_fields = ('order_id', 'legacy_order_id')
+    list_filter = ('is_completed', 'created_at', 'vendor')
+    inlines = [OrderItemInline]
+
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'product', 'kind', 'change', 'order', 'note')
+    list_filter = ('kind', 'created_at')
+    raw_id_fields = ('product', 'order')
+
+    # The ledger is append-only: fix a mistake with another movement.
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('order_id', 'user', 'total_paid', 'created_at', 'archived_at')
+    search_fields = ('order_id', 'legacy_order_id')
+    raw_id_fields = ('user', 'vendor')
+
+    # Archived orders are a record of what happened; they aren't edited.
+    def has_change_permission(self, request, obj=None):
+        return False
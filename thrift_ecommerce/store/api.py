@@ -0,0 +1,341 @@
+"""Read-only JSON catalog API, version 1 (``/api/v1/``).
+
+Product payloads are cached per product and dropped by ``store.signals``
+whenever a product is saved or deleted, so a list request costs one query
+for the matching ids plus a cache ``get_many``.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+
+from .cache import cached, model_tag
+from .models import CATEGORY_CHOICES, SIZE_CHOICES, Product, ProductTombstone
+from .profiling import record_cache_access
+
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'original_price', 'on_sale', 'quantity',
+    'is_available', 'size', 'category', 'image', 'image_hover', 'url', 'created_at', 'updated_at',
+)
+# Stored site-relative in the cache and made absolute per request.
+URL_FIELDS = ('image', 'image_hover', 'url')
+
+FACETS_CACHE_KEY = 'api:v1:facets'
+
+# ``sort`` values for the product list: the indexed field to order by,
+# descending, and how to read its value back from a cursor.
+PRODUCT_SORTS = {
+    'newest': ('created_at', datetime.fromisoformat),
+    'trending': ('trending_score', float),
+    'most_wanted': ('favorites_count', int),
+    'best_selling': ('units_sold', int),
+}
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """GET-only JSON view that turns ``ApiError`` into an error payload."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as exc:
+            return JsonResponse({'error': str(exc)}, status=exc.status)
+    return wrapper
+
+
+def product_cache_key(product_id):
+    return f'api:v1:product:{product_id}'
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': str(product.price),
+        'original_price': str(product.original_price) if product.original_price is not None else None,
+        'on_sale': product.on_sale,
+        'quantity': product.quantity,
+        'is_available': product.is_available,
+        'size': product.size,
+        'category': product.category,
+        'image': product.image.url if product.image else None,
+        'image_hover': product.image_hover.url if product.image_hover else None,
+        'url': reverse('product_detail', args=[product.id]),
+        'created_at': product.created_at.isoformat(),
+        'updated_at': product.updated_at.isoformat(),
+    }
+
+
+def cached_product_payloads(product_ids):
+    """Serialized products for ``product_ids`` in the same order, skipping missing ones."""
+    keys = {pk: product_cache_key(pk) for pk in product_ids}
+    cached = cache.get_many(keys.values())
+    payloads = {}
+    missing = []
+    for pk, key in keys.items():
+        hit = key in cached
+        record_cache_access(hit)
+        if hit:
+            payloads[pk] = cached[key]
+        else:
+            missing.append(pk)
+
+    if missing:
+        fresh = {product.id: serialize_product(product) for product in Product.objects.filter(pk__in=missing)}
+        cache.set_many(
+            {keys[pk]: payload for pk, payload in fresh.items()},
+            settings.CATALOG_API_CACHE_SECONDS,
+        )
+        payloads.update(fresh)
+    return [payloads[pk] for pk in product_ids if pk in payloads]
+
+
+def requested_fields(request):
+    raw = request.GET.get('fields')
+    if not raw:
+        return PRODUCT_FIELDS
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = sorted(set(fields) - set(PRODUCT_FIELDS))
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}")
+    # ``id`` always comes back so clients can key what they receive.
+    return ['id'] + [name for name in fields if name != 'id']
+
+
+def shape(request, payload, fields):
+    data = {}
+    for name in fields:
+        value = payload[name]
+        if name in URL_FIELDS and value:
+            value = request.build_absolute_uri(value)
+        data[name] = value
+    return data
+
+
+def encode_cursor(*positions):
+    """Opaque token for one or more (timestamp or number, pk) positions."""
+    raw = json.dumps([
+        [value.isoformat() if isinstance(value, datetime) else value, pk] for value, pk in positions
+    ]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, count=1, parse=datetime.fromisoformat):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        positions = [(parse(value), int(pk)) for value, pk in json.loads(raw)]
+    except (binascii.Error, ValueError, TypeError):
+        raise ApiError('Invalid cursor.')
+    if len(positions) != count:
+        raise ApiError('Invalid cursor.')
+    return positions
+
+
+def parse_choice(request, name, choices):
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    codes = [code for code, label in choices]
+    if value not in codes:
+        raise ApiError(f"Unknown {name} '{value}'. Expected one of: {', '.join(codes)}")
+    return value
+
+
+def parse_decimal(request, name):
+    value = request.GET.get(name)
+    if value is None:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ApiError(f"'{name}' must be a number.")
+
+
+def parse_limit(request):
+    value = request.GET.get('limit')
+    if value is None:
+        return settings.CATALOG_API_PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ApiError("'limit' must be a whole number.")
+    return max(1, min(limit, settings.CATALOG_API_MAX_PAGE_SIZE))
+
+
+def filtered_products(request):
+    products = Product.objects.all()
+
+    available = request.GET.get('available', 'true')
+    if available not in ('true', 'false', 'all'):
+        raise ApiError("'available' must be true, false or all.")
+    if available != 'all':
+        products = products.filter(is_available=available == 'true')
+
+    category = parse_choice(request, 'category', CATEGORY_CHOICES)
+    if category:
+        products = products.filter(category=category)
+    size = parse_choice(request, 'size', SIZE_CHOICES)
+    if size:
+        products = products.filter(size=size)
+    min_price = parse_decimal(request, 'min_price')
+    if min_price is not None:
+        products = products.filter(price__gte=min_price)
+    max_price = parse_decimal(request, 'max_price')
+    if max_price is not None:
+        products = products.filter(price__lte=max_price)
+    query = (request.GET.get('q') or '').strip()
+    if query:
+        products = products.filter(name__icontains=query)
+    return products
+
+
+@api_view
+def product_list(request):
+    """Newest products first, paged with an opaque ``cursor``.
+
+    Filters: ``category``, ``size``, ``min_price``, ``max_price``, ``q`` and
+    ``available`` (true, false or all; defaults to true). ``sort`` may be
+    newest, trending, most_wanted or best_selling. ``fields`` picks a
+    comma-separated subset of the product fields and ``limit`` sets the page size.
+    """
+    fields = requested_fields(request)
+    limit = parse_limit(request)
+    products = filtered_products(request)
+    sort = request.GET.get('sort', 'newest')
+    if sort not in PRODUCT_SORTS:
+        raise ApiError(f"Unknown sort '{sort}'. Expected one of: {', '.join(PRODUCT_SORTS)}")
+    field, parse = PRODUCT_SORTS[sort]
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        (value, pk), = decode_cursor(cursor, parse=parse)
+        products = products.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+
+    # Only the keys come from the database; the payloads come from the cache.
+    rows = list(products.order_by(f'-{field}', '-pk').values_list('pk', field)[:limit + 1])
+    page, more = rows[:limit], len(rows) > limit
+
+    next_cursor = encode_cursor((page[-1][1], page[-1][0])) if more else None
+    next_url = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+    payloads = cached_product_payloads([pk for pk, value in page])
+    return JsonResponse({
+        'data': [shape(request, payload, fields) for payload in payloads],
+        'next_cursor': next_cursor,
+        'next': next_url,
+    })
+
+
+@api_view
+def product_detail(request, product_id):
+    fields = requested_fields(request)
+    payloads = cached_product_payloads([product_id])
+    if not payloads:
+        raise ApiError('Product not found.', status=404)
+    return JsonResponse({'data': shape(request, payloads[0], fields)})
+
+
+def after(queryset, field, position):
+    """Rows strictly after ``position`` in (``field``, pk) order."""
+    if position is None:
+        return queryset
+    moment, pk = position
+    return queryset.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk}))
+
+
+@api_view
+def product_changes(request):
+    """Products changed and deleted since the client's ``since`` token.
+
+    Without a token every product is sent, so the first sync and later ones
+    use the same endpoint. Keep requesting with ``next_since`` while
+    ``has_more`` is true; the final token is what to send next time.
+    """
+    fields = requested_fields(request)
+    limit = parse_limit(request)
+    since = request.GET.get('since')
+    product_position, tombstone_position = decode_cursor(since, count=2) if since else (None, None)
+
+    # Leave out the last few seconds: a transaction that stamped an earlier
+    # updated_at may still be committing, and the client would skip it.
+    horizon = timezone.now() - timedelta(seconds=settings.CATALOG_SYNC_SETTLE_SECONDS)
+
+    changed = list(
+        after(Product.objects.filter(updated_at__lte=horizon), 'updated_at', product_position)
+        .order_by('updated_at', 'pk')
+        .values_list('pk', 'updated_at')[:limit + 1]
+    )
+    deleted = list(
+        after(ProductTombstone.objects.filter(deleted_at__lte=horizon), 'deleted_at', tombstone_position)
+        .order_by('deleted_at', 'pk')
+        .values_list('pk', 'product_id', 'deleted_at')[:limit + 1]
+    )
+    has_more = len(changed) > limit or len(deleted) > limit
+    changed, deleted = changed[:limit], deleted[:limit]
+
+    if changed:
+        product_position = (changed[-1][1], changed[-1][0])
+    if deleted:
+        tombstone_position = (deleted[-1][2], deleted[-1][0])
+    # A token must hold both positions, so start from the epoch when one is unknown.
+    epoch = (datetime(1970, 1, 1, tzinfo=dt_timezone.utc), 0)
+    next_since = encode_cursor(product_position or epoch, tombstone_position or epoch)
+
+    payloads = cached_product_payloads([pk for pk, updated_at in changed])
+    return JsonResponse({
+        'changed': [shape(request, payload, fields) for payload in payloads],
+        'deleted': [product_id for pk, product_id, deleted_at in deleted],
+        'next_since': next_since,
+        'has_more': has_more,
+    })
+
+
+def facet_counts():
+    """Available-product counts per category and size, cached until any product changes."""
+    def count():
+        available = Product.objects.filter(is_available=True)
+        return {
+            'category': dict(available.values_list('category').annotate(n=Count('pk')).order_by()),
+            'size': dict(available.values_list('size').annotate(n=Count('pk')).order_by()),
+        }
+    return cached(FACETS_CACHE_KEY, count, settings.CATALOG_API_CACHE_SECONDS, tags=[model_tag(Product)])
+
+
+@api_view
+def category_list(request):
+    counts = facet_counts()['category']
+    return JsonResponse({'data': [
+        {'code': code, 'label': label, 'available_products': counts.get(code, 0)}
+        for code, label in CATEGORY_CHOICES
+    ]})
+
+
+@api_view
+def size_list(request):
+    counts = facet_counts()['size']
+    return JsonResponse({'data': [
+        {'code': code, 'label': label, 'available_products': counts.get(code, 0)}
+        for code, label in SIZE_CHOICES
+    ]})
@@ -0,0 +1,103 @@
+"""Moving old paid orders out of the hot ``Order`` tables.
+
+``archive_orders`` copies paid orders older than the retention window,
+with their items, into ``ArchivedOrder`` and ``ArchivedOrderItem`` under
+the same ids, adds them to the monthly ``SalesRollup`` and deletes the
+originals, one chunk per transaction. Studio analytics add the rollups to
+what they count in ``Order``, and a shopper's history and invoices read the
+archive once an order has left the hot table, so archiving changes no
+figure anyone sees while ``Order`` only grows with the retention window.
+"""
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, SalesRollup
+
+LINE_TOTAL = ExpressionWrapper(F('price') * F('quantity'), output_field=DecimalField(max_digits=14, decimal_places=2))
+ARCHIVED_FIELDS = (
+    'user_id', 'created_at', 'total_paid', 'order_id', 'legacy_order_id', 'is_completed', 'payment_date',
+    'fulfillment_method', 'logistics_note', 'receipt_channel_used', 'pre_purchase_instruction_snapshot', 'vendor_id',
+)
+
+
+def archived_sales(orders, items):
+    """``(month, vendor_id, orders, total)`` rows for archived ``orders`` and their ``items``.
+
+    A row without a vendor holds the platform's figures for the month; a
+    vendor's row counts the orders it had lines in and what those lines
+    came to, so a cart that mixed vendors counts towards each of them.
+    """
+    platform = (
+        orders.annotate(month=TruncMonth('created_at', tzinfo=dt_timezone.utc)).values('month')
+        .annotate(orders=Count('pk'), total=Sum('total_paid')).order_by()
+    )
+    for row in platform:
+        yield row['month'].date(), None, row['orders'], row['total']
+    vendors = (
+        items.filter(product__vendor__isnull=False)
+        .annotate(month=TruncMonth('order__created_at', tzinfo=dt_timezone.utc)).values('month', 'product__vendor')
+        .annotate(orders=Count('order', distinct=True), total=Sum(LINE_TOTAL)).order_by()
+    )
+    for row in vendors:
+        yield row['month'].date(), row['product__vendor'], row['orders'], row['total']
+
+
+def add_to_rollups(order_pks):
+    """Add archived orders ``order_pks`` to the monthly rollups."""
+    rows = archived_sales(
+        ArchivedOrder.objects.filter(pk__in=order_pks), ArchivedOrderItem.objects.filter(order_id__in=order_pks)
+    )
+    for month, vendor_id, count, total in rows:
+        updated = SalesRollup.objects.filter(month=month, vendor_id=vendor_id).update(
+            orders=F('orders') + count, total_paid=F('total_paid') + total
+        )
+        if not updated:
+            SalesRollup.objects.create(month=month, vendor_id=vendor_id, orders=count, total_paid=total)
+
+
+def archive_orders(before, chunk_size=500):
+    """Archive paid orders placed before ``before``; returns how many moved.
+
+    Pending orders stay where the studio can act on them, however old.
+    """
+    archived = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            orders = list(
+                Order.objects.select_for_update()
+                .filter(is_completed=True, created_at__lt=before, pk__gt=last_pk)
+                .order_by('pk')[:chunk_size]
+            )
+            if not orders:
+                return archived
+            last_pk = orders[-1].pk
+            pks = [order.pk for order in orders]
+
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(pk=order.pk, **{field: getattr(order, field) for field in ARCHIVED_FIELDS})
+                for order in orders
+            )
+            ArchivedOrderItem.objects.bulk_create(
+                ArchivedOrderItem(pk=item.pk, order_id=item.order_id, product_id=item.product_id, price=item.price, quantity=item.quantity)
+                for item in OrderItem.objects.filter(order_id__in=pks)
+            )
+            add_to_rollups(pks)
+            # The delete signals retire the cached analytics.
+            Order.objects.filter(pk__in=pks).delete()
+            archived += len(orders)
+
+
+def find_order(user, reference):
+    """``user``'s order with this reference (a ULID or a legacy id), hot or archived, or None."""
+    for model in (Order, ArchivedOrder):
+        order = (
+            model.objects.filter(Q(order_id=reference) | Q(legacy_order_id=reference), user=user)
+            .prefetch_related('items__product').first()
+        )
+        if order is not None:
+            return order
+    return None
@@ -0,0 +1,264 @@
+"""Set-based bulk actions for the owner studio.
+
+Every action changes all the selected rows with one ``UPDATE`` (or one
+``DELETE``) inside a transaction. The columns it is about to overwrite are
+read first, under a row lock, into a ``BulkOperation``, which is what lets
+the owner undo the action for ``BULK_UNDO_WINDOW_SECONDS``.
+
+``QuerySet.update()`` skips the model signals, so the actions stamp
+``updated_at`` themselves and clear the catalog cache and model tags afterwards.
+"""
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .api import product_cache_key
+from .cache import invalidate_models, invalidate_tags, vendor_tag
+from .events import publish_stock_change
+from .models import CATEGORY_CHOICES, BulkOperation, InventoryMovement, Order, OrderItem, Product, ProductTombstone, Wishlist
+
+PRODUCT_ACTIONS = {
+    'set_price': 'Set price',
+    'adjust_price': 'Change price by %',
+    'show': 'Show in shop',
+    'hide': 'Hide from shop',
+    'set_category': 'Move to category',
+    'delete': 'Delete',
+}
+ORDER_ACTIONS = {
+    'mark_paid': 'Mark paid',
+    'mark_pending': 'Mark pending',
+}
+
+# Columns each action overwrites, i.e. what its undo has to put back.
+PRODUCT_SNAPSHOT_FIELDS = {
+    'set_price': ['price'],
+    'adjust_price': ['price'],
+    'show': ['is_available'],
+    'hide': ['is_available'],
+    'set_category': ['category'],
+}
+ORDER_SNAPSHOT_FIELDS = ['is_completed', 'payment_date']
+
+
+class BulkActionError(Exception):
+    pass
+
+
+def parse_value(action, raw):
+    """Validate the action's argument: a price, a percentage or a category code."""
+    if action not in PRODUCT_ACTIONS:
+        raise BulkActionError('Choose a bulk action.')
+    raw = (raw or '').strip()
+    if action in ('set_price', 'adjust_price'):
+        try:
+            value = Decimal(raw)
+        except InvalidOperation:
+            raise BulkActionError('Enter a number for the price change.')
+        if not value.is_finite():
+            raise BulkActionError('Enter a number for the price change.')
+        if action == 'set_price' and value < 0:
+            raise BulkActionError('Prices cannot be negative.')
+        if action == 'adjust_price' and value <= -100:
+            raise BulkActionError('A price can drop by less than 100%.')
+        return value
+    if action == 'set_category':
+        if raw not in dict(CATEGORY_CHOICES):
+            raise BulkActionError('Choose a category to move the pieces to.')
+        return raw
+    return None
+
+
+def product_targets(action, product_ids):
+    """The selected products the action would actually change."""
+    products = Product.objects.filter(pk__in=product_ids)
+    if action == 'show':
+        # Sold-out pieces stay hidden; Product.save would hide them again anyway.
+        products = products.filter(is_available=False, quantity__gt=0)
+    elif action == 'hide':
+        products = products.filter(is_available=True)
+    return products
+
+
+def order_targets(action, order_ids):
+    return Order.objects.filter(pk__in=order_ids, is_completed=action == 'mark_pending')
+
+
+def describe(action, count, value=None):
+    noun = 'piece' if count == 1 else 'pieces'
+    if action == 'set_price':
+        return f"Set the price of {count} {noun} to ₦{value}"
+    if action == 'adjust_price':
+        return f"Changed the price of {count} {noun} by {value}%"
+    if action == 'show':
+        return f"Put {count} {noun} back in the shop"
+    if action == 'hide':
+        return f"Hid {count} {noun} from the shop"
+    if action == 'set_category':
+        return f"Moved {count} {noun} to {dict(CATEGORY_CHOICES)[value]}"
+    if action == 'delete':
+        return f"Deleted {count} {noun}"
+    noun = 'order' if count == 1 else 'orders'
+    status = 'paid' if action == 'mark_paid' else 'pending'
+    return f"Marked {count} {noun} as {status}"
+
+
+def invalidate_vendors(model, pks):
+    vendor_ids = set(model.objects.filter(pk__in=pks, vendor__isnull=False).values_list('vendor', flat=True))
+    if model is Order:
+        # Orders also count in the sales of every vendor with a line in them.
+        vendor_ids.update(
+            OrderItem.objects.filter(order__in=pks, product__vendor__isnull=False).values_list('product__vendor', flat=True)
+        )
+    invalidate_tags(*(vendor_tag(vendor_id) for vendor_id in vendor_ids))
+
+
+def refresh_products(product_ids, stock_changed=False):
+    """Do for rows changed in bulk what the Product signals do for a save."""
+    cache.delete_many([product_cache_key(pk) for pk in product_ids])
+    invalidate_models(Product)
+    invalidate_vendors(Product, product_ids)
+    if stock_changed:
+        rows = Product.objects.filter(pk__in=product_ids).values_list('pk', 'quantity', 'is_available')
+        for pk, quantity, is_available in rows:
+            publish_stock_change(pk, quantity, is_available)
+
+
+def apply_product_action(user, action, product_ids, value=None):
+    """Run ``action`` over the selected products. Returns the ``BulkOperation``, or None if nothing changed."""
+    with transaction.atomic():
+        targets = product_targets(action, product_ids).select_for_update()
+        if action == 'delete':
+            rows = list(targets.values())
+            pks = [row['id'] for row in rows]
+            # Order lines and stock movements keep their history by pointing
+            # back at the product on undo. Favorites go with the product, so
+            # they are saved whole and made again.
+            snapshot = {
+                'rows': rows,
+                'order_items': list(OrderItem.objects.filter(product_id__in=pks).values_list('pk', 'product_id')),
+                'movements': list(InventoryMovement.objects.filter(product_id__in=pks).values_list('pk', 'product_id')),
+                'favorites': list(
+                    Wishlist.objects.filter(product_id__in=pks).values('user_id', 'product_id', 'added_at', 'reminder_sent_at')
+                ),
+            }
+        else:
+            rows = list(targets.values('pk', *PRODUCT_SNAPSHOT_FIELDS[action]))
+            pks = [row['pk'] for row in rows]
+            snapshot = {'rows': rows}
+        if not rows:
+            return None
+
+        changed = Product.objects.filter(pk__in=pks)
+        now = timezone.now()
+        if action == 'set_price':
+            changed.update(price=value, updated_at=now)
+        elif action == 'adjust_price':
+            factor = 1 + value / 100
+            changed.update(price=Round(F('price') * factor, 2), updated_at=now)
+        elif action == 'show':
+            changed.update(is_available=True, updated_at=now)
+        elif action == 'hide':
+            changed.update(is_available=False, updated_at=now)
+        elif action == 'set_category':
+            changed.update(category=value, updated_at=now)
+        elif action == 'delete':
+            # A real delete, so the signals record tombstones and tell open pages.
+            changed.delete()
+
+        operation = BulkOperation.objects.create(
+            user=user, target='PRODUCT', action=action, summary=describe(action, len(pks), value),
+            affected=len(pks), snapshot=snapshot,
+        )
+        if action != 'delete':
+            refresh_products(pks, stock_changed=action in ('show', 'hide'))
+    return operation
+
+
+def apply_order_action(user, action, order_ids):
+    """Mark the selected orders paid or pending. Returns the ``BulkOperation``, or None."""
+    if action not in ORDER_ACTIONS:
+        raise BulkActionError('Choose a bulk action.')
+    with transaction.atomic():
+        rows = list(order_targets(action, order_ids).select_for_update().values('pk', *ORDER_SNAPSHOT_FIELDS))
+        if not rows:
+            return None
+        pks = [row['pk'] for row in rows]
+        if action == 'mark_paid':
+            Order.objects.filter(pk__in=pks).update(is_completed=True, payment_date=timezone.now())
+        else:
+            Order.objects.filter(pk__in=pks).update(is_completed=False)
+        invalidate_models(Order)
+        invalidate_vendors(Order, pks)
+        return BulkOperation.objects.create(
+            user=user, target='ORDER', action=action, summary=describe(action, len(pks)),
+            affected=len(pks), snapshot={'rows': rows},
+        )
+
+
+def restored(model, row):
+    """Rebuild an instance from a snapshot row, turning JSON strings back into field values."""
+    values = {}
+    for name, value in row.items():
+        field = model._meta.get_field('id' if name == 'pk' else name)
+        values[field.attname] = field.to_python(value)
+    return model(**values)
+
+
+def undo_operation(operation):
+    """Put back what ``operation`` changed. Raises ``BulkActionError`` once the window has passed."""
+    with transaction.atomic():
+        operation = BulkOperation.objects.select_for_update().get(pk=operation.pk)
+        if not operation.can_undo:
+            raise BulkActionError('That change can no longer be undone.')
+
+        rows = operation.snapshot['rows']
+        now = timezone.now()
+        if operation.target == 'ORDER':
+            Order.objects.bulk_update([restored(Order, row) for row in rows], ORDER_SNAPSHOT_FIELDS)
+            invalidate_models(Order)
+            invalidate_vendors(Order, [row['pk'] for row in rows])
+        elif operation.action == 'delete':
+            favorites = [restored(Wishlist, row) for row in operation.snapshot.get('favorites', [])]
+            # Shoppers who closed their account since don't come back.
+            users = set(
+                get_user_model().objects.filter(pk__in={favorite.user_id for favorite in favorites}).values_list('pk', flat=True)
+            )
+            favorites = [favorite for favorite in favorites if favorite.user_id in users]
+            favorite_counts = Counter(favorite.product_id for favorite in favorites)
+            products = [restored(Product, row) for row in rows]
+            for product in products:
+                product.updated_at = now
+                # Counted again from the favorites that actually come back.
+                product.favorites_count = favorite_counts[product.pk]
+            Product.objects.bulk_create(products)
+            Wishlist.objects.bulk_create(favorites)
+            pks = [product.pk for product in products]
+            ProductTombstone.objects.filter(product_id__in=pks).delete()
+            OrderItem.objects.bulk_update(
+                [OrderItem(pk=item_pk, product_id=product_pk) for item_pk, product_pk in operation.snapshot['order_items']],
+                ['product'],
+            )
+            InventoryMovement.objects.bulk_update(
+                [InventoryMovement(pk=movement_pk, product_id=product_pk) for movement_pk, product_pk in operation.snapshot.get('movements', [])],
+                ['product'],
+            )
+            refresh_products(pks, stock_changed=True)
+        else:
+            fields = PRODUCT_SNAPSHOT_FIELDS[operation.action]
+            products = [restored(Product, row) for row in rows]
+            for product in products:
+                product.updated_at = now
+            Product.objects.bulk_update(products, [*fields, 'updated_at'])
+            pks = [product.pk for product in products]
+            refresh_products(pks, stock_changed='is_available' in fields)
+
+        operation.undone_at = now
+        operation.save(update_fields=['undone_at'])
+    return operation
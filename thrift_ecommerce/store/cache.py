@@ -0,0 +1,178 @@
+"""Tagged, stampede-safe caching for hot-path reads.
+
+``cached(key, compute, tags=...)`` stores a value together with the current
+version of each of its tags. ``invalidate_tags`` gives a tag a new version,
+so every entry recorded under the old one reads as a miss on every worker
+sharing the cache, without anyone tracking which keys those were. The
+signals in ``signals.py`` do this for saves and deletes of ``Product``,
+``Order``, ``StoreSettings`` and ``InventoryMovement``; code that writes with ``QuerySet.update()`` or
+``bulk_create()`` calls ``invalidate_models`` itself. A tag version that
+gets evicted is simply replaced, which also reads as a miss, so eviction
+can cost a recompute but never serve stale data.
+
+Two things stop a popular entry from being recomputed by every request at
+once. Shortly before it expires, a request may volunteer to refresh it
+early, with a probability that grows as expiry nears and with how long the
+value took to compute (the XFetch rule). Refreshes and misses then take a
+short lock with ``cache.add``: a request that loses the race keeps serving
+the value it has, or on a miss waits briefly for the winner's result.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import CACHE_EVENTS
+from .profiling import record_cache_access
+
+LOCK_SECONDS = 30
+# How long a miss waits for another worker's recompute before doing its own.
+LOCK_WAIT_SECONDS = 2.0
+LOCK_POLL_SECONDS = 0.05
+STAT_NAMES = ('hits', 'misses', 'recomputes', 'early_refreshes', 'lock_waits')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+    CACHE_EVENTS.labels(event=name).inc()
+
+
+def cache_stats():
+    """Counters for this process since start-up (or the last reset)."""
+    with _stats_lock:
+        return {name: _stats[name] for name in STAT_NAMES}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def model_tag(model):
+    return f'model:{model._meta.label_lower}'
+
+
+def vendor_tag(vendor_id):
+    """Tag for entries covering one vendor's products or orders."""
+    return f'vendor:{vendor_id}'
+
+
+def tag_key(tag):
+    return f'tag:{tag}'
+
+
+def entry_key(key):
+    return f'tagged:{key}'
+
+
+def lock_key(key):
+    return f'tagged-lock:{key}'
+
+
+def bump_tags(tags):
+    cache.set_many({tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def invalidate_tags(*tags):
+    bump_tags(tags)
+    # Until the transaction commits, other workers still read the old rows
+    # and could cache them under the new version, so bump again after it.
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_tags(tags))
+
+
+def invalidate_models(*models):
+    invalidate_tags(*(model_tag(model) for model in models))
+
+
+def tag_versions(tags, found):
+    """The current version of each tag, from ``found`` or the cache, creating any that are missing."""
+    versions = {tag: found.get(tag_key(tag)) for tag in tags}
+    for tag, version in versions.items():
+        if version is None:
+            # add() rather than set(): the first worker to create a version wins.
+            cache.add(tag_key(tag), uuid.uuid4().hex, None)
+            versions[tag] = cache.get(tag_key(tag))
+    return versions
+
+
+def is_current(entry, versions):
+    return entry is not None and entry['tags'] == versions
+
+
+def refresh_early(entry, beta):
+    # XFetch: -log(u) is exponentially distributed, so early refreshes are
+    # rare long before expiry and near-certain just before it.
+    return time.time() - entry['delta'] * beta * math.log(1.0 - random.random()) >= entry['expires']
+
+
+def recompute(key, compute, timeout, versions):
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    _count('recomputes')
+    # Versions were read before computing, so an invalidation that lands
+    # meanwhile leaves this entry already stale rather than wrongly current.
+    entry = {'value': value, 'tags': versions, 'expires': time.time() + timeout, 'delta': delta}
+    cache.set(entry_key(key), entry, timeout)
+    return value
+
+
+def wait_for(key, versions):
+    """The entry another worker is computing, or None if it doesn't arrive in time."""
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = cache.get(entry_key(key))
+        if is_current(entry, versions):
+            return entry
+    return None
+
+
+def cached(key, compute, timeout=None, tags=(), beta=1.0):
+    """``compute()``'s value for ``key``, from the cache while none of ``tags`` has changed.
+
+    ``beta`` above 1 makes early refreshes more eager, below 1 lazier.
+    """
+    if timeout is None:
+        timeout = settings.STORE_CACHE_SECONDS
+    found = cache.get_many([entry_key(key), *(tag_key(tag) for tag in tags)])
+    versions = tag_versions(tags, found)
+    entry = found.get(entry_key(key))
+
+    if is_current(entry, versions):
+        if refresh_early(entry, beta) and cache.add(lock_key(key), 1, LOCK_SECONDS):
+            _count('early_refreshes')
+            record_cache_access(False)
+            try:
+                return recompute(key, compute, timeout, versions)
+            finally:
+                cache.delete(lock_key(key))
+        _count('hits')
+        record_cache_access(True)
+        return entry['value']
+
+    _count('misses')
+    record_cache_access(False)
+    if cache.add(lock_key(key), 1, LOCK_SECONDS):
+        try:
+            return recompute(key, compute, timeout, versions)
+        finally:
+            cache.delete(lock_key(key))
+
+    _count('lock_waits')
+    entry = wait_for(key, versions)
+    if entry is not None:
+        return entry['value']
+    # The lock holder is slow or gone; compute rather than fail the request.
+    return recompute(key, compute, timeout, versions)
@@ -0,0 +1,52 @@
+"""Cached product card fragments for the product grids.
+
+A card's HTML depends only on the product, its ``updated_at`` version and
+two viewer flags (signed in, favorited), so those make up the cache key.
+Saving a product moves ``updated_at`` (bulk studio actions stamp it too),
+which retires its old cards without an explicit delete; they age out after
+``PRODUCT_CARD_CACHE_SECONDS``. A whole grid is fetched with one
+``get_many`` and its misses stored with one ``set_many``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .profiling import record_cache_access
+
+# Bump when a card template changes so deploys don't serve old markup.
+CARD_CACHE_VERSION = 1
+
+
+def card_cache_key(template_name, product, user):
+    favorited = getattr(product, 'is_favorited', False)
+    return (
+        f'card:v{CARD_CACHE_VERSION}:{template_name}:{product.pk}:'
+        f'{product.updated_at.timestamp()}:{int(user.is_authenticated)}:{int(bool(favorited))}'
+    )
+
+
+def render_cards(products, user, template_name='store/partials/product_card.html'):
+    """``(product, html)`` for each product, rendering only the cards not in the cache.
+
+    Cards are rendered without the request context processors; a card
+    template may use ``product`` and ``user`` only.
+    """
+    products = list(products)
+    keys = [card_cache_key(template_name, product, user) for product in products]
+    cached = cache.get_many(keys)
+
+    template = None
+    fresh = {}
+    cards = []
+    for product, key in zip(products, keys):
+        html = cached.get(key)
+        record_cache_access(html is not None)
+        if html is None:
+            template = template or get_template(template_name)
+            html = fresh[key] = template.render({'product': product, 'user': user})
+        cards.append((product, mark_safe(html)))
+
+    if fresh:
+        cache.set_many(fresh, settings.PRODUCT_CARD_CACHE_SECONDS)
+    return cards
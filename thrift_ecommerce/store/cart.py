@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+
+from .models import CartItem, Product
+from .reservations import available_stock, reserve_stock, shrink_reservation
+
+
+def add_to_bag(cart, product):
+    """Put one more unit of ``product`` in ``cart``, holding the stock for it.
+
+    Returns ``(item, ok, message)``; ``item`` is None when the product could
+    not be added at all.
+    """
+    with transaction.atomic():
+        # Every change to a product's bag quantities happens under its row
+        # lock, so the quantity read below can't go stale before the update.
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        if not product.is_available or product.quantity == 0:
+            return None, False, f"{product.name} is currently out of stock."
+
+        item, created = CartItem.objects.get_or_create(cart=cart, product=product)
+        wanted = 1 if created else item.quantity + 1
+        if not reserve_stock(item, wanted):
+            if created:
+                item.delete()
+                return None, False, f"{product.name} is currently held in other shoppers' bags."
+            available = available_stock(product, exclude_cart_item=item)
+            return item, False, f"Only {available} units available for {product.name}."
+
+        if not created:
+            CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + 1)
+            item.quantity = wanted
+    return item, True, f"Added {product.name} to your bag."
+
+
+def increment_item(item):
+    """Add one unit to ``item`` if the stock allows. Returns ``(item, ok, message)``."""
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=item.product_id)
+        item.refresh_from_db(fields=['quantity'])
+        if not reserve_stock(item, item.quantity + 1):
+            available = available_stock(product, exclude_cart_item=item)
+            return item, False, f"Only {available} units available."
+        CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') + 1)
+        item.quantity += 1
+    return item, True, ''
+
+
+def decrement_item(item):
+    """Take one unit off ``item``, removing it at zero. Returns ``(item, ok, message)``."""
+    with transaction.atomic():
+        Product.objects.select_for_update().get(pk=item.product_id)
+        item.refresh_from_db(fields=['quantity'])
+        if item.quantity <= 1:
+            return remove_item(item)
+        CartItem.objects.filter(pk=item.pk).update(quantity=F('quantity') - 1)
+        item.quantity -= 1
+        shrink_reservation(item, item.quantity)
+    return item, True, ''
+
+
+def remove_item(item):
+    """Delete ``item`` from its bag; its hold goes with it."""
+    name = item.product.name
+    item.delete()
+    return item, True, f"Removed {name} from your bag."
+
+
+def cart_totals(cart):
+    """Line count, unit count and subtotal of ``cart`` in one query."""
+    line_total = ExpressionWrapper(
+        F('quantity') * F('product__price'),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+    totals = cart.items.aggregate(lines=Count('id'), units=Sum('quantity'), subtotal=Sum(line_total))
+    return {
+        'lines': totals['lines'],
+        'units': totals['units'] or 0,
+        'subtotal': (totals['subtotal'] or Decimal('0')).quantize(Decimal('0.01')),
+    }
@@ -0,0 +1,141 @@
+"""In-process pub/sub for live stock updates, feeding the stock SSE stream.
+
+Publishers are ordinary sync code (``publish_stock_change`` runs from a
+``Product`` post_save receiver once the transaction commits). Subscribers
+are the async stream responses, one per open ``EventSource``. A subscriber
+keeps only the latest event per product, so a slow client never builds up
+a backlog and an idle one costs no more than a dict and an ``asyncio.Event``.
+
+Events only reach clients connected to the same process. Run the streams
+on a single ASGI worker, or put a shared broker behind ``publish`` before
+scaling out.
+"""
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+
+class Subscription:
+    def __init__(self, broker, product_ids):
+        self.broker = broker
+        self.product_ids = frozenset(product_ids)
+        self.loop = asyncio.get_running_loop()
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def deliver(self, product_id, event):
+        # Always called on ``self.loop``, via call_soon_threadsafe.
+        self.pending[product_id] = event
+        self.ready.set()
+
+    async def next_events(self, timeout):
+        """Events published since the last call, waiting up to ``timeout`` seconds for one."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.ready.clear()
+        events, self.pending = list(self.pending.values()), {}
+        return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class StockBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, product_ids):
+        """Subscribe the running event loop to changes for ``product_ids``."""
+        subscription = Subscription(self, product_ids)
+        with self._lock:
+            for product_id in subscription.product_ids:
+                self._subscribers[product_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for product_id in subscription.product_ids:
+                subscribers = self._subscribers.get(product_id)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[product_id]
+
+    def publish(self, product_id, event):
+        """Hand ``event`` to everyone watching ``product_id``. Safe from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(product_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, product_id, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down without closing it.
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+
+broker = StockBroker()
+
+
+def stock_event(product_id, quantity, is_available):
+    return {
+        'product_id': product_id,
+        'quantity': quantity,
+        'is_available': is_available and quantity > 0,
+    }
+
+
+def format_sse(event):
+    return f"event: stock\ndata: {json.dumps(event)}\n\n"
+
+
+class StockEventStream:
+    """Body of a stock ``StreamingHttpResponse``: a snapshot, then live events.
+
+    Django calls ``close()`` when the response ends, including when the
+    client disconnects, which releases the subscription straight away
+    instead of whenever the generator is garbage collected.
+    """
+
+    def __init__(self, broker, product_ids, snapshot, heartbeat):
+        self.broker = broker
+        self.product_ids = product_ids
+        self.snapshot = snapshot
+        self.heartbeat = heartbeat
+        self.subscription = None
+
+    async def __aiter__(self):
+        # Subscribe before reading the snapshot so no change falls in between.
+        self.subscription = self.broker.subscribe(self.product_ids)
+        try:
+            yield 'retry: 5000\n\n'
+            async for event in self.snapshot:
+                yield format_sse(event)
+            while True:
+                changes = await self.subscription.next_events(self.heartbeat)
+                if not changes:
+                    yield ': keep-alive\n\n'
+                for event in changes:
+                    yield format_sse(event)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.subscription is not None:
+            self.subscription.close()
+
+
+def publish_stock_change(product_id, quantity, is_available):
+    """Publish a product's stock once the current transaction commits."""
+    event = stock_event(product_id, quantity, is_available)
+    transaction.on_commit(lambda: broker.publish(product_id, event))
@@ -0,0 +1,205 @@
+import json
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern
+from django.urls.converters import IntConverter
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from store import urls as store_urls
+from store.models import CartItem, Order, Product, User, VendorProfile
+from store.tokens import account_activation_token
+
+from .seed_bench import BENCH_OWNER_EMAIL
+
+# Routes that cannot be replayed meaningfully: logout ends the bench session
+# the stock stream never finishes (and only runs under ASGI), and an undo
+# needs a fresh bulk action to undo.
+SKIPPED_ROUTES = {'logout', 'product_stock_stream', 'owner_undo_bulk'}
+
+# Routes that only accept POST, with the form data to send.
+POST_ROUTES = {
+    'quick_edit_product': lambda samples: {
+        'product_id': samples[('product_id', True)],
+        'price': '15000',
+        'is_available': 'on',
+    },
+    'owner_toggle_order_status': lambda samples: {},
+    'cart_add_json': lambda samples: {},
+    'cart_item_json': lambda samples: {},
+    # Previews only, so replaying them leaves the catalog and orders as they were.
+    'owner_bulk_products': lambda samples: {
+        'ids': [samples[('product_id', True)]],
+        'action': 'adjust_price',
+        'value': '10',
+        'preview': '1',
+    },
+    'owner_bulk_orders': lambda samples: {
+        'ids': [samples[('order_id', True)]],
+        'action': 'mark_paid',
+        'preview': '1',
+    },
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Drives every store URL through the test client and reports latency, queries and memory as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', nargs='*', default=None, help='Route names to benchmark')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(email=BENCH_OWNER_EMAIL).first()
+        if owner is None:
+            raise CommandError('No bench data found. Run "python manage.py seed_bench" first.')
+
+        samples = self.sample_arguments(owner)
+        # A failing view is reported with its status code rather than aborting the run.
+        client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+        client.force_login(owner)
+
+        results = {}
+        # Writes are rolled back after every request, so keep receipts and
+        # activation mails in memory instead of printing them.
+        with override_settings(
+            ALLOWED_HOSTS=['localhost'],
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        ):
+            for pattern in store_urls.urlpatterns:
+                if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_ROUTES:
+                    continue
+                if options['only'] and pattern.name not in options['only']:
+                    continue
+                route = str(pattern.pattern)
+                if '/' + route in results:
+                    continue
+                kwargs = {
+                    name: samples[(name, isinstance(converter, IntConverter))]
+                    for name, converter in pattern.pattern.converters.items()
+                }
+                missing = [name for name, value in kwargs.items() if value is None]
+                if missing:
+                    self.stderr.write(f"Skipping {route}: no sample for {', '.join(missing)}")
+                    continue
+                # Several routes share a name or view, so build the URL from the route itself.
+                url = '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda m: str(kwargs[m.group(1)]), route)
+                results['/' + route] = self.bench_route(client, pattern.name, url, samples, options)
+
+        report = {
+            'commit': self.current_commit(),
+            'generated_at': timezone.now().isoformat(),
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'products': Product.objects.count(),
+                'orders': Order.objects.count(),
+            },
+            'views': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(payload)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} view results to {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    def sample_arguments(self, owner):
+        product = Product.objects.filter(is_available=True).order_by('-created_at').first()
+        order = Order.objects.filter(user=owner).order_by('-created_at').first()
+        cart_item = CartItem.objects.filter(cart__user=owner).first()
+        vendor = VendorProfile.objects.order_by('pk').first()
+        # Keyed by (parameter name, is integer) since ``order_id`` is the
+        # public reference in some routes and the primary key in others.
+        return {
+            ('product_id', True): product.id if product else None,
+            ('item_id', True): cart_item.id if cart_item else None,
+            ('action', False): 'increment',
+            ('order_id', False): order.order_id if order else None,
+            ('order_id', True): order.pk if order else None,
+            ('storefront_slug', False): vendor.storefront_slug if vendor else None,
+            ('uidb64', False): urlsafe_base64_encode(force_bytes(owner.pk)),
+            ('token', False): account_activation_token.make_token(owner),
+        }
+
+    def bench_route(self, client, name, url, samples, options):
+        method = 'post' if name in POST_ROUTES else 'get'
+        data = POST_ROUTES[name](samples) if name in POST_ROUTES else None
+
+        def request():
+            with transaction.atomic():
+                response = getattr(client, method)(url, data)
+                transaction.set_rollback(True)
+            return response
+
+        for _ in range(options['warmup']):
+            request()
+
+        latencies = []
+        query_counts = []
+        sql_times = []
+        status = None
+        for _ in range(options['iterations']):
+            statements = []
+
+            def timed(execute, sql, params, many, context):
+                started = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    # Ignore the savepoint bookkeeping added by the rollback wrapper.
+                    if 'SAVEPOINT' not in sql:
+                        statements.append(time.perf_counter() - started)
+
+            with connection.execute_wrapper(timed):
+                started = time.perf_counter()
+                response = request()
+                latencies.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+            query_counts.append(len(statements))
+            sql_times.append(sum(statements) * 1000)
+
+        # Tracing allocations slows requests down, so measure memory separately.
+        tracemalloc.start()
+        request()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'name': name,
+            'url': url,
+            'method': method.upper(),
+            'status': status,
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p95_ms': round(percentile(latencies, 95), 3),
+            'queries': max(query_counts),
+            'sql_ms': round(statistics.median(sql_times), 3),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+        }
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
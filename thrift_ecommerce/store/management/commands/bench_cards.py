@@ -0,0 +1,68 @@
+import json
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import get_template
+
+from store.cards import card_cache_key, render_cards
+from store.models import Product, User
+
+from .seed_bench import BENCH_OWNER_EMAIL
+
+GRIDS = {
+    'product_card': 'store/partials/product_card.html',
+    'dashboard_card': 'store/partials/dashboard_card.html',
+    'landing_card': 'store/partials/landing_card.html',
+}
+
+
+class Command(BaseCommand):
+    help = 'Times product grid rendering with and without the card fragment cache, as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=200, help='Cards per grid')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(email=BENCH_OWNER_EMAIL).first()
+        if owner is None:
+            raise CommandError('No bench data found. Run "python manage.py seed_bench" first.')
+        products = list(
+            Product.objects.filter(is_available=True).with_favorite_flag(owner)
+            .order_by('-created_at')[:options['products']]
+        )
+
+        results = {}
+        for name, template_name in GRIDS.items():
+            template = get_template(template_name)
+
+            def uncached():
+                # What the grids did before: render every card on every request.
+                return [template.render({'product': product, 'user': owner}) for product in products]
+
+            def cold():
+                cache.delete_many([card_cache_key(template_name, product, owner) for product in products])
+                return render_cards(products, owner, template_name)
+
+            def warm():
+                return render_cards(products, owner, template_name)
+
+            warm()
+            results[name] = {
+                'cards': len(products),
+                'uncached_ms': self.time(uncached, options['iterations']),
+                'cold_cache_ms': self.time(cold, options['iterations']),
+                'warm_cache_ms': self.time(warm, options['iterations']),
+            }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def time(self, render, iterations):
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            render()
+            samples.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(samples), 3)
+
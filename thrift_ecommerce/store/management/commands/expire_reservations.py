@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = 'Releases expired bag holds so their stock is free again'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        removed = expire_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {removed} expired reservation(s).'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.trending import numpy, recompute_trending, sync_counters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes every product trending score from recent favorites and sales (run hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sync-counters', action='store_true',
+            help='Also reset favorites_count and units_sold from the wishlist and order rows',
+        )
+
+    def handle(self, *args, **options):
+        if options['sync_counters']:
+            synced = sync_counters()
+            self.stdout.write(f'Synced popularity counters on {synced} product(s).')
+        scored = recompute_trending(batch_size=options['batch_size'])
+        engine = 'NumPy' if numpy is not None else 'pure Python'
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} trending product(s) with {engine}.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from store.inventory import inventory_drift
+
+
+class Command(BaseCommand):
+    help = 'Checks every product quantity against the sum of its inventory movements'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Log an adjustment for each difference found')
+
+    def handle(self, *args, **options):
+        drifted = 0
+        for product_id, quantity, ledger in inventory_drift(options['chunk_size'], fix=options['fix']):
+            drifted += 1
+            self.stdout.write(f'Product {product_id}: quantity {quantity}, ledger {ledger} ({quantity - ledger:+d})')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Every product matches its ledger.'))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'Logged adjustments for {drifted} product(s).'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{drifted} product(s) differ from their ledger. Run with --fix to adjust.'))
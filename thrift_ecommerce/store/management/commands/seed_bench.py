@@ -0,0 +1,238 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from store.ids import new_ulid
+from store.trending import recompute_trending, sync_counters
+from store.models import (
+    CATEGORY_CHOICES,
+    SIZE_CHOICES,
+    Cart,
+    CartItem,
+    InventoryMovement,
+    Order,
+    OrderItem,
+    Product,
+    User,
+    VendorProfile,
+    Wishlist,
+)
+
+BENCH_EMAIL_DOMAIN = 'bench.local'
+BENCH_OWNER_EMAIL = f'owner@{BENCH_EMAIL_DOMAIN}'
+BENCH_PASSWORD = 'bench-pass-1234'
+BENCH_PRODUCT_PREFIX = '[bench] '
+BENCH_IMAGE = 'products/1.png'
+
+ADJECTIVES = ['Vintage', 'Retro', 'Classic', 'Oversized', 'Cropped', 'Pleated', 'Linen', 'Denim', 'Silk', 'Corduroy']
+NOUNS = ['Dress', 'Blazer', 'Shirt', 'Skirt', 'Jacket', 'Trousers', 'Cardigan', 'Scarf', 'Blouse', 'Coat']
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generates synthetic users, products, favorites, carts and orders for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--vendors', type=int, default=20, help='Storefronts sharing the products with the platform')
+        parser.add_argument('--favorites', type=int, default=5, help='Favorites per user')
+        parser.add_argument('--carts', type=int, default=200, help='Users with a non-empty cart')
+        parser.add_argument('--orders', type=int, default=5000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for repeatable data')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--clear', action='store_true', help='Remove previously seeded bench data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            if options['clear']:
+                self.clear()
+
+            owner = self.seed_owner()
+            users = self.seed_users(options['users'], batch_size)
+            vendors = self.seed_vendors(users[:options['vendors']])
+            products = self.seed_products(rng, options['products'], vendors, batch_size)
+            if not products:
+                self.stdout.write(self.style.WARNING('No products seeded; skipping favorites, carts and orders.'))
+                return
+
+            shoppers = [owner] + users
+            self.seed_favorites(rng, shoppers, products, options['favorites'], batch_size)
+            self.seed_carts(rng, shoppers[:options['carts'] + 1], products, batch_size)
+            items = self.seed_orders(rng, shoppers, products, options['orders'], options['items_per_order'], batch_size)
+            self.seed_ledger(products, items, batch_size)
+            # bulk_create skipped the counters; fill them and the scores in.
+            sync_counters()
+            recompute_trending(batch_size=batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(users)} users, {len(products)} products and {options['orders']} orders. "
+            f"Bench owner: {BENCH_OWNER_EMAIL} / {BENCH_PASSWORD}"
+        ))
+
+    def clear(self):
+        InventoryMovement.objects.filter(product__name__startswith=BENCH_PRODUCT_PREFIX).delete()
+        Order.objects.filter(user__email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+        Product.objects.filter(name__startswith=BENCH_PRODUCT_PREFIX).delete()
+        User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').delete()
+
+    def seed_owner(self):
+        owner, created = User.objects.get_or_create(
+            email=BENCH_OWNER_EMAIL,
+            defaults={
+                'username': 'bench-owner',
+                'password': make_password(BENCH_PASSWORD),
+                'preferred_size': 'M',
+                'is_staff': True,
+                'is_superuser': True,
+            },
+        )
+        return owner
+
+    def seed_users(self, count, batch_size):
+        # Hashing is deliberately slow, so every bench user shares one hash.
+        password = make_password(BENCH_PASSWORD)
+        start = User.objects.filter(email__endswith=f'@{BENCH_EMAIL_DOMAIN}').count()
+        sizes = [code for code, label in SIZE_CHOICES]
+        users = [
+            User(
+                email=f'user{start + i}@{BENCH_EMAIL_DOMAIN}',
+                username=f'bench-user-{start + i}',
+                password=password,
+                preferred_size=sizes[i % len(sizes)],
+            )
+            for i in range(count)
+        ]
+        return User.objects.bulk_create(users, batch_size=batch_size)
+
+    def seed_vendors(self, users):
+        # bulk_create skips VendorProfile.save(), so set each slug here.
+        return VendorProfile.objects.bulk_create(
+            VendorProfile(
+                user=user,
+                business_name=f'Bench Vendor {user.pk}',
+                contact_phone='08000000000',
+                storefront_slug=f'bench-vendor-{user.pk}',
+            )
+            for user in users
+        )
+
+    def seed_products(self, rng, count, vendors, batch_size):
+        sizes = [code for code, label in SIZE_CHOICES]
+        categories = [code for code, label in CATEGORY_CHOICES]
+        products = []
+        for i in range(count):
+            price = Decimal(rng.randrange(2000, 80000, 500))
+            quantity = rng.choice([0, 1, 1, 1, 2, 3, 5])
+            products.append(Product(
+                name=f'{BENCH_PRODUCT_PREFIX}{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} #{i}',
+                description='Synthetic benchmark listing. ' * rng.randint(1, 12),
+                price=price,
+                original_price=price * Decimal('1.3') if rng.random() < 0.25 else None,
+                quantity=quantity,
+                is_available=quantity > 0,
+                image=BENCH_IMAGE,
+                size=rng.choice(sizes),
+                category=rng.choice(categories),
+                # About half the catalog is the platform's own stock.
+                vendor=rng.choice(vendors) if vendors and rng.random() < 0.5 else None,
+            ))
+        products = Product.objects.bulk_create(products, batch_size=batch_size)
+
+        # ``created_at`` is auto_now_add, so spread the listings over the
+        # last year in a second pass to give ordering and analytics realistic data.
+        now = timezone.now()
+        for product in products:
+            product.created_at = now - timedelta(minutes=rng.randint(0, 525600))
+        Product.objects.bulk_update(products, ['created_at'], batch_size=batch_size)
+        return products
+
+    def seed_favorites(self, rng, users, products, per_user, batch_size):
+        # Spread favorites over the last month so some are due a reminder.
+        now = timezone.now()
+        rows = []
+        for user in users:
+            for product in rng.sample(products, min(per_user, len(products))):
+                rows.append(Wishlist(
+                    user_id=user.id,
+                    product_id=product.id,
+                    added_at=now - timedelta(minutes=rng.randint(0, 43200)),
+                ))
+        Wishlist.objects.bulk_create(rows, batch_size=batch_size, ignore_conflicts=True)
+
+    def seed_carts(self, rng, users, products, batch_size):
+        existing = set(Cart.objects.filter(user__in=users).values_list('user_id', flat=True))
+        carts = Cart.objects.bulk_create(
+            [Cart(user=user) for user in users if user.id not in existing],
+            batch_size=batch_size,
+        )
+        in_stock = [product for product in products if product.quantity > 0] or products
+        items = []
+        for cart in carts:
+            for product in rng.sample(in_stock, min(rng.randint(1, 4), len(in_stock))):
+                items.append(CartItem(cart=cart, product=product, quantity=1))
+        CartItem.objects.bulk_create(items, batch_size=batch_size)
+
+    def seed_orders(self, rng, users, products, count, items_per_order, batch_size):
+        now = timezone.now()
+        orders = []
+        lines = []
+        for i in range(count):
+            picked = rng.sample(products, min(rng.randint(1, max(items_per_order, 1)), len(products)))
+            lines.append(picked)
+            placed_at = now - timedelta(minutes=rng.randint(0, 525600))
+            orders.append(Order(
+                user=rng.choice(users),
+                # Dated like the order, as checkout would have issued it.
+                order_id=new_ulid(placed_at),
+                total_paid=sum((product.price for product in picked), Decimal('0.00')),
+                is_completed=rng.random() < 0.85,
+                payment_date=placed_at,
+                fulfillment_method=rng.choice(['PICKUP', 'WAYBILL']),
+            ))
+        orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+
+        # ``created_at`` is auto_now_add, so set it from the payment date afterwards.
+        for order in orders:
+            order.created_at = order.payment_date
+        Order.objects.bulk_update(orders, ['created_at'], batch_size=batch_size)
+
+        items = [
+            OrderItem(order=order, product=product, price=product.price, quantity=1)
+            for order, picked in zip(orders, lines)
+            for product in picked
+        ]
+        return OrderItem.objects.bulk_create(items, batch_size=batch_size)
+
+    def seed_ledger(self, products, items, batch_size):
+        # Open each product with its current stock plus what the seeded
+        # orders sold, then log those sales, so every quantity matches its
+        # ledger and the weekly sales analytics have history to scan.
+        sold = {}
+        for item in items:
+            sold[item.product_id] = sold.get(item.product_id, 0) + item.quantity
+        opened_at = timezone.now() - timedelta(days=366)
+        movements = [
+            InventoryMovement(
+                product_id=product.id, kind='RESTOCK', change=product.quantity + sold.get(product.id, 0),
+                note='Bench opening stock', created_at=opened_at,
+            )
+            for product in products
+            if product.quantity + sold.get(product.id, 0)
+        ]
+        movements += [
+            InventoryMovement(
+                product_id=item.product_id, kind='SALE', change=-item.quantity,
+                order_id=item.order_id, created_at=item.order.created_at,
+            )
+            for item in items
+        ]
+        InventoryMovement.objects.bulk_create(movements, batch_size=batch_size)
@@ -2,6 +2,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
+from store import metrics
 from store.models import Wishlist
 from datetime import timedelta
 
@@ -12,13 +13,16 @@ class Command(BaseCommand):
         # 1. Define the timeframe (e.g., 3 days ago)
         threshold_date = timezone.now() - timedelta(days=3)
         
-        # 2. Find wishlist items older than 3 days that haven't had a reminder yet
-        pending_reminders = Wishlist.objects.filter(
-            added_at__lte=threshold_date,
-            reminder_sent=False
+        # 2. Find wishlist items older than 3 days that haven't had a reminder yet.
+        # (reminder_sent_at, added_at) is indexed, so this is a range scan.
+        pending_reminders = list(
+            Wishlist.objects.filter(
+                reminder_sent_at__isnull=True,
+                added_at__lte=threshold_date,
+            ).select_related('user', 'product')
         )
 
-        if not pending_reminders.exists():
+        if not pending_reminders:
             self.stdout.write("No reminders to send today.")
             return
 
@@ -34,10 +38,12 @@ class Command(BaseCommand):
                 )
                 
                 # 4. Mark as sent so they don't get spammed
-                item.reminder_sent = True
-                item.save()
-                
+                item.reminder_sent_at = timezone.now()
+                item.save(update_fields=['reminder_sent_at'])
+                metrics.EMAILS.labels(kind='wishlist_reminder', outcome='sent').inc()
+
                 self.stdout.write(self.style.SUCCESS(f'Sent reminder to {item.user.email}'))
             
             except Exception as e:
+                metrics.EMAILS.labels(kind='wishlist_reminder', outcome='failed').inc()
                 self.stdout.write(self.style.ERROR(f'Failed to send to {item.user.email}: {e}'))
\ No newline at end of file
@@ -0,0 +1,191 @@
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import connections
+from django.db.models import Sum
+from django.db.utils import OperationalError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from store.models import Cart, CartItem, Order, OrderItem, Product, User
+
+STRESS_EMAIL_DOMAIN = 'stress.local'
+STRESS_PRODUCT_PREFIX = '[stress] '
+STRESS_IMAGE = 'products/1.png'
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Races concurrent buyers through checkout for contested stock and reports oversells and lock errors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=None, help='Thread pool size (defaults to --buyers)')
+        parser.add_argument('--products', type=int, default=1, help='Contested products in every bag')
+        parser.add_argument('--stock', type=int, default=1, help='Units in stock per contested product')
+        parser.add_argument('--max-lock-errors', type=int, default=None,
+                            help='Fail when more "database is locked" errors than this occur')
+        parser.add_argument('--keep', action='store_true', help='Keep the seeded buyers, products and orders')
+        parser.add_argument('--json', action='store_true', help='Print only the JSON report')
+
+    def handle(self, *args, **options):
+        products, buyers = self.seed(options['buyers'], options['products'], options['stock'])
+        # Failed checkouts are counted in the report; don't also dump every traceback.
+        quiet_loggers = [logging.getLogger(name) for name in ('django.request', 'store.slow_requests')]
+        levels = [logger.level for logger in quiet_loggers]
+        try:
+            for logger in quiet_loggers:
+                logger.setLevel(logging.CRITICAL)
+            with override_settings(
+                ALLOWED_HOSTS=['localhost'],
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+            ):
+                results, elapsed = self.race(buyers, options['workers'] or len(buyers))
+            report = self.report(results, elapsed, products, options)
+        finally:
+            for logger, level in zip(quiet_loggers, levels):
+                logger.setLevel(level)
+            if not options['keep']:
+                self.cleanup()
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+        failures = []
+        if report['oversold_units']:
+            failures.append(f"{report['oversold_units']} unit(s) oversold")
+        if report['negative_stock_products']:
+            failures.append(f"{report['negative_stock_products']} product(s) with negative stock")
+        if options['max_lock_errors'] is not None and report['lock_errors'] > options['max_lock_errors']:
+            failures.append(f"{report['lock_errors']} lock errors (allowed {options['max_lock_errors']})")
+        if failures:
+            raise CommandError('Checkout stress test failed: ' + '; '.join(failures))
+        if not options['json']:
+            self.stdout.write(self.style.SUCCESS('No oversold or negative stock.'))
+
+    def seed(self, buyer_count, product_count, stock):
+        self.cleanup()
+        products = [
+            Product.objects.create(
+                name=f'{STRESS_PRODUCT_PREFIX}One-off piece #{i}',
+                price=Decimal('15000.00'),
+                quantity=stock,
+                image=STRESS_IMAGE,
+                size='M',
+                category='DRESS',
+            )
+            for i in range(product_count)
+        ]
+        buyers = User.objects.bulk_create(
+            User(email=f'buyer{i}@{STRESS_EMAIL_DOMAIN}', username=f'stress-buyer-{i}')
+            for i in range(buyer_count)
+        )
+        carts = Cart.objects.bulk_create(Cart(user=buyer) for buyer in buyers)
+        CartItem.objects.bulk_create(
+            CartItem(cart=cart, product=product, quantity=1)
+            for cart in carts
+            for product in products
+        )
+        return products, buyers
+
+    def race(self, buyers, workers):
+        url = reverse('complete_purchase')
+        # Log everyone in up front so only checkout itself runs concurrently.
+        clients = []
+        for buyer in buyers:
+            # The test client's own exception capture listens on a global
+            # signal, so concurrent clients would see each other's failures.
+            # Record them per thread instead.
+            client = Client(raise_request_exception=False, HTTP_HOST='localhost')
+            client.force_login(buyer)
+            clients.append(client)
+        failures = {}
+
+        def record_failure(sender, **kwargs):
+            failures[threading.get_ident()] = sys.exc_info()[1]
+
+        start_gun = threading.Event()
+
+        def buy(client):
+            start_gun.wait()
+            started = time.perf_counter()
+            try:
+                response = client.get(url)
+            finally:
+                connections.close_all()
+            latency = time.perf_counter() - started
+            exc = failures.pop(threading.get_ident(), None)
+            if exc is None:
+                outcome = 'purchased' if response.status_code == 200 else 'rejected'
+                error = None
+            else:
+                locked = isinstance(exc, OperationalError) and 'locked' in str(exc)
+                outcome = 'lock_error' if locked else 'error'
+                error = f'{type(exc).__name__}: {exc}'
+            return {'outcome': outcome, 'latency': latency, 'error': error}
+
+        got_request_exception.connect(record_failure)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(buy, client) for client in clients]
+                start_gun.set()
+                results = [future.result() for future in futures]
+            return results, time.perf_counter() - started
+        finally:
+            got_request_exception.disconnect(record_failure)
+
+    def report(self, results, elapsed, products, options):
+        latencies = [result['latency'] * 1000 for result in results]
+        outcomes = [result['outcome'] for result in results]
+        errors = sorted({result['error'] for result in results if result['outcome'] == 'error'})
+
+        product_ids = [product.id for product in products]
+        sold = dict(
+            OrderItem.objects.filter(product_id__in=product_ids)
+            .values_list('product_id')
+            .annotate(units=Sum('quantity'))
+        )
+        oversold = sum(max(0, sold.get(pk, 0) - options['stock']) for pk in product_ids)
+        # PositiveIntegerField normally stops this at the database, but
+        # check anyway in case a backend doesn't enforce the constraint.
+        negative = Product.objects.filter(pk__in=product_ids, quantity__lt=0).count()
+
+        return {
+            'buyers': len(results),
+            'workers': options['workers'] or len(results),
+            'contested_products': len(products),
+            'stock_per_product': options['stock'],
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 2) if elapsed else None,
+            'p50_ms': round(statistics.median(latencies), 2) if latencies else None,
+            'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+            'purchased': outcomes.count('purchased'),
+            'rejected': outcomes.count('rejected'),
+            'lock_errors': outcomes.count('lock_error'),
+            'other_errors': outcomes.count('error'),
+            'error_samples': errors[:5],
+            'units_sold': sum(sold.values()),
+            'oversold_units': oversold,
+            'negative_stock_products': negative,
+        }
+
+    def cleanup(self):
+        Order.objects.filter(user__email__endswith=f'@{STRESS_EMAIL_DOMAIN}').delete()
+        Product.objects.filter(name__startswith=STRESS_PRODUCT_PREFIX).delete()
+        User.objects.filter(email__endswith=f'@{STRESS_EMAIL_DOMAIN}').delete()
@@ -0,0 +1,139 @@
+"""Serving uploads under ``MEDIA_ROOT`` in production.
+
+``serve_media`` answers conditional requests with 304s, single byte ranges
+with 206s, and otherwise streams the file with ``FileResponse``, which WSGI
+servers such as gunicorn send with ``os.sendfile``. When
+``MEDIA_SENDFILE_HEADER`` is set the view only checks the file and names it
+in an ``X-Accel-Redirect`` (nginx) or ``X-Sendfile`` (Apache, lighttpd)
+header, and the web server does the transfer, ranges included.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """A file positioned at ``start`` that reads at most ``length`` bytes.
+
+    ``fileno`` is passed through, so sendfile-capable servers still send the
+    slice zero-copy, bounded by the response's ``Content-Length``.
+    """
+
+    def __init__(self, fh, start, length):
+        self.fh = fh
+        self.fh.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.fh.fileno()
+
+    def close(self):
+        self.fh.close()
+
+
+def parse_range(header, size):
+    """``(start, end)`` for a single ``bytes=`` range, inclusive; None to send the whole file.
+
+    Raises ``ValueError`` when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        # Unparsable and multi-range requests get the full file, which RFC 9110 allows.
+        return None
+    first, last = match.groups()
+    if not first:
+        # A suffix range: the last N bytes.
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range.')
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range starts past the end of the file.')
+    return start, end
+
+
+def range_still_valid(request, etag, last_modified):
+    """Whether an ``If-Range`` validator, if any, still matches the file."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Not found.')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('Not found.')
+
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        header = settings.MEDIA_SENDFILE_HEADER
+        if header:
+            response = HttpResponse(content_type=content_type)
+            if header == 'X-Accel-Redirect':
+                response[header] = quote(settings.MEDIA_ACCEL_REDIRECT_PREFIX + path)
+            else:
+                response[header] = full_path
+        else:
+            response = file_response(request, full_path, stat.st_size, content_type, etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_SECONDS}'
+    return response
+
+
+def file_response(request, full_path, size, content_type, etag, last_modified):
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and range_still_valid(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(FileRange(open(full_path, 'rb'), start, length), content_type=content_type, status=206)
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,325 @@
+"""Counters, gauges and latency histograms, exposed in Prometheus text format.
+
+Metrics are declared once at import time (``counter``, ``gauge``,
+``histogram``) and updated with ``inc``/``set``/``observe``, optionally
+after picking a label set with ``labels(...)``. Updates only touch this
+process's memory under a lock, so they cost microseconds and are safe from
+any thread.
+
+With several worker processes each one only sees its own requests. Set
+``METRICS_DIR`` to a directory all workers (and management commands) can
+write: every process then saves a snapshot of its values there, at most
+every ``METRICS_FLUSH_SECONDS`` and on exit, and ``render()`` adds them all
+up, so any worker answers a scrape with the totals for the whole host.
+Counters and histograms of exited processes keep counting towards the
+totals, as Prometheus expects of a counter; gauges only include processes
+that are still running. Empty the directory when the service restarts.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+# Seconds; wide enough for a slow checkout, fine enough for a cached page.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_lock = threading.Lock()
+_registry = {}
+_process_file = f'metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+_last_flush = 0.0
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def labels(self, **labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} takes the labels {", ".join(self.labelnames)}.')
+        return BoundMetric(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    def key(self, labelvalues):
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f'{self.name} needs its labels set with labels(...).')
+        return labelvalues
+
+    def value(self, **labels):
+        """The current value for one label set in this process, for tests and debugging."""
+        with _lock:
+            return self.values.get(self.labels(**labels).labelvalues if labels else (), self.empty())
+
+    def empty(self):
+        return 0.0
+
+
+class BoundMetric:
+    """A metric with its label values filled in."""
+
+    def __init__(self, metric, labelvalues):
+        self.metric = metric
+        self.labelvalues = labelvalues
+
+    def __getattr__(self, name):
+        update = getattr(self.metric, name)
+        return lambda *args, **kwargs: update(*args, labelvalues=self.labelvalues, **kwargs)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, labelvalues=()):
+        if amount < 0:
+            raise ValueError('Counters only go up.')
+        key = self.key(labelvalues)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, labelvalues=()):
+        key = self.key(labelvalues)
+        with _lock:
+            self.values[key] = float(value)
+
+    def inc(self, amount=1, labelvalues=()):
+        key = self.key(labelvalues)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def dec(self, amount=1, labelvalues=()):
+        self.inc(-amount, labelvalues=labelvalues)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def empty(self):
+        # One count per bucket plus +Inf, then the sum of observations.
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value, labelvalues=()):
+        key = self.key(labelvalues)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = self.empty()
+            state[index] += 1
+            state[-1] += value
+
+    def time(self, labelvalues=()):
+        return Timer(self, labelvalues)
+
+
+class Timer:
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, labelvalues=self.labelvalues)
+
+
+def register(metric):
+    with _lock:
+        if metric.name in _registry:
+            raise ValueError(f'A metric named {metric.name} is already registered.')
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+    return register(Histogram(name, documentation, labelnames, buckets))
+
+
+def reset_metrics():
+    """Zero every metric in this process (the test suite starts each test from here)."""
+    with _lock:
+        for metric in _registry.values():
+            metric.values.clear()
+
+
+# --- SNAPSHOTS AND MERGING ---
+
+def snapshot():
+    """This process's values as plain JSON-friendly data."""
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'metrics': {
+                name: [[list(labelvalues), value] for labelvalues, value in metric.values.items()]
+                for name, metric in _registry.items()
+                if metric.values
+            },
+        }
+
+
+def flush(force=False):
+    """Save this process's snapshot to ``METRICS_DIR``, at most every ``METRICS_FLUSH_SECONDS``."""
+    global _last_flush
+    directory = settings.METRICS_DIR
+    now = time.monotonic()
+    if not directory or (not force and now - _last_flush < settings.METRICS_FLUSH_SECONDS):
+        return
+    _last_flush = now
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, _process_file)
+    # Write then rename, so a scrape never reads half a file.
+    partial = f'{path}.tmp'
+    with open(partial, 'w') as handle:
+        json.dump(snapshot(), handle)
+    os.replace(partial, path)
+
+
+@atexit.register
+def flush_on_exit():
+    try:
+        flush(force=True)
+    except Exception:
+        pass
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collected_snapshots():
+    """This process's live snapshot plus the saved ones of every other process."""
+    snapshots = [snapshot()]
+    directory = settings.METRICS_DIR
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json') or filename == _process_file:
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as handle:
+                snapshots.append(json.load(handle))
+        except (OSError, ValueError):
+            # Vanished or unreadable: skip it rather than fail the scrape.
+            continue
+    return snapshots
+
+
+def merged_values():
+    """``{name: {labelvalues: value}}`` summed over all processes."""
+    merged = {name: {} for name in _registry}
+    for index, data in enumerate(collected_snapshots()):
+        # Index 0 is this process, which is certainly running.
+        alive = index == 0 or process_alive(data.get('pid', 0))
+        for name, samples in data.get('metrics', {}).items():
+            metric = _registry.get(name)
+            if metric is None or (metric.kind == 'gauge' and not alive):
+                continue
+            values = merged[name]
+            for labelvalues, value in samples:
+                key = tuple(labelvalues)
+                if metric.kind == 'histogram':
+                    if len(value) != len(metric.empty()):
+                        continue  # Saved before the buckets changed.
+                    total = values.setdefault(key, metric.empty())
+                    for position, amount in enumerate(value):
+                        total[position] += amount
+                else:
+                    values[key] = values.get(key, 0.0) + value
+    return merged
+
+
+# --- PROMETHEUS TEXT FORMAT ---
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render():
+    """Every registered metric, summed over processes, in Prometheus text format."""
+    lines = []
+    merged = merged_values()
+    for name, metric in sorted(_registry.items()):
+        lines.append(f'# HELP {name} {escape(metric.documentation)}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labelvalues, value in sorted(merged[name].items()):
+            pairs = list(zip(metric.labelnames, labelvalues))
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{format_labels(pairs)} {format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, math.inf), value):
+                cumulative += count
+                bucket_labels = format_labels([*pairs, ('le', format_value(bound))])
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{format_labels(pairs)} {format_value(value[-1])}')
+            lines.append(f'{name}_count{format_labels(pairs)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- STORE METRICS ---
+
+REQUESTS = counter(
+    'store_http_requests_total', 'Requests handled, by view, method and status code.',
+    ['view', 'method', 'status'],
+)
+REQUEST_LATENCY = histogram(
+    'store_http_request_duration_seconds', 'Time to produce a response, by view.', ['view', 'method'],
+)
+REQUESTS_IN_PROGRESS = gauge('store_http_requests_in_progress', 'Requests being handled right now.')
+ORDERS_PLACED = counter('store_orders_placed_total', 'Orders placed at checkout.')
+ORDER_REVENUE = counter('store_order_revenue_total', 'Sum of total_paid over orders placed at checkout.')
+CHECKOUT_REJECTIONS = counter(
+    'store_checkout_rejections_total', 'Checkouts turned away, by reason.', ['reason'],
+)
+CART_MUTATIONS = counter(
+    'store_cart_mutations_total', 'Changes to shopping bags, by action and whether they went through.',
+    ['action', 'outcome'],
+)
+EMAILS = counter('store_emails_total', 'Emails sent or failed, by kind.', ['kind', 'outcome'])
+CACHE_EVENTS = counter('store_cache_events_total', 'Tagged cache lookups and recomputes, by event.', ['event'])
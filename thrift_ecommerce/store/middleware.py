@@ -0,0 +1,182 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.middleware.gzip import GZipMiddleware
+
+from . import metrics
+from .profiling import start_profile, stop_profile
+from .routers import PIN_COOKIE_NAME, pin_to_primary, replica_configured, unpin
+from .staticfiles import asset_response, build_asset_index, static_url_prefix
+
+slow_request_logger = logging.getLogger('store.slow_requests')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'ALTER', 'DROP')
+
+
+class ReplicaPinningMiddleware:
+    """Give clients read-your-writes consistency on top of the replica router.
+
+    Unsafe methods and clients holding a fresh pin cookie read from the
+    primary. A request that writes is pinned from its first write onwards
+    and the client is pinned for ``REPLICA_PIN_SECONDS`` so the replica has
+    time to catch up before it serves that client again.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        pinned = request.method not in SAFE_METHODS or PIN_COOKIE_NAME in request.COOKIES
+        token = pin_to_primary() if pinned else None
+        wrote = []
+
+        def track_writes(execute, sql, params, many, context):
+            if not wrote and sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+                wrote.append(pin_to_primary())
+            return execute(sql, params, many, context)
+
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(track_writes):
+                response = self.get_response(request)
+        finally:
+            for pin in reversed(wrote):
+                unpin(pin)
+            if token is not None:
+                unpin(token)
+
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE_NAME,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """Count and time every request by the name of the view that handled it.
+
+    Requests that match no URL (static files, 404s) are filed under
+    ``unmatched``, so the label set stays bounded whatever clients ask for.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.REQUESTS_IN_PROGRESS.dec()
+            match = getattr(request, 'resolver_match', None)
+            view = (match.url_name if match else None) or 'unmatched'
+            metrics.REQUEST_LATENCY.labels(view=view, method=request.method).observe(elapsed)
+            metrics.REQUESTS.labels(view=view, method=request.method, status=status).inc()
+            metrics.flush()
+
+
+class RequestProfilingMiddleware:
+    """Report request, SQL, template and cache timings as a ``Server-Timing`` header.
+
+    Only a ``PROFILING_SAMPLE_RATE`` share of requests is instrumented, which
+    keeps the overhead low enough to leave on in production. Any request
+    slower than ``SLOW_REQUEST_THRESHOLD_MS`` is logged to
+    ``store.slow_requests``, with its slowest SQL statements when sampled.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            response = self.get_response(request)
+            self.log_if_slow(request, response, time.perf_counter() - started)
+            return response
+
+        profile, token = start_profile()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_sql))
+                response = self.get_response(request)
+        finally:
+            stop_profile(token)
+
+        total = time.perf_counter() - started
+        response['Server-Timing'] = profile.server_timing(total)
+        self.log_if_slow(request, response, total, profile)
+        return response
+
+    def log_if_slow(self, request, response, total, profile=None):
+        if total * 1000 < settings.SLOW_REQUEST_THRESHOLD_MS:
+            return
+        lines = [f'Slow request: {request.method} {request.path} -> {response.status_code} in {total * 1000:.0f}ms']
+        if profile is not None:
+            lines.append(
+                f'  {profile.sql_count} queries in {profile.sql_time * 1000:.0f}ms, '
+                f'templates {profile.template_time * 1000:.0f}ms'
+            )
+            for duration, sql in profile.top_statements(settings.SLOW_REQUEST_TOP_SQL):
+                lines.append(f'  {duration * 1000:.1f}ms  {sql}')
+        slow_request_logger.warning('\n'.join(lines))
+
+
+class StaticAssetMiddleware:
+    """Serve collected static files before sessions, auth or views get involved.
+
+    On when ``SERVE_STATIC_ASSETS`` is set (production by default). The file
+    list is read from ``STATIC_ROOT`` once at startup, so restart the app
+    after ``collectstatic``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVE_STATIC_ASSETS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.assets = build_asset_index(settings.STATIC_ROOT, static_url_prefix())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD'):
+            asset = self.assets.get(request.path_info)
+            if asset is not None:
+                return asset_response(request, asset)
+        return self.get_response(request)
+
+
+class HtmlCompressionMiddleware(GZipMiddleware):
+    """Gzip HTML pages of at least ``HTML_COMPRESSION_MIN_BYTES``.
+
+    Static assets arrive precompressed and streams must flush event by
+    event, so only complete HTML responses are compressed here. Django's
+    gzip padding keeps the BREACH mitigation for pages carrying CSRF tokens.
+    """
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or not response.get('Content-Type', '').startswith('text/html')
+            or len(response.content) < settings.HTML_COMPRESSION_MIN_BYTES
+        ):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_stockreservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='checkout_key',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
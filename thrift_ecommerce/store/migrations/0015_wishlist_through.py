@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 05:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_favorites_to_wishlist(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Wishlist = apps.get_model('store', 'Wishlist')
+    Favorite = Product.favorites.through
+    # The old rows have no timestamp; treat them as added now so nobody is
+    # sent a reminder the moment this migration runs.
+    now = django.utils.timezone.now()
+    rows = (
+        Wishlist(user_id=user_id, product_id=product_id, added_at=now)
+        for user_id, product_id in Favorite.objects.values_list('user_id', 'product_id').iterator()
+    )
+    Wishlist.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def copy_wishlist_to_favorites(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Wishlist = apps.get_model('store', 'Wishlist')
+    Favorite = Product.favorites.through
+    rows = (
+        Favorite(user_id=user_id, product_id=product_id)
+        for user_id, product_id in Wishlist.objects.values_list('user_id', 'product_id').iterator()
+    )
+    Favorite.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_order_checkout_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Wishlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('added_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('reminder_sent_at', models.DateTimeField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_entries', to='store.product')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reminder_sent_at', 'added_at'], name='wishlist_reminder_scan')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'product'), name='wishlist_unique_user_product')],
+            },
+        ),
+        migrations.RunPython(copy_favorites_to_wishlist, copy_wishlist_to_favorites),
+        # Django can't add ``through`` to an existing M2M, so swap the field;
+        # the rows already live in the new table.
+        migrations.RemoveField(
+            model_name='product',
+            name='favorites',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='favorites',
+            field=models.ManyToManyField(blank=True, related_name='favorites', through='store.Wishlist', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:10
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_product_inventory_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('PRODUCT', 'Products'), ('ORDER', 'Orders')], max_length=10)),
+                ('action', models.CharField(max_length=20)),
+                ('summary', models.CharField(max_length=255)),
+                ('affected', models.PositiveIntegerField(default=0)),
+                ('snapshot', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('undone_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_operations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='bulk_operation_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Start every product's ledger at its current stock, so the quantity
+    # already equals the sum of its movements.
+    Product = apps.get_model('store', 'Product')
+    InventoryMovement = apps.get_model('store', 'InventoryMovement')
+    now = django.utils.timezone.now()
+    rows = (
+        InventoryMovement(product_id=pk, kind='ADJUSTMENT', change=quantity, note='Opening balance', created_at=now)
+        for pk, quantity in Product.objects.filter(quantity__gt=0).values_list('pk', 'quantity').iterator()
+    )
+    InventoryMovement.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_bulk_operation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SALE', 'Sale'), ('RESTOCK', 'Restock'), ('ADJUSTMENT', 'Adjustment'), ('RETURN', 'Return')], max_length=12)),
+                ('change', models.IntegerField(help_text='Units added (positive) or taken out (negative)')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inventory_movements', to='store.order')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movements', to='store.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'created_at'], name='movement_kind_time'), models.Index(fields=['product', 'created_at'], name='movement_product_time')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
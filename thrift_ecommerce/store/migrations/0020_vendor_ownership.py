@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_inventory_ledger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='vendor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders', to='store.vendorprofile'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='vendor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='store.vendorprofile'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendor', '-created_at'], name='order_vendor_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['vendor', '-created_at'], name='product_vendor_shelf'),
+        ),
+    ]
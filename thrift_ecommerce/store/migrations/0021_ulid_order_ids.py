@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:50
+
+from django.db import migrations, models, transaction
+
+import store.ids
+
+CHUNK_SIZE = 1000
+
+
+def backfill_ulids(apps, schema_editor):
+    # Give every pre-ULID order a ULID dated from its created_at, so the whole
+    # table sorts by time, and keep its old reference for lookups. Each chunk
+    # commits on its own, so a large table is never locked in one go and a
+    # rerun picks up where an interrupted one stopped.
+    Order = apps.get_model('store', 'Order')
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                Order.objects.filter(pk__gt=last_pk).order_by('pk')
+                .only('pk', 'order_id', 'legacy_order_id', 'created_at')[:CHUNK_SIZE]
+            )
+            if not chunk:
+                return
+            last_pk = chunk[-1].pk
+            changed = [order for order in chunk if not store.ids.is_ulid(order.order_id)]
+            for order in changed:
+                order.legacy_order_id = order.order_id
+                order.order_id = store.ids.new_ulid(order.created_at)
+            Order.objects.bulk_update(changed, ['order_id', 'legacy_order_id'])
+
+
+def restore_legacy_ids(apps, schema_editor):
+    Order = apps.get_model('store', 'Order')
+    Order.objects.filter(legacy_order_id__isnull=False).update(order_id=models.F('legacy_order_id'))
+
+
+class Migration(migrations.Migration):
+    # The backfill commits chunk by chunk.
+    atomic = False
+
+    dependencies = [
+        ('store', '0020_vendor_ownership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='legacy_order_id',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_id',
+            field=models.CharField(default=store.ids.new_ulid, max_length=100, unique=True),
+        ),
+        migrations.RunPython(backfill_ulids, restore_legacy_ids),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-order_id'], name='order_user_recent'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_ulid_order_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('total_paid', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('order_id', models.CharField(max_length=100, unique=True)),
+                ('legacy_order_id', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('is_completed', models.BooleanField(default=True)),
+                ('payment_date', models.DateTimeField(blank=True, null=True)),
+                ('fulfillment_method', models.CharField(choices=[('PICKUP', 'Pickup'), ('WAYBILL', 'Waybill delivery')], default='PICKUP', max_length=10)),
+                ('logistics_note', models.CharField(blank=True, max_length=255)),
+                ('receipt_channel_used', models.CharField(default='EMAIL', max_length=20)),
+                ('pre_purchase_instruction_snapshot', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='store.vendorprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='store.archivedorder')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='store.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month, UTC')),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('vendor', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales_rollups', to='store.vendorprofile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-order_id'], name='archived_order_user'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['vendor', 'month'], name='sales_rollup_vendor_month'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:40
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    # One UPDATE with correlated subqueries. trending_score stays 0 until
+    # the first recompute_trending run.
+    Product = apps.get_model('store', 'Product')
+    Wishlist = apps.get_model('store', 'Wishlist')
+    OrderItem = apps.get_model('store', 'OrderItem')
+    ArchivedOrderItem = apps.get_model('store', 'ArchivedOrderItem')
+
+    def total(queryset, aggregate):
+        return Coalesce(
+            models.Subquery(
+                queryset.filter(product=models.OuterRef('pk')).order_by()
+                .values('product').annotate(total=aggregate).values('total')
+            ),
+            0,
+        )
+
+    Product.objects.update(
+        favorites_count=total(Wishlist.objects.all(), models.Count('pk')),
+        units_sold=total(OrderItem.objects.all(), models.Sum('quantity'))
+        + total(ArchivedOrderItem.objects.all(), models.Sum('quantity')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0022_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='trending_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='units_sold',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['trending_score'], name='product_trending'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['favorites_count'], name='product_favorites'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['units_sold'], name='product_units_sold'),
+        ),
+    ]
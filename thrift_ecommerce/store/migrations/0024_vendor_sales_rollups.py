@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:10
+
+from datetime import timezone as dt_timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def month_of(field):
+    return TruncMonth(field, tzinfo=dt_timezone.utc)
+
+
+def rebuild_rollups(apps, schema_editor):
+    # Rollups used to file a mixed-vendor order under no vendor, so vendors
+    # lost their share of it. The archive keeps every line, so rebuild all
+    # rows: platform totals without a vendor, each vendor's share from its lines.
+    ArchivedOrder = apps.get_model('store', 'ArchivedOrder')
+    ArchivedOrderItem = apps.get_model('store', 'ArchivedOrderItem')
+    SalesRollup = apps.get_model('store', 'SalesRollup')
+    line_total = models.ExpressionWrapper(
+        models.F('price') * models.F('quantity'), output_field=models.DecimalField(max_digits=14, decimal_places=2)
+    )
+    platform = (
+        ArchivedOrder.objects.annotate(month=month_of('created_at')).values('month')
+        .annotate(orders=models.Count('pk'), total=models.Sum('total_paid')).order_by()
+    )
+    vendors = (
+        ArchivedOrderItem.objects.filter(product__vendor__isnull=False)
+        .annotate(month=month_of('order__created_at')).values('month', 'product__vendor')
+        .annotate(orders=models.Count('order', distinct=True), total=models.Sum(line_total)).order_by()
+    )
+    SalesRollup.objects.all().delete()
+    SalesRollup.objects.bulk_create(
+        [SalesRollup(month=row['month'].date(), vendor_id=None, orders=row['orders'], total_paid=row['total']) for row in platform]
+        + [
+            SalesRollup(month=row['month'].date(), vendor_id=row['product__vendor'], orders=row['orders'], total_paid=row['total'])
+            for row in vendors
+        ]
+    )
+
+
+def restore_order_vendor_rollups(apps, schema_editor):
+    # The earlier layout: one row per month and order vendor, summing to the platform total.
+    ArchivedOrder = apps.get_model('store', 'ArchivedOrder')
+    SalesRollup = apps.get_model('store', 'SalesRollup')
+    rows = (
+        ArchivedOrder.objects.annotate(month=month_of('created_at')).values('month', 'vendor')
+        .annotate(orders=models.Count('pk'), total=models.Sum('total_paid')).order_by()
+    )
+    SalesRollup.objects.all().delete()
+    SalesRollup.objects.bulk_create(
+        SalesRollup(month=row['month'].date(), vendor_id=row['vendor'], orders=row['orders'], total_paid=row['total'])
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0023_product_popularity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='salesrollup',
+            name='vendor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='store.vendorprofile'),
+        ),
+        migrations.RunPython(rebuild_rollups, restore_order_vendor_rollups),
+    ]
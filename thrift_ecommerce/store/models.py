@@ -1,9 +1,17 @@
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 from django.utils.text import slugify
 from django.db.utils import OperationalError, ProgrammingError
 
+from .cache import cached, model_tag
+from .ids import new_ulid
+
 # --- EDITABLE CONFIGURATION ---
 # To add/remove sizes, simply update these lists.
 SIZE_CHOICES = (
@@ -70,10 +78,11 @@ class StoreSettings(models.Model):
         while migrations are being applied.
         """
         try:
-            obj, created = cls.objects.get_or_create(pk=1)
+            # Read on every page by the context processor, so served from the
+            # tagged cache until the row is saved.
+            return cached('store-settings', lambda: cls.objects.get_or_create(pk=1)[0], tags=[model_tag(cls)])
         except (OperationalError, ProgrammingError):
             return cls(pk=1)
-        return obj
 
 # --- 2. CUSTOM USER MODEL ---
 class User(AbstractUser):
@@ -106,15 +115,46 @@ class VendorProfile(models.Model):
     def save(self, *args, **kwargs):
         if not self.storefront_slug:
             base_slug = slugify(self.business_name) or slugify(self.user.username) or f"vendor-{self.user_id}"
+            # Every slug this one could collide with, in one query.
+            taken = set(
+                VendorProfile.objects.filter(storefront_slug__startswith=base_slug)
+                .exclude(pk=self.pk).values_list('storefront_slug', flat=True)
+            )
             slug = base_slug
             counter = 1
-            while VendorProfile.objects.filter(storefront_slug=slug).exclude(pk=self.pk).exists():
+            while slug in taken:
                 counter += 1
                 slug = f"{base_slug}-{counter}"
             self.storefront_slug = slug
         super().save(*args, **kwargs)
 
 # --- 3. PRODUCT MODEL ---
+class ProductQuerySet(models.QuerySet):
+    def with_favorite_flag(self, user):
+        """Annotate ``is_favorited`` for ``user`` so product grids don't query favorites per card."""
+        if not user.is_authenticated:
+            return self.annotate(is_favorited=models.Value(False, output_field=models.BooleanField()))
+        favorited = Wishlist.objects.filter(product=models.OuterRef('pk'), user=user)
+        return self.annotate(is_favorited=models.Exists(favorited))
+
+    def for_vendor(self, vendor):
+        """Only ``vendor``'s products; every product when ``vendor`` is None."""
+        return self if vendor is None else self.filter(vendor=vendor)
+
+    def with_available_stock(self):
+        """Annotate ``available_stock``: units in stock minus active bag holds."""
+        held = (
+            StockReservation.objects.active()
+            .filter(product=models.OuterRef('pk'))
+            .values('product')
+            .annotate(total=models.Sum('quantity'))
+            .values('total')
+        )
+        return self.annotate(
+            available_stock=models.F('quantity') - Coalesce(models.Subquery(held), 0)
+        )
+
+
 class Product(models.Model):
     # Core Info
     name = models.CharField(max_length=200)
@@ -136,9 +176,44 @@ class Product(models.Model):
     size = models.CharField(max_length=10, choices=SIZE_CHOICES) # Increased max_length for safety
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='DRESS')
     
+    # Listings without a vendor belong to the platform itself. The
+    # product_vendor_shelf index leads with vendor, so no separate FK index.
+    vendor = models.ForeignKey(
+        VendorProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='products', db_index=False
+    )
+
+    # Popularity, kept on the row so "trending" and "most wanted" sort on an
+    # index. The counters move with F() at favorite and checkout time;
+    # recompute_trending refreshes the score and repairs any counter drift.
+    # None of these touch updated_at: they aren't part of cards or API payloads.
+    favorites_count = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    trending_score = models.FloatField(default=0)
+
     # Meta
-    favorites = models.ManyToManyField(User, related_name="favorites", blank=True)
+    favorites = models.ManyToManyField(User, related_name="favorites", blank=True, through='Wishlist')
     created_at = models.DateTimeField(auto_now_add=True)
+    # Drives the catalog changes feed; QuerySet.update() callers must set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='product_updated_seq'),
+            # Studio inventory sorting and the low-stock filter.
+            models.Index(fields=['created_at'], name='product_created'),
+            models.Index(fields=['name'], name='product_name'),
+            models.Index(fields=['price'], name='product_price'),
+            models.Index(fields=['quantity'], name='product_quantity'),
+            # A storefront's shelf, newest first, without reading other vendors'
+            # rows. is_available stays out: SQLite can't seek on a bare boolean.
+            models.Index(fields=['vendor', '-created_at'], name='product_vendor_shelf'),
+            # Catalog and studio popularity sorts.
+            models.Index(fields=['trending_score'], name='product_trending'),
+            models.Index(fields=['favorites_count'], name='product_favorites'),
+            models.Index(fields=['units_sold'], name='product_units_sold'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.size})"
@@ -157,9 +232,47 @@ class Product(models.Model):
         """Auto-disable availability if quantity hits zero."""
         if self.quantity == 0:
             self.is_available = False
+        # Partial saves (stock changes at checkout) still count as changes.
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'updated_at']
         super().save(*args, **kwargs)
 
 
+class ProductTombstone(models.Model):
+    """Marks a deleted product so the changes feed can tell clients to drop it."""
+    product_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_seq'),
+        ]
+
+
+class Wishlist(models.Model):
+    """A shopper's favorite, kept as the through model of ``Product.favorites``.
+
+    ``added_at`` and ``reminder_sent_at`` let ``send_reminders`` find old,
+    un-reminded favorites with an index range scan.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wishlist_entries')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='wishlist_entries')
+    added_at = models.DateTimeField(default=timezone.now)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='wishlist_unique_user_product'),
+        ]
+        indexes = [
+            models.Index(fields=['reminder_sent_at', 'added_at'], name='wishlist_reminder_scan'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} ♡ {self.product}"
+
+
 class PromoCode(models.Model):
     code = models.CharField(max_length=20, unique=True)
     discount_percentage = models.PositiveIntegerField(help_text="e.g., 10 for 10% off")
@@ -199,7 +312,56 @@ class CartItem(models.Model):
     def get_total(self):
         return self.product.price * self.quantity
 
+
+class StockReservationQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class StockReservation(models.Model):
+    """Units of a product held for a bag item until ``expires_at``.
+
+    Holds are taken when an item enters the bag, released when it leaves,
+    converted at checkout and swept once expired (``expire_reservations``).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    cart_item = models.OneToOneField(CartItem, on_delete=models.CASCADE, related_name='reservation')
+    quantity = models.PositiveIntegerField(default=1)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StockReservationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Available stock sums a product's unexpired holds.
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_expiry'),
+            # The sweeper scans for expired holds across all products.
+            models.Index(fields=['expires_at'], name='reservation_expiry'),
+        ]
+
+    @property
+    def is_active(self):
+        return self.expires_at > timezone.now()
+
 # --- 5. ORDER & ITEMS ---
+class OrderQuerySet(models.QuerySet):
+    def for_vendor(self, vendor):
+        """Orders with a line of ``vendor``'s; every order when ``vendor`` is None.
+
+        A mixed cart's order has no ``vendor`` but still belongs to each
+        vendor it sold for, as its sales do.
+        """
+        if vendor is None:
+            return self
+        lines = OrderItem.objects.filter(order=models.OuterRef('pk'), product__vendor=vendor)
+        # Order.vendor too, for single-vendor orders whose products were since deleted.
+        return self.filter(models.Q(vendor=vendor) | models.Exists(lines))
+
+
 class Order(models.Model):
     FULFILLMENT_CHOICES = (
         ('PICKUP', 'Pickup'),
@@ -209,16 +371,164 @@ class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
     created_at = models.DateTimeField(auto_now_add=True)
     total_paid = models.DecimalField(max_digits=12, decimal_places=2)
-    order_id = models.CharField(max_length=100, unique=True)
+    # A ULID (store.ids): unique, time-ordered, and the cursor order history pages on.
+    order_id = models.CharField(max_length=100, unique=True, default=new_ulid)
+    # The random reference orders had before ULIDs, still printed on old
+    # receipts and invoice links.
+    legacy_order_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
     is_completed = models.BooleanField(default=False)
     payment_date = models.DateTimeField(null=True, blank=True)
     fulfillment_method = models.CharField(max_length=10, choices=FULFILLMENT_CHOICES, default='PICKUP')
     logistics_note = models.CharField(max_length=255, blank=True)
     receipt_channel_used = models.CharField(max_length=20, default='EMAIL')
     pre_purchase_instruction_snapshot = models.TextField(blank=True)
+    # Idempotency key issued with the cart page; a repeated checkout with the
+    # same key returns this order instead of placing another.
+    checkout_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Set when every item came from one vendor; orders mixing vendors stay with
+    # the platform. Indexed through order_vendor_recent.
+    vendor = models.ForeignKey(
+        VendorProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders', db_index=False
+    )
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A vendor's recent orders, and the range its sales figures scan.
+            models.Index(fields=['vendor', '-created_at'], name='order_vendor_recent'),
+            # A shopper's order history, paged by order_id.
+            models.Index(fields=['user', '-order_id'], name='order_user_recent'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     price = models.DecimalField(max_digits=12, decimal_places=2)
     quantity = models.PositiveIntegerField(default=1)
+
+
+# --- 6. INVENTORY LEDGER ---
+class InventoryMovement(models.Model):
+    """One change to a product's stock. Rows are only ever added, never edited.
+
+    ``Product.quantity`` is the running sum of a product's movements, kept in
+    step by ``store.inventory`` and checked by ``reconcile_inventory``.
+    """
+    KIND_CHOICES = (
+        ('SALE', 'Sale'),
+        ('RESTOCK', 'Restock'),
+        ('ADJUSTMENT', 'Adjustment'),
+        ('RETURN', 'Return'),
+    )
+
+    # SET_NULL, like OrderItem, so deleting a listing keeps its sales history.
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='movements')
+    kind = models.CharField(max_length=12, choices=KIND_CHOICES)
+    change = models.IntegerField(help_text="Units added (positive) or taken out (negative)")
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='inventory_movements')
+    note = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Stock analytics: range scans over one kind of movement by time.
+            models.Index(fields=['kind', 'created_at'], name='movement_kind_time'),
+            # One product's history, and the reconciliation sums.
+            models.Index(fields=['product', 'created_at'], name='movement_product_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.change:+d} ({self.product_id})"
+
+
+# --- 7. STUDIO BULK ACTIONS ---
+class BulkOperation(models.Model):
+    """A studio bulk action, with the values it overwrote so it can be undone for a while."""
+    TARGET_CHOICES = (
+        ('PRODUCT', 'Products'),
+        ('ORDER', 'Orders'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='bulk_operations')
+    target = models.CharField(max_length=10, choices=TARGET_CHOICES)
+    action = models.CharField(max_length=20)
+    summary = models.CharField(max_length=255)
+    affected = models.PositiveIntegerField(default=0)
+    # Changed columns per row as they were before the action; deletes keep whole rows.
+    snapshot = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    undone_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='bulk_operation_created'),
+        ]
+
+    def __str__(self):
+        return self.summary
+
+    @property
+    def undo_deadline(self):
+        return self.created_at + timedelta(seconds=settings.BULK_UNDO_WINDOW_SECONDS)
+
+    @property
+    def can_undo(self):
+        return self.undone_at is None and timezone.now() < self.undo_deadline
+
+# --- 8. ORDER ARCHIVE ---
+class ArchivedOrder(models.Model):
+    """A paid order moved out of ``Order`` by ``archive_orders``; same id, same reference."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    created_at = models.DateTimeField()
+    total_paid = models.DecimalField(max_digits=12, decimal_places=2)
+    order_id = models.CharField(max_length=100, unique=True)
+    legacy_order_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    is_completed = models.BooleanField(default=True)
+    payment_date = models.DateTimeField(null=True, blank=True)
+    fulfillment_method = models.CharField(max_length=10, choices=Order.FULFILLMENT_CHOICES, default='PICKUP')
+    logistics_note = models.CharField(max_length=255, blank=True)
+    receipt_channel_used = models.CharField(max_length=20, default='EMAIL')
+    pre_purchase_instruction_snapshot = models.TextField(blank=True)
+    vendor = models.ForeignKey(
+        VendorProfile, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_orders', db_index=False
+    )
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Order history continues into the archive by order_id.
+            models.Index(fields=['user', '-order_id'], name='archived_order_user'),
+        ]
+
+    def __str__(self):
+        return self.order_id
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='+')
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+
+
+class SalesRollup(models.Model):
+    """Paid orders and revenue per month for orders that were archived.
+
+    Rows without a vendor hold the platform's totals; a vendor's rows hold
+    its share, from its own lines, so one mixed-vendor order counts for
+    each vendor in it. Studio analytics add these to what they count in
+    ``Order``, so archiving moves no total.
+    """
+    month = models.DateField(help_text="First day of the month, UTC")
+    # CASCADE: a deleted vendor's share must not fold into the platform rows.
+    vendor = models.ForeignKey(
+        VendorProfile, on_delete=models.CASCADE, null=True, blank=True, related_name='sales_rollups', db_index=False
+    )
+    orders = models.PositiveIntegerField(default=0)
+    total_paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'month'], name='sales_rollup_vendor_month'),
+        ]
@@ -0,0 +1,89 @@
+import heapq
+import time
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates
+
+_current_profile = ContextVar('store_request_profile', default=None)
+
+
+class RequestProfile:
+    """Timings collected for one sampled request."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = []
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += duration
+            self.statements.append((duration, sql))
+
+    def top_statements(self, limit):
+        return heapq.nlargest(limit, self.statements, key=lambda statement: statement[0])
+
+    def server_timing(self, total):
+        metrics = [
+            f'total;dur={total * 1000:.1f}',
+            f'sql;desc="{self.sql_count} queries";dur={self.sql_time * 1000:.1f}',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ]
+        return ', '.join(metrics)
+
+
+def start_profile():
+    profile = RequestProfile()
+    return profile, _current_profile.set(profile)
+
+
+def stop_profile(token):
+    _current_profile.reset(token)
+
+
+def record_cache_access(hit):
+    """Count a cache lookup against the current request, if it is being profiled."""
+    profile = _current_profile.get()
+    if profile is None:
+        return
+    if hit:
+        profile.cache_hits += 1
+    else:
+        profile.cache_misses += 1
+
+
+class ProfiledTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+
+class ProfiledDjangoTemplates(DjangoTemplates):
+    """Django template backend that reports render time to the request profile."""
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name))
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Product, StockReservation
+
+
+def available_stock(product, exclude_cart_item=None):
+    """Units of ``product`` not held by any active reservation.
+
+    ``exclude_cart_item`` leaves that item's own hold out of the count, so a
+    bag can check how far it may grow.
+    """
+    holds = StockReservation.objects.active().filter(product=product)
+    if exclude_cart_item is not None:
+        holds = holds.exclude(cart_item=exclude_cart_item)
+    held = holds.aggregate(total=Sum('quantity'))['total'] or 0
+    return product.quantity - held
+
+
+def reserve_stock(cart_item, quantity):
+    """Hold ``quantity`` units for ``cart_item`` for ``STOCK_RESERVATION_TTL_SECONDS``.
+
+    Returns False, leaving any existing hold untouched, when the units are
+    not free.
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=cart_item.product_id)
+        if not product.is_available or available_stock(product, exclude_cart_item=cart_item) < quantity:
+            return False
+        StockReservation.objects.update_or_create(
+            cart_item=cart_item,
+            defaults={
+                'product': product,
+                'quantity': quantity,
+                'expires_at': timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL_SECONDS),
+            },
+        )
+    return True
+
+
+def shrink_reservation(cart_item, quantity):
+    """Release units from a hold without extending it."""
+    StockReservation.objects.filter(cart_item=cart_item).update(quantity=quantity)
+
+
+def holds_cover(cart_item):
+    """True when ``cart_item`` has an unexpired hold for its full quantity."""
+    reservation = getattr(cart_item, 'reservation', None)
+    return reservation is not None and reservation.is_active and reservation.quantity >= cart_item.quantity
+
+
+def expire_reservations(batch_size=500):
+    """Delete expired holds in batches; returns how many were removed."""
+    removed = 0
+    while True:
+        batch = list(StockReservation.objects.expired().values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return removed
+        removed += StockReservation.objects.filter(pk__in=batch).delete()[0]
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+PIN_COOKIE_NAME = 'db_primary_pin'
+
+# Per-request routing state: ``_pinned`` forces every read onto the primary,
+# ``_replica_block`` opts a block of analytics reads into the replica.
+_pinned = ContextVar('store_db_pinned', default=False)
+_replica_block = ContextVar('store_db_replica_block', default=False)
+
+
+def replica_configured():
+    if REPLICA_DB_ALIAS not in connections.settings:
+        return False
+    # A replica pointing at the primary's own database (as test mirrors do)
+    # adds nothing, and under test would read outside the test transaction.
+    replica_name = connections[REPLICA_DB_ALIAS].settings_dict['NAME']
+    return replica_name != connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+
+def pin_to_primary():
+    """Send the rest of this request's reads to the primary database."""
+    return _pinned.set(True)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+def is_pinned():
+    return _pinned.get()
+
+
+@contextmanager
+def read_from_replica():
+    """Route every read inside the block to the replica.
+
+    Used for analytics aggregates that tolerate a little lag but would
+    otherwise compete with checkout on the primary.
+    """
+    token = _replica_block.set(True)
+    try:
+        yield
+    finally:
+        _replica_block.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send catalog reads to the replica and everything else to the primary.
+
+    Cart, checkout and order reads always use the primary. Once a request
+    writes anything ``ReplicaPinningMiddleware`` pins it to the primary for
+    the rest of the request and keeps the client pinned for
+    ``REPLICA_PIN_SECONDS`` so replica lag never hides its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _pinned.get() or not replica_configured():
+            return DEFAULT_DB_ALIAS
+        if _replica_block.get() or model._meta.label_lower in settings.REPLICA_READ_MODELS:
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes from the primary, not from migrate.
+        return db != REPLICA_DB_ALIAS
@@ -0,0 +1,35 @@
+"""Housekeeping for server-side sessions.
+
+Django's ``clearsessions`` removes every expired row with one ``DELETE``;
+``purge_expired_sessions`` does the same work in batches of primary keys.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.utils import timezone
+
+
+def purge_expired_sessions(batch_size=500):
+    """Delete expired sessions in batches; returns how many were removed.
+
+    Small batches keep each DELETE short, so a backlog of expired rows
+    never holds the database's write lock against checkout for long.
+    Engines that keep no rows (signed cookies, plain cache) clean up after
+    themselves and are handed to their own ``clear_expired``.
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    if not issubclass(engine.SessionStore, DatabaseSessionStore):
+        engine.SessionStore.clear_expired()
+        return 0
+
+    Session = engine.SessionStore.get_model_class()
+    removed = 0
+    while True:
+        batch = list(
+            Session.objects.filter(expire_date__lt=timezone.now())
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not batch:
+            return removed
+        removed += Session.objects.filter(session_key__in=batch).delete()[0]
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .api import product_cache_key
+from .cache import invalidate_models, invalidate_tags, vendor_tag
+from .events import publish_stock_change
+from .models import InventoryMovement, Order, OrderItem, Product, ProductTombstone, StoreSettings
+
+
+# Only save() and delete() send these signals; code that changes products
+# with QuerySet.update() must clear the cached payloads itself.
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog_cache(sender, instance, **kwargs):
+    cache.delete(product_cache_key(instance.pk))
+
+
+# Entries in the tagged cache that read these models go stale with any
+# save or delete, on every worker sharing the cache.
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=StoreSettings)
+@receiver([post_save, post_delete], sender=InventoryMovement)
+def invalidate_model_tag(sender, **kwargs):
+    invalidate_models(sender)
+
+
+# Storefronts and vendor studios cache per vendor, so a vendor's change
+# leaves every other vendor's entries alone.
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_vendor_tag(sender, instance, **kwargs):
+    if instance.vendor_id is not None:
+        invalidate_tags(vendor_tag(instance.vendor_id))
+
+
+# A mixed-vendor order has no vendor of its own but counts in the sales of
+# every vendor with a line in it. At checkout the order has no lines yet;
+# the product saves that follow bump those vendors instead.
+@receiver(post_save, sender=Order)
+def invalidate_line_vendor_tags(sender, instance, created, **kwargs):
+    if instance.vendor_id is None and not created:
+        vendor_ids = (
+            OrderItem.objects.filter(order=instance, product__vendor__isnull=False)
+            .values_list('product__vendor', flat=True).distinct()
+        )
+        invalidate_tags(*(vendor_tag(vendor_id) for vendor_id in vendor_ids))
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductTombstone.objects.update_or_create(
+        product_id=instance.pk, defaults={'deleted_at': timezone.now()}
+    )
+
+
+# Checkout, quick edit and the availability toggle all save the product, so
+# product pages and bags watching it hear about the change from here.
+@receiver(post_save, sender=Product)
+def announce_stock_change(sender, instance, **kwargs):
+    publish_stock_change(instance.pk, instance.quantity, instance.is_available)
+
+
+@receiver(post_delete, sender=Product)
+def announce_product_removed(sender, instance, **kwargs):
+    publish_stock_change(instance.pk, 0, False)
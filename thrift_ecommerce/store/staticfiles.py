@@ -0,0 +1,118 @@
+"""Production static files: hashed names, precompressed variants, app serving.
+
+``collectstatic`` with ``CompressedManifestStaticFilesStorage`` writes each
+asset under a content-hashed name and, for text assets, ``.gz`` and ``.br``
+siblings. ``StaticAssetMiddleware`` serves that tree straight from the app
+process, picking the smallest variant the client accepts, and marks hashed
+files ``immutable`` since their content can never change under that name.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import re
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are written.
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html', '.ico')
+# Below this, compression saves less than the extra headers cost.
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Unhashed names can change content on the next deploy, so keep them short.
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+
+# Preferred first: brotli is smaller, gzip is understood everywhere.
+ENCODINGS = (('br', '.br', re.compile(r'\bbr\b')), ('gzip', '.gz', re.compile(r'\bgzip\b')))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest hashing, plus ``.gz`` and ``.br`` copies written during ``collectstatic``."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and not isinstance(processed, Exception):
+                self.compress(name)
+                self.compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['.br'] = brotli.compress(data)
+        for suffix, compressed in variants.items():
+            if len(compressed) >= len(data):
+                continue
+            # Overwrite in place; save() would pick a new name if one exists.
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+
+
+class StaticAsset:
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.variants = {
+            encoding: path + suffix for encoding, suffix, pattern in ENCODINGS if os.path.exists(path + suffix)
+        }
+
+    def choose(self, accept_encoding):
+        """The file to send and its ``Content-Encoding`` (None for the original)."""
+        for encoding, suffix, pattern in ENCODINGS:
+            if encoding in self.variants and pattern.search(accept_encoding):
+                return self.variants[encoding], encoding
+        return self.path, None
+
+
+def build_asset_index(root, url_prefix):
+    """Map URL paths to the collected files under ``root``, read once at startup."""
+    hashed = set()
+    manifest_path = os.path.join(root, ManifestStaticFilesStorage.manifest_name)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as fh:
+            hashed = set(json.load(fh).get('paths', {}).values())
+
+    index = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        present = set(filenames)
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')) and filename[:-3] in present:
+                continue
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            index[url_prefix + name] = StaticAsset(path, immutable=name in hashed)
+    return index
+
+
+def asset_response(request, asset):
+    path, encoding = asset.choose(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    response = FileResponse(open(path, 'rb'), content_type=asset.content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if asset.variants:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.immutable else MUTABLE_CACHE_CONTROL
+    response.headers['Last-Modified'] = http_date(os.stat(asset.path).st_mtime)
+    return response
+
+
+def static_url_prefix():
+    return urlparse(settings.STATIC_URL).path
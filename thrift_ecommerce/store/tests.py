@@ -1,17 +1,74 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+from importlib import import_module
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 from unittest.mock import patch
 
+from django.apps import apps as django_apps
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.db.utils import OperationalError
 
-from .models import Cart, CartItem, Order, Product, StoreSettings
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, BulkOperation, Cart, CartItem, InventoryMovement, Order, OrderItem, Product, ProductTombstone, StockReservation,
+    StoreSettings, VendorProfile, Wishlist,
+)
+from .cache import cache_stats, cached, entry_key, invalidate_tags, lock_key, model_tag, reset_cache_stats, vendor_tag
+from .cards import render_cards
+from .ids import is_ulid, new_ulid, ulid_time
+from . import trending
+from . import metrics
+from .inventory import record_movement, save_product, units_sold_by_week
+from .reservations import available_stock
+from .events import StockBroker, broker as stock_broker
+from .middleware import StaticAssetMiddleware
+from .routers import PIN_COOKIE_NAME, PrimaryReplicaRouter, pin_to_primary, read_from_replica, replica_configured, unpin
+from .views import sales_analytics
+
+
+def gif_upload():
+    return SimpleUploadedFile(
+        "product.gif",
+        b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;",
+        content_type="image/gif",
+    )
+
+
+def use_temporary_media_root(test):
+    """Point MEDIA_ROOT at a directory removed after ``test``, so uploads stay out of the project."""
+    media_root = tempfile.TemporaryDirectory()
+    test.addCleanup(media_root.cleanup)
+    overrides = override_settings(MEDIA_ROOT=media_root.name)
+    overrides.enable()
+    test.addCleanup(overrides.disable)
+    return media_root.name
 
 
 class CheckoutWorkflowTests(TestCase):
     def setUp(self):
+        use_temporary_media_root(self)
         self.user = get_user_model().objects.create_user(
             email="buyer@example.com",
             username="buyer",
@@ -19,20 +76,13 @@ class CheckoutWorkflowTests(TestCase):
         )
         self.client.login(username="buyer@example.com", password="pass1234")
 
-    def _image(self):
-        return SimpleUploadedFile(
-            "product.gif",
-            b"GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;",
-            content_type="image/gif",
-        )
-
     def _product(self, quantity=2):
         return Product.objects.create(
             name="Vintage Dress",
             price=Decimal("12500.00"),
             quantity=quantity,
             is_available=True,
-            image=self._image(),
+            image=gif_upload(),
             size="M",
             category="DRESS",
         )
@@ -78,6 +128,40 @@ class CheckoutWorkflowTests(TestCase):
         self.assertEqual(product.quantity, 1)
         self.assertFalse(CartItem.objects.filter(cart=cart).exists())
 
+    def test_repeated_checkout_key_places_one_order(self):
+        product = self._product(quantity=3)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+        url = reverse("complete_purchase") + "?checkout_key=bag-123"
+
+        first = self.client.get(url)
+        # The payment callback firing twice, or a refresh, replays the request.
+        CartItem.objects.create(cart=cart, product=product, quantity=1)
+        second = self.client.get(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        order = Order.objects.get(user=self.user)
+        self.assertEqual(order.checkout_key, "bag-123")
+        self.assertEqual(second.context["order"], order)
+        self.assertEqual(len(mail.outbox), 1)
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 2)
+
+    def test_duplicate_waiting_on_the_cart_lock_returns_the_placed_order(self):
+        cart = Cart.objects.create(user=self.user)
+        order = Order.objects.create(user=self.user, total_paid=Decimal("12500.00"), is_completed=True, checkout_key="bag-456")
+        # The first request placed the order (and emptied the bag) while this
+        # one was past its first lookup and waiting for the cart lock.
+        with patch("store.views.placed_order", side_effect=[None, order]) as lookups:
+            response = self.client.get(reverse("complete_purchase") + "?checkout_key=bag-456")
+
+        self.assertEqual(lookups.call_count, 2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["order"], order)
+        self.assertFalse(CartItem.objects.filter(cart=cart).exists())
+        self.assertEqual(Order.objects.count(), 1)
+
 
 class StoreSettingsLoadTests(TestCase):
     def test_load_returns_default_instance_when_schema_is_behind(self):
@@ -86,3 +170,1619 @@ class StoreSettingsLoadTests(TestCase):
 
         self.assertEqual(settings_obj.pk, 1)
         self.assertEqual(settings_obj.store_name, "ThriftElegance")
+
+
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        for target in ("store.routers.replica_configured", "store.middleware.replica_configured"):
+            patcher = patch(target, return_value=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_catalog_reads_use_replica_and_cart_reads_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), "replica")
+        self.assertEqual(self.router.db_for_read(Cart), "default")
+        self.assertEqual(self.router.db_for_read(Order), "default")
+        self.assertEqual(self.router.db_for_write(Product), "default")
+
+    def test_analytics_block_and_pin_override_routing(self):
+        with read_from_replica():
+            self.assertEqual(self.router.db_for_read(Order), "replica")
+
+        token = pin_to_primary()
+        try:
+            with read_from_replica():
+                self.assertEqual(self.router.db_for_read(Product), "default")
+        finally:
+            unpin(token)
+
+    def test_writing_request_pins_client_to_primary(self):
+        user = get_user_model().objects.create_user(
+            email="pin@example.com", username="pin", password="pass1234"
+        )
+        self.client.force_login(user)
+
+        response = self.client.post(
+            reverse("cart"), {"form_type": "fulfillment", "fulfillment_method": "PICKUP"}
+        )
+
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]["max-age"], settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaDatabaseTests(TestCase):
+    """Routing against a real second database, holding different rows from the primary."""
+
+    # Resolved when the class is set up, after the replica alias is attached.
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        # Attached before the test transactions open: SQLite can't create
+        # tables inside one.
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        configured = connections.configure_settings({
+            "default": dict(connections.settings["default"]),
+            "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": f"{cls.replica_dir.name}/replica.sqlite3"},
+        })
+        connections.settings["replica"] = configured["replica"]
+        with connections["replica"].schema_editor() as editor:
+            # Product's foreign keys need their tables there too.
+            for model in (get_user_model(), VendorProfile, Product):
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        cache.clear()
+        fields = {"price": Decimal("5000.00"), "quantity": 1, "image": "products/1.png", "size": "M", "category": "TOP"}
+        self.product = Product.objects.create(name="Primary Tee", **fields)
+        # The same row as the replica last saw it, before a rename reached it.
+        Product.objects.using("replica").bulk_create([Product(pk=self.product.pk, name="Replica Tee", **fields)])
+
+    def test_catalog_reads_come_from_the_replica_unless_pinned(self):
+        self.assertTrue(replica_configured())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).name, "Replica Tee")
+        self.assertEqual(Cart.objects.count(), 0)  # The replica has no cart table.
+
+        token = pin_to_primary()
+        try:
+            self.assertEqual(Product.objects.get(pk=self.product.pk).name, "Primary Tee")
+        finally:
+            unpin(token)
+
+    def test_a_writing_client_reads_its_own_writes(self):
+        url = reverse("api_v1_product", args=[self.product.pk])
+        self.assertEqual(self.client.get(url).json()["data"]["name"], "Replica Tee")
+
+        user = get_user_model().objects.create_user(email="pinned@example.com", username="pinned", password="pass1234")
+        self.client.force_login(user)
+        self.client.post(reverse("cart"), {"form_type": "fulfillment", "fulfillment_method": "PICKUP"})
+        cache.clear()
+
+        self.assertIn(PIN_COOKIE_NAME, self.client.cookies)
+        self.assertEqual(self.client.get(url).json()["data"]["name"], "Primary Tee")
+
+
+    def test_toggling_availability_never_writes_back_replica_stock(self):
+        # Checkout has sold three units on the primary; the replica still has five.
+        Product.objects.filter(pk=self.product.pk).update(quantity=2)
+        Product.objects.using("replica").filter(pk=self.product.pk).update(quantity=5)
+        owner = get_user_model().objects.create_user(
+            email="studio@example.com", username="studio", password="pass1234", is_staff=True
+        )
+        self.client.force_login(owner)
+        url = reverse("toggle_availability", args=[self.product.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.client.post(url)
+
+        product = Product.objects.using("default").get(pk=self.product.pk)
+        self.assertFalse(product.is_available)
+        self.assertEqual(product.quantity, 2)
+
+class BenchCommandTests(TestCase):
+    def test_seed_bench_and_bench_report_per_view_metrics(self):
+        call_command(
+            "seed_bench", users=3, products=12, orders=4, carts=2, stdout=StringIO()
+        )
+        self.assertEqual(Product.objects.count(), 12)
+        self.assertEqual(Order.objects.count(), 4)
+
+        out = StringIO()
+        call_command("bench", iterations=2, warmup=0, only=["landing", "cart"], stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report["views"]), {"/", "/cart/"})
+        for result in report["views"].values():
+            self.assertEqual(result["status"], 200)
+            self.assertGreater(result["queries"], 0)
+            for metric in ("p50_ms", "p95_ms", "sql_ms", "peak_memory_kb"):
+                self.assertIn(metric, result)
+
+
+# Query budgets per view. Each view is loaded with 1, 10 and 100 rows of its
+# fixture and must issue the same number of queries every time, never more
+# than ``max_queries``.
+QUERY_BUDGETS = {
+    "landing": {"fixtures": ["products"], "max_queries": 4},
+    "dashboard": {"fixtures": ["products", "favorites"], "max_queries": 4},
+    "product_detail": {"fixtures": ["products", "favorites"], "max_queries": 5, "args": "product"},
+    "wishlist_view": {"fixtures": ["products", "favorites"], "max_queries": 4},
+    "cart": {"fixtures": ["products", "cart_items"], "max_queries": 6},
+    "order_history": {"fixtures": ["products", "orders"], "max_queries": 6},
+    "download_invoice": {"fixtures": ["products", "orders"], "max_queries": 6, "args": "order"},
+    "owner_dashboard": {"fixtures": ["products", "orders"], "max_queries": 23},
+    "owner_inventory": {"fixtures": ["products"], "max_queries": 5},
+    "storefront": {"fixtures": ["products", "vendor"], "max_queries": 5, "args": "vendor"},
+}
+
+
+def normalize_sql(sql):
+    """Replace literals so repeated statements differing only by id compare equal."""
+    return re.sub(r"'[^']*'|\b\d+\b", "?", sql)
+
+
+def repeated_sql_diff(small, large):
+    """Describe statements that ran more often against the larger fixture."""
+    before = Counter(normalize_sql(query["sql"]) for query in small)
+    after = Counter(normalize_sql(query["sql"]) for query in large)
+    return "\n".join(
+        f"  {before[sql]} -> {count}: {sql}"
+        for sql, count in after.most_common()
+        if count > before[sql]
+    )
+
+
+# Budgets count the views' own queries, so sessions come from the cache as
+# they do in production with DJANGO_REDIS_URL set.
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+class QueryBudgetTests(TestCase):
+    sizes = (1, 10, 100)
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="budget@example.com", username="budget", password="pass1234",
+            preferred_size="M", is_staff=True,
+        )
+        self.client.force_login(self.user)
+        # Create the settings row, then cache it, so the first request isn't charged for either.
+        StoreSettings.load()
+        StoreSettings.load()
+
+    def build_products(self, size):
+        return Product.objects.bulk_create([
+            Product(
+                name=f"Piece {i}", price=Decimal("5000.00"), quantity=3,
+                image="products/1.png", size="M", category="DRESS",
+            )
+            for i in range(size)
+        ])
+
+    def build_favorites(self, products):
+        Wishlist.objects.bulk_create(Wishlist(user=self.user, product=product) for product in products)
+
+    def build_cart_items(self, products):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product) for product in products)
+
+    def build_orders(self, products):
+        orders = Order.objects.bulk_create(
+            Order(user=self.user, order_id=f"BUDGET{i:04d}", total_paid=product.price, is_completed=True)
+            for i, product in enumerate(products)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, price=product.price)
+            for order, product in zip(orders, products)
+        )
+        return orders
+
+    def build_vendor(self, products):
+        seller = get_user_model().objects.get_or_create(email="seller@example.com", defaults={"username": "seller"})[0]
+        vendor = VendorProfile.objects.get_or_create(user=seller, defaults={"business_name": "Budget Seller"})[0]
+        Product.objects.filter(pk__in=[product.pk for product in products]).update(vendor=vendor)
+        invalidate_tags(vendor_tag(vendor.pk))
+        return vendor
+
+    def capture(self, view_name, budget, size):
+        Order.objects.all().delete()
+        Cart.objects.all().delete()
+        Product.objects.all().delete()
+
+        products = self.build_products(size)
+        objects = {"product": products[0]}
+        for fixture in budget["fixtures"][1:]:
+            built = getattr(self, f"build_{fixture}")(products)
+            if fixture == "orders":
+                objects["order"] = built[0]
+            if fixture == "vendor":
+                objects["vendor"] = built
+
+        args = []
+        if budget.get("args") == "product":
+            args = [objects["product"].id]
+        elif budget.get("args") == "order":
+            args = [objects["order"].order_id]
+        elif budget.get("args") == "vendor":
+            args = [objects["vendor"].storefront_slug]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(view_name, args=args))
+        self.assertEqual(response.status_code, 200, view_name)
+        return queries.captured_queries
+
+    def test_views_stay_within_query_budget(self):
+        for view_name, budget in QUERY_BUDGETS.items():
+            with self.subTest(view=view_name):
+                runs = {size: self.capture(view_name, budget, size) for size in self.sizes}
+                smallest, largest = runs[self.sizes[0]], runs[self.sizes[-1]]
+                counts = {size: len(queries) for size, queries in runs.items()}
+
+                self.assertEqual(
+                    len(set(counts.values())), 1,
+                    f"{view_name} query count grows with data size {counts}; repeated SQL:\n"
+                    + repeated_sql_diff(smallest, largest),
+                )
+                self.assertLessEqual(
+                    counts[self.sizes[-1]], budget["max_queries"],
+                    f"{view_name} exceeds its budget of {budget['max_queries']} queries:\n"
+                    + "\n".join(f"  {query['sql']}" for query in largest),
+                )
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+class RequestProfilingTests(TestCase):
+    def test_sampled_request_reports_server_timing(self):
+        response = self.client.get(reverse("landing"))
+
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r"total;dur=[\d.]+")
+        self.assertRegex(timing, r'sql;desc="[1-9]\d* queries";dur=[\d.]+')
+        self.assertRegex(timing, r"tpl;dur=[\d.]+")
+        self.assertIn("cache;desc=", timing)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_is_logged_with_top_sql(self):
+        with self.assertLogs("store.slow_requests", level="WARNING") as logs:
+            self.client.get(reverse("landing"))
+
+        self.assertIn("Slow request: GET /", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_request_has_no_header(self):
+        response = self.client.get(reverse("landing"))
+
+        self.assertNotIn("Server-Timing", response)
+
+
+class StressCheckoutCommandTests(TransactionTestCase):
+    def test_concurrent_buyers_never_oversell(self):
+        out = StringIO()
+        call_command("stress_checkout", buyers=6, stock=1, json=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report["buyers"], 6)
+        self.assertLessEqual(report["units_sold"], 1)
+        self.assertEqual(report["oversold_units"], 0)
+        self.assertEqual(report["negative_stock_products"], 0)
+        self.assertEqual(
+            report["purchased"] + report["rejected"] + report["lock_errors"] + report["other_errors"], 6
+        )
+        self.assertFalse(Product.objects.exists())
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.buyer = User.objects.create_user(email="first@example.com", username="first", password="pass1234")
+        self.rival = User.objects.create_user(email="rival@example.com", username="rival", password="pass1234")
+        self.product = Product.objects.create(
+            name="One-off Coat", price=Decimal("30000.00"), quantity=1,
+            image="products/1.png", size="M", category="OUTER",
+        )
+
+    def add_as(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse("add_to_cart", args=[self.product.id]))
+
+    def test_hold_blocks_other_bags_until_it_expires(self):
+        self.add_as(self.buyer)
+        self.add_as(self.rival)
+
+        self.assertFalse(CartItem.objects.filter(cart__user=self.rival).exists())
+        self.assertEqual(available_stock(self.product), 0)
+        self.assertEqual(Product.objects.with_available_stock().get().available_stock, 0)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.add_as(self.rival)
+
+        self.assertTrue(CartItem.objects.filter(cart__user=self.rival).exists())
+
+    def test_removing_item_releases_hold(self):
+        self.add_as(self.buyer)
+        item = CartItem.objects.get(cart__user=self.buyer)
+
+        self.client.get(reverse("update_cart_quantity", args=[item.id, "decrement"]) + "?remove=true")
+
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(available_stock(self.product), 1)
+
+    def test_checkout_converts_hold(self):
+        self.add_as(self.buyer)
+
+        response = self.client.get(reverse("complete_purchase"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(StockReservation.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 0)
+
+    def test_sweeper_deletes_expired_holds_in_batches(self):
+        self.add_as(self.buyer)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        out = StringIO()
+        call_command("expire_reservations", batch_size=1, stdout=out)
+
+        self.assertIn("Released 1", out.getvalue())
+        self.assertFalse(StockReservation.objects.exists())
+
+
+class CartJsonEndpointTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="tapper@example.com", username="tapper", password="pass1234"
+        )
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(
+            name="Silk Scarf", price=Decimal("4000.00"), quantity=2,
+            image="products/1.png", size="M", category="TOP",
+        )
+
+    def test_add_and_increment_return_line_totals_and_stock_limit(self):
+        response = self.client.post(reverse("cart_add_json", args=[self.product.id]))
+        self.assertEqual(response.status_code, 200)
+        item_id = CartItem.objects.get(cart__user=self.user).id
+
+        data = self.client.post(reverse("cart_item_json", args=[item_id, "increment"])).json()
+
+        self.assertTrue(data["ok"])
+        self.assertEqual(data["item"]["quantity"], 2)
+        self.assertEqual(data["item"]["line_total"], "8000.00")
+        self.assertEqual(data["item"]["max_quantity"], 2)
+        self.assertEqual(data["cart"], {"lines": 1, "units": 2, "subtotal": "8000.00"})
+
+        response = self.client.post(reverse("cart_item_json", args=[item_id, "increment"]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 2)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+    def test_decrement_to_zero_removes_line(self):
+        self.client.post(reverse("cart_add_json", args=[self.product.id]))
+        item_id = CartItem.objects.get(cart__user=self.user).id
+
+        data = self.client.post(reverse("cart_item_json", args=[item_id, "decrement"])).json()
+
+        self.assertTrue(data["item"]["removed"])
+        self.assertEqual(data["cart"]["lines"], 0)
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_endpoints_reject_get_and_other_users_items(self):
+        self.client.post(reverse("cart_add_json", args=[self.product.id]))
+        item_id = CartItem.objects.get(cart__user=self.user).id
+        self.assertEqual(self.client.get(reverse("cart_add_json", args=[self.product.id])).status_code, 405)
+
+        other = get_user_model().objects.create_user(email="other@example.com", username="other", password="pass1234")
+        self.client.force_login(other)
+        response = self.client.post(reverse("cart_item_json", args=[item_id, "remove"]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(CartItem.objects.filter(pk=item_id).exists())
+
+
+class WishlistTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="saver@example.com", username="saver", password="pass1234", preferred_size="M"
+        )
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(
+            name="Denim Jacket", price=Decimal("18000.00"), quantity=1,
+            image="products/1.png", size="M", category="OUTER",
+        )
+
+    def test_toggle_adds_then_removes_favorite(self):
+        url = reverse("toggle_wishlist", args=[self.product.id])
+
+        self.client.get(url)
+        entry = Wishlist.objects.get()
+        self.assertEqual(list(self.user.favorites.all()), [self.product])
+        self.assertIsNotNone(entry.added_at)
+        self.assertIsNone(entry.reminder_sent_at)
+
+        self.client.get(url)
+        self.assertFalse(Wishlist.objects.exists())
+
+    def test_wishlist_lists_newest_favorites_first(self):
+        older = Product.objects.create(
+            name="Linen Shirt", price=Decimal("9000.00"), quantity=1,
+            image="products/1.png", size="M", category="TOP",
+        )
+        Wishlist.objects.create(user=self.user, product=older, added_at=timezone.now() - timedelta(days=2))
+        Wishlist.objects.create(user=self.user, product=self.product)
+        # Someone else's favorite must not duplicate or leak into the list.
+        other = get_user_model().objects.create_user(email="x@example.com", username="x", password="pass1234")
+        Wishlist.objects.create(user=other, product=older)
+
+        response = self.client.get(reverse("wishlist_view"))
+
+        self.assertEqual(list(response.context["products"]), [self.product, older])
+
+    def test_send_reminders_only_reminds_old_favorites_once(self):
+        Wishlist.objects.create(user=self.user, product=self.product, added_at=timezone.now() - timedelta(days=4))
+        fresh = Product.objects.create(
+            name="Silk Blouse", price=Decimal("7000.00"), quantity=1,
+            image="products/1.png", size="M", category="TOP",
+        )
+        Wishlist.objects.create(user=self.user, product=fresh)
+
+        call_command("send_reminders", stdout=StringIO())
+        call_command("send_reminders", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Denim Jacket", mail.outbox[0].body)
+        self.assertIsNotNone(Wishlist.objects.get(product=self.product).reminder_sent_at)
+        self.assertIsNone(Wishlist.objects.get(product=fresh).reminder_sent_at)
+
+
+class CatalogApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = []
+        for i, category in enumerate(["DRESS", "TOP", "DRESS"]):
+            product = Product.objects.create(
+                name=f"Piece {i}", price=Decimal("1000.00") * (i + 1), quantity=1,
+                image="products/1.png", size="M", category=category,
+            )
+            self.products.append(product)
+        # Give every product a distinct age, newest last.
+        now = timezone.now()
+        for i, product in enumerate(self.products):
+            Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(minutes=10 - i))
+
+    def test_cursor_pages_newest_first_without_overlap(self):
+        first = self.client.get(reverse("api_v1_products"), {"limit": 2}).json()
+        second = self.client.get(reverse("api_v1_products"), {"limit": 2, "cursor": first["next_cursor"]}).json()
+
+        names = [item["name"] for item in first["data"] + second["data"]]
+        self.assertEqual(names, ["Piece 2", "Piece 1", "Piece 0"])
+        self.assertIn("cursor=", first["next"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_sparse_fields_and_filters(self):
+        response = self.client.get(
+            reverse("api_v1_products"), {"category": "DRESS", "min_price": "2000", "fields": "name,image"}
+        )
+
+        self.assertEqual(response.json()["data"], [
+            {"id": self.products[2].id, "name": "Piece 2", "image": "http://testserver/media/products/1.png"},
+        ])
+        self.assertEqual(self.client.get(reverse("api_v1_products"), {"fields": "cost"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_v1_products"), {"size": "XXXL"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_v1_products"), {"cursor": "nope"}).status_code, 400)
+
+    def test_payloads_are_cached_until_product_saved(self):
+        url = reverse("api_v1_product", args=[self.products[0].id])
+        self.client.get(reverse("api_v1_products"))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()["data"]["price"], "1000.00")
+        with self.assertNumQueries(1):
+            self.client.get(reverse("api_v1_products"))
+
+        product = self.products[0]
+        product.price = Decimal("750.00")
+        product.save()
+
+        self.assertEqual(self.client.get(url).json()["data"]["price"], "750.00")
+
+    def test_categories_report_available_counts(self):
+        data = self.client.get(reverse("api_v1_categories")).json()["data"]
+
+        counts = {row["code"]: row["available_products"] for row in data}
+        self.assertEqual(counts["DRESS"], 2)
+        self.assertEqual(counts["TOP"], 1)
+        self.assertEqual(counts["OUTER"], 0)
+
+
+@override_settings(CATALOG_SYNC_SETTLE_SECONDS=0)
+class CatalogChangesFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(
+                name=f"Piece {i}", price=Decimal("5000.00"), quantity=1,
+                image="products/1.png", size="M", category="TOP",
+            )
+            for i in range(3)
+        ]
+        self.owner = get_user_model().objects.create_user(
+            email="owner@example.com", username="owner", password="pass1234", is_staff=True
+        )
+
+    def sync(self, since=None, **params):
+        if since:
+            params["since"] = since
+        return self.client.get(reverse("api_v1_product_changes"), params).json()
+
+    def test_first_sync_pages_through_everything(self):
+        first = self.sync(limit=2)
+        second = self.sync(first["next_since"], limit=2)
+
+        self.assertTrue(first["has_more"])
+        self.assertFalse(second["has_more"])
+        ids = [item["id"] for item in first["changed"] + second["changed"]]
+        self.assertEqual(sorted(ids), sorted(product.id for product in self.products))
+
+    def test_only_edits_and_deletions_since_token_are_sent(self):
+        token = self.sync()["next_since"]
+        self.assertEqual(self.sync(token)["changed"], [])
+
+        edited, deleted = self.products[0], self.products[1]
+        self.client.force_login(self.owner)
+        self.client.post(reverse("quick_edit_product"), {"product_id": edited.id, "price": "4200"})
+        self.client.get(reverse("delete_product", args=[deleted.id]))
+
+        delta = self.sync(token, fields="price,is_available")
+
+        self.assertEqual(delta["changed"], [{"id": edited.id, "price": "4200.00", "is_available": False}])
+        self.assertEqual(delta["deleted"], [deleted.id])
+        self.assertEqual(self.sync(delta["next_since"])["changed"], [])
+
+    def test_partial_saves_bump_updated_at(self):
+        product = self.products[2]
+        before = product.updated_at
+
+        product.quantity = 0
+        product.save(update_fields=["quantity", "is_available"])
+
+        product.refresh_from_db()
+        self.assertGreater(product.updated_at, before)
+
+
+class LiveStockStreamTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Corduroy Coat", price=Decimal("22000.00"), quantity=1,
+            image="products/1.png", size="L", category="OUTER",
+        )
+
+    def test_broker_coalesces_events_for_many_idle_subscribers(self):
+        broker = StockBroker()
+
+        async def scenario():
+            watchers = [broker.subscribe([self.product.id]) for _ in range(2000)]
+            bystander = broker.subscribe([self.product.id + 1])
+            broker.publish(self.product.id, {"quantity": 1})
+            broker.publish(self.product.id, {"quantity": 0})
+            received = [await watcher.next_events(1) for watcher in watchers]
+            ignored = await bystander.next_events(0.01)
+            for subscription in watchers + [bystander]:
+                subscription.close()
+            return received, ignored
+
+        received, ignored = asyncio.run(scenario())
+
+        self.assertTrue(all(events == [{"quantity": 0}] for events in received))
+        self.assertEqual(ignored, [])
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_product_save_publishes_after_commit(self):
+        with patch.object(stock_broker, "publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.product.quantity = 0
+                self.product.save()
+
+        publish.assert_called_once_with(
+            self.product.id, {"product_id": self.product.id, "quantity": 0, "is_available": False}
+        )
+
+    async def test_stream_sends_snapshot_then_changes(self):
+        response = await self.async_client.get(reverse("product_stock_stream"), {"products": str(self.product.id)})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        stream = aiter(response.streaming_content)
+
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+        snapshot = await anext(stream)
+        self.assertIn(b'"quantity": 1', snapshot)
+
+        stock_broker.publish(self.product.id, {"product_id": self.product.id, "quantity": 0, "is_available": False})
+        change = await anext(stream)
+        # What Django does once the client goes away.
+        await stream.aclose()
+        response.close()
+
+        self.assertEqual(
+            change,
+            b'event: stock\ndata: {"product_id": %d, "quantity": 0, "is_available": false}\n\n' % self.product.id,
+        )
+        self.assertEqual(stock_broker.subscriber_count(), 0)
+
+    def test_stream_needs_asgi(self):
+        response = self.client.get(reverse("product_stock_stream"), {"products": str(self.product.id)})
+
+        self.assertEqual(response.status_code, 503)
+
+    async def test_stream_rejects_bad_product_lists(self):
+        url = reverse("product_stock_stream")
+        for products in ("", "a,b", ",".join(str(pk) for pk in range(1, 60))):
+            response = await self.async_client.get(url, {"products": products})
+            self.assertEqual(response.status_code, 400)
+
+
+class OwnerInventoryTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(
+            email="studio@example.com", username="studio", password="pass1234", is_staff=True
+        )
+        self.client.force_login(self.owner)
+        Product.objects.bulk_create([
+            Product(
+                name=f"{'Denim' if i % 2 else 'Linen'} Piece {i:02d}", description="Long story. " * 200,
+                price=Decimal("1000.00") + i, quantity=i % 5, image="products/1.png", size="M", category="TOP",
+            )
+            for i in range(30)
+        ])
+
+    def test_fragment_pages_and_skips_unused_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("owner_inventory"))
+
+        page = response.context["inventory_page"]
+        self.assertEqual(page.paginator.count, 30)
+        self.assertEqual(len(page.object_list), 25)
+        self.assertNotContains(response, "<html")
+        product_queries = [q["sql"] for q in queries.captured_queries if 'FROM "store_product"' in q["sql"]]
+        self.assertTrue(product_queries)
+        self.assertFalse(any("description" in sql for sql in product_queries))
+
+        second = self.client.get(reverse("owner_inventory"), {"page": 2}).context["inventory_page"]
+        self.assertEqual(len(second.object_list), 5)
+
+    def test_search_sort_and_low_stock_filter(self):
+        response = self.client.get(
+            reverse("owner_inventory"), {"q": "denim", "sort": "price_high", "low_stock": "1"}
+        )
+
+        names = [product.name for product in response.context["inventory_page"]]
+        self.assertTrue(names)
+        self.assertTrue(all(name.startswith("Denim") for name in names))
+        prices = [product.price for product in response.context["inventory_page"]]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+        self.assertTrue(all(product.quantity <= 2 for product in response.context["inventory_page"]))
+        self.assertContains(response, "page=2", count=0)
+
+    def test_dashboard_renders_first_page_only(self):
+        response = self.client.get(reverse("owner_dashboard"))
+
+        self.assertEqual(len(response.context["inventory_page"].object_list), 25)
+        self.assertContains(response, "data-inventory-panel")
+        self.assertContains(response, "Page 1 of 2")
+
+
+class OwnerBulkActionTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user(
+            email="studio@example.com", username="studio", password="pass1234", is_staff=True
+        )
+        self.client.force_login(self.owner)
+        self.products = [
+            Product.objects.create(
+                name=f"Piece {i}", price=Decimal("1000.00"), quantity=2, image="products/1.png", size="M", category="TOP"
+            )
+            for i in range(4)
+        ]
+        self.ids = [product.id for product in self.products[:3]]
+
+    def bulk(self, action, **data):
+        return self.client.post(reverse("owner_bulk_products"), {"ids": self.ids, "action": action, **data})
+
+    def test_preview_counts_without_changing(self):
+        Product.objects.filter(pk=self.ids[0]).update(is_available=False)
+
+        response = self.bulk("hide", preview="1")
+
+        self.assertEqual(response.json(), {"count": 2})
+        self.assertEqual(Product.objects.filter(is_available=True).count(), 3)
+        self.assertFalse(BulkOperation.objects.exists())
+
+    def test_percentage_price_change_is_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk("adjust_price", value="-15")
+
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "store_product"')]
+        self.assertEqual(len(updates), 1)
+        prices = set(Product.objects.filter(pk__in=self.ids).values_list("price", flat=True))
+        self.assertEqual(prices, {Decimal("850.00")})
+        self.assertEqual(Product.objects.get(pk=self.products[3].pk).price, Decimal("1000.00"))
+
+    def test_undo_restores_previous_values(self):
+        Product.objects.filter(pk=self.ids[0]).update(category="DRESS")
+        self.bulk("set_category", category="OUTER")
+        self.assertEqual(Product.objects.filter(category="OUTER").count(), 3)
+
+        operation = BulkOperation.objects.get()
+        self.client.post(reverse("owner_undo_bulk", args=[operation.id]))
+
+        self.assertEqual(Product.objects.get(pk=self.ids[0]).category, "DRESS")
+        self.assertEqual(Product.objects.filter(category="TOP").count(), 3)
+        operation.refresh_from_db()
+        self.assertIsNotNone(operation.undone_at)
+
+    def test_bulk_change_clears_cached_payloads(self):
+        cache.clear()
+        self.client.get(reverse("api_v1_product", args=[self.ids[0]]))
+
+        self.bulk("set_price", value="500")
+
+        payload = self.client.get(reverse("api_v1_product", args=[self.ids[0]])).json()["data"]
+        self.assertEqual(payload["price"], "500.00")
+
+    def test_delete_and_undo_keeps_order_history(self):
+        order = Order.objects.create(user=self.owner, total_paid=Decimal("1000.00"), order_id="TE-BULK")
+        line = OrderItem.objects.create(order=order, product=self.products[0], price=Decimal("1000.00"))
+
+        self.bulk("delete")
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(ProductTombstone.objects.count(), 3)
+
+        self.client.post(reverse("owner_undo_bulk", args=[BulkOperation.objects.get().id]))
+
+        self.assertEqual(Product.objects.count(), 4)
+        self.assertFalse(ProductTombstone.objects.exists())
+        line.refresh_from_db()
+        self.assertEqual(line.product_id, self.products[0].pk)
+        self.assertEqual(Product.objects.get(pk=self.ids[1]).price, Decimal("1000.00"))
+
+    def test_delete_and_undo_brings_back_favorites(self):
+        User = get_user_model()
+        fans = [
+            User.objects.create_user(email=f"fan{i}@example.com", username=f"fan{i}", password="pass1234") for i in range(2)
+        ]
+        for fan in fans:
+            self.client.force_login(fan)
+            self.client.post(reverse("toggle_wishlist", args=[self.ids[0]]))
+        self.client.force_login(self.owner)
+        self.assertEqual(Product.objects.get(pk=self.ids[0]).favorites_count, 2)
+
+        self.bulk("delete")
+        fans[1].delete()
+        self.client.post(reverse("owner_undo_bulk", args=[BulkOperation.objects.get().id]))
+
+        product = Product.objects.get(pk=self.ids[0])
+        self.assertEqual(list(product.favorites.all()), [fans[0]])
+        self.assertEqual(product.favorites_count, 1)
+        self.assertEqual(Product.objects.get(pk=self.ids[1]).favorites_count, 0)
+
+    def test_undo_window_expires(self):
+        self.bulk("hide")
+        operation = BulkOperation.objects.get()
+        BulkOperation.objects.filter(pk=operation.pk).update(
+            created_at=timezone.now() - timedelta(seconds=settings.BULK_UNDO_WINDOW_SECONDS + 1)
+        )
+
+        self.client.post(reverse("owner_undo_bulk", args=[operation.id]))
+
+        self.assertFalse(Product.objects.filter(pk__in=self.ids, is_available=True).exists())
+        self.assertNotContains(self.client.get(reverse("owner_dashboard")), "Recent Bulk Changes")
+
+    def test_order_status_in_bulk(self):
+        orders = [
+            Order.objects.create(user=self.owner, total_paid=Decimal("10.00"), order_id=f"TE-{i}") for i in range(3)
+        ]
+
+        self.client.post(reverse("owner_bulk_orders"), {"ids": [o.id for o in orders[:2]], "action": "mark_paid"})
+
+        self.assertEqual(Order.objects.filter(is_completed=True).count(), 2)
+        self.assertTrue(Order.objects.filter(is_completed=True, payment_date__isnull=False).exists())
+
+        self.client.post(reverse("owner_undo_bulk", args=[BulkOperation.objects.get().id]))
+        self.assertFalse(Order.objects.filter(is_completed=True).exists())
+        self.assertFalse(Order.objects.filter(payment_date__isnull=False).exists())
+
+
+class InventoryLedgerTests(TestCase):
+    def setUp(self):
+        use_temporary_media_root(self)
+        self.owner = get_user_model().objects.create_user(
+            email="studio@example.com", username="studio", password="pass1234", is_staff=True
+        )
+        self.client.force_login(self.owner)
+
+    def form_data(self, **overrides):
+        data = {
+            "name": "Linen Shirt", "description": "", "price": "9000", "original_price": "",
+            "quantity": "4", "size": "M", "category": "TOP", "is_available": "on",
+        }
+        data.update(overrides)
+        return data
+
+    def ledger_total(self, product):
+        return InventoryMovement.objects.filter(product=product).aggregate(total=Sum("change"))["total"]
+
+    def test_studio_listing_and_edit_are_logged(self):
+        self.client.post(reverse("add_product"), {**self.form_data(), "image": gif_upload()})
+        product = Product.objects.get()
+
+        self.client.post(reverse("edit_product", args=[product.id]), self.form_data(quantity="1"))
+
+        kinds = list(InventoryMovement.objects.order_by("id").values_list("kind", "change"))
+        self.assertEqual(kinds, [("RESTOCK", 4), ("ADJUSTMENT", -3)])
+        product.refresh_from_db()
+        self.assertEqual(self.ledger_total(product), product.quantity)
+
+    def test_checkout_logs_sales_in_the_same_transaction(self):
+        product = save_product(Product(name="Wool Coat", price=Decimal("100.00"), quantity=3, image="products/1.png", size="M"))
+        cart = Cart.objects.create(user=self.owner)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+
+        self.client.get(reverse("complete_purchase"))
+
+        sale = InventoryMovement.objects.get(kind="SALE")
+        self.assertEqual((sale.change, sale.order), (-2, Order.objects.get()))
+        product.refresh_from_db()
+        self.assertEqual(product.quantity, 1)
+        self.assertEqual(self.ledger_total(product), 1)
+        self.assertEqual(units_sold_by_week()[-1]["units"], 2)
+
+    def test_movement_cannot_take_stock_below_zero(self):
+        product = Product.objects.create(name="Silk Scarf", price=Decimal("100.00"), quantity=0, image="products/1.png", size="M")
+
+        with self.assertRaises(ValueError):
+            record_movement(product, "ADJUSTMENT", -1)
+        self.assertFalse(InventoryMovement.objects.exists())
+
+    def test_reconcile_reports_and_fixes_drift_in_chunks(self):
+        products = [
+            Product.objects.create(name=f"Piece {i}", price=Decimal("100.00"), quantity=0, image="products/1.png", size="M")
+            for i in range(5)
+        ]
+        for product in products:
+            record_movement(product, "RESTOCK", 2)
+        # Writes that bypass the ledger.
+        Product.objects.filter(pk__in=[products[1].pk, products[4].pk]).update(quantity=7)
+
+        out = StringIO()
+        call_command("reconcile_inventory", "--chunk-size", "2", stdout=out)
+        self.assertIn("2 product(s) differ", out.getvalue())
+        self.assertIn(f"Product {products[4].pk}: quantity 7, ledger 2 (+5)", out.getvalue())
+
+        call_command("reconcile_inventory", "--fix", stdout=StringIO())
+        out = StringIO()
+        call_command("reconcile_inventory", stdout=out)
+        self.assertIn("Every product matches its ledger.", out.getvalue())
+        self.assertEqual(InventoryMovement.objects.filter(note="Reconciliation").count(), 2)
+
+    def test_weekly_sales_scan_uses_the_kind_time_index(self):
+        with connection.cursor() as cursor:
+            sql, params = (
+                InventoryMovement.objects.filter(kind="SALE", created_at__gte=timezone.now())
+                .values("kind").query.sql_with_params()
+            )
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("movement_kind_time", plan)
+
+
+class StaticPipelineTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.static_root.cleanup)
+
+    def collect(self):
+        storages = {
+            **settings.STORAGES,
+            "staticfiles": {"BACKEND": "store.staticfiles.CompressedManifestStaticFilesStorage"},
+        }
+        with override_settings(STATIC_ROOT=self.static_root.name, STORAGES=storages):
+            call_command("collectstatic", "--noinput", "--ignore", "admin", verbosity=0)
+            with open(f"{self.static_root.name}/staticfiles.json") as fh:
+                return json.load(fh)["paths"]["js/cart.js"]
+
+    def serve(self, path, **headers):
+        with override_settings(STATIC_ROOT=self.static_root.name, SERVE_STATIC_ASSETS=True):
+            middleware = StaticAssetMiddleware(lambda request: HttpResponse(status=404))
+        return middleware(RequestFactory().get(path, **headers))
+
+    def test_hashed_asset_is_precompressed_and_immutable(self):
+        hashed = self.collect()
+        self.assertRegex(hashed, r"^js/cart\.[0-9a-f]{12}\.js$")
+
+        response = self.serve(f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/javascript")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        body = gzip.decompress(b"".join(response.streaming_content))
+        self.assertIn(b"data-cart-endpoint", body)
+
+    def test_unhashed_name_and_plain_clients(self):
+        self.collect()
+
+        response = self.serve("/static/js/cart.js")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.serve("/static/js/missing.js").status_code, 404)
+
+
+class HtmlCompressionTests(TestCase):
+    def test_large_html_is_gzipped(self):
+        response = self.client.get(reverse("landing"), HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn(b"<html", gzip.decompress(response.content))
+
+    @override_settings(HTML_COMPRESSION_MIN_BYTES=10 ** 7)
+    def test_pages_below_threshold_are_sent_as_is(self):
+        response = self.client.get(reverse("landing"), HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = use_temporary_media_root(self)
+        os.makedirs(f"{media_root}/products")
+        with open(f"{media_root}/products/look.png", "wb") as fh:
+            fh.write(bytes(range(256)) * 4)
+        self.url = "/media/products/look.png"
+
+    def test_full_file_with_validators(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["Content-Length"], "1024")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("max-age=", response["Cache-Control"])
+        self.assertEqual(len(b"".join(response.streaming_content)), 1024)
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
+        since = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(since.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+
+        tail = self.client.get(self.url, HTTP_RANGE="bytes=-6")
+        self.assertEqual(b"".join(tail.streaming_content), bytes(range(250, 256)))
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=5000-").status_code, 416)
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_traversal_and_missing_files_are_404(self):
+        self.assertEqual(self.client.get("/media/../core/settings.py").status_code, 404)
+        self.assertEqual(self.client.get("/media/products/missing.png").status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_HEADER="X-Accel-Redirect", MEDIA_ACCEL_REDIRECT_PREFIX="/protected-media/")
+    def test_offload_to_web_server(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/products/look.png")
+        self.assertEqual(response.content, b"")
+
+
+class ProductCardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="shopper@example.com", username="shopper", password="pass1234"
+        )
+        self.product = Product.objects.create(
+            name="Cord Jacket", price=Decimal("7000.00"), quantity=1, image="products/1.png", size="M", category="OUTER"
+        )
+
+    def cards(self):
+        return render_cards(Product.objects.with_favorite_flag(self.user), self.user)
+
+    def test_warm_grid_skips_template_rendering(self):
+        first = self.cards()
+
+        with patch("django.template.base.Template.render") as template_render:
+            second = self.cards()
+
+        template_render.assert_not_called()
+        self.assertEqual(first[0][1], second[0][1])
+        self.assertIn("Cord Jacket", second[0][1])
+
+    def test_product_save_and_favorite_change_the_card(self):
+        self.cards()
+
+        self.product.name = "Corduroy Jacket"
+        self.product.save()
+        self.assertIn("Corduroy Jacket", self.cards()[0][1])
+
+        Wishlist.objects.create(user=self.user, product=self.product)
+        self.assertIn("fill-red-500", self.cards()[0][1])
+
+    def test_grid_pages_render_cards(self):
+        self.client.force_login(self.user)
+
+        self.assertContains(self.client.get(reverse("dashboard")), "Cord Jacket")
+        self.assertContains(self.client.get(reverse("landing")), "Cord Jacket")
+
+
+class SessionStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="browser@example.com", username="browser", password="pass1234"
+        )
+        self.product = Product.objects.create(
+            name="Linen Shirt", price=Decimal("4000.00"), quantity=2, image="products/1.png", size="M", category="TOP"
+        )
+
+    def session_queries(self, queries):
+        return [query["sql"] for query in queries.captured_queries if "django_session" in query["sql"]]
+
+    # The engine used when DJANGO_REDIS_URL provides a shared cache.
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+    def test_browsing_and_flash_messages_skip_the_session_table(self):
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("dashboard"))
+            response = self.client.get(reverse("add_to_cart", args=[self.product.id]), follow=True)
+            self.client.get(reverse("product_detail", args=[self.product.id]))
+
+        self.assertEqual(len(response.context["messages"]), 1)
+        self.assertEqual(self.session_queries(queries), [])
+
+    @override_settings(CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "worker-a": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "worker-a"},
+        "worker-b": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "worker-b"},
+    })
+    def test_logout_in_one_worker_ends_the_session_in_another(self):
+        # Two workers, each with its own per-process cache, as without Redis.
+        SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+        def worker(name):
+            return override_settings(SESSION_CACHE_ALIAS=f"worker-{name}")
+
+        with worker("a"):
+            session = SessionStore()
+            session["_auth_user_id"] = str(self.user.pk)
+            session.create()
+        with worker("b"):
+            self.assertEqual(SessionStore(session.session_key).get("_auth_user_id"), str(self.user.pk))
+        with worker("a"):
+            SessionStore(session.session_key).flush()
+        with worker("b"):
+            self.assertIsNone(SessionStore(session.session_key).get("_auth_user_id"))
+
+    def test_purge_removes_only_expired_sessions_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f"expired{i:03d}", session_data="", expire_date=now - timedelta(days=1)) for i in range(5)]
+            + [Session(session_key="current", session_data="", expire_date=now + timedelta(days=1))]
+        )
+        out = StringIO()
+
+        call_command("purge_sessions", batch_size=2, stdout=out)
+
+        self.assertIn("Removed 5 expired session(s).", out.getvalue())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["current"])
+
+
+class TaggedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_hits_until_a_tagged_model_is_saved(self):
+        tags = [model_tag(Product)]
+        self.assertEqual(cached("answer", self.compute, tags=tags), 1)
+        self.assertEqual(cached("answer", self.compute, tags=tags), 1)
+
+        Product.objects.create(
+            name="Wool Coat", price=Decimal("9000.00"), quantity=1, image="products/1.png", size="M", category="OUTER"
+        )
+
+        self.assertEqual(cached("answer", self.compute, tags=tags), 2)
+        self.assertEqual(cache_stats(), {"hits": 1, "misses": 2, "recomputes": 2, "early_refreshes": 0, "lock_waits": 0})
+
+    def test_entry_near_expiry_is_refreshed_early(self):
+        # Half a second left on a value that took a second to compute.
+        cache.set(entry_key("answer"), {"value": 0, "tags": {}, "expires": time.time() + 0.5, "delta": 1.0}, 60)
+
+        with patch("store.cache.random.random", return_value=0.0):
+            self.assertEqual(cached("answer", self.compute), 0)
+        with patch("store.cache.random.random", return_value=0.5):
+            self.assertEqual(cached("answer", self.compute), 1)
+
+        self.assertEqual(cache_stats()["early_refreshes"], 1)
+
+    def test_miss_waits_for_the_worker_holding_the_lock(self):
+        cache.add(lock_key("answer"), 1)
+
+        def other_worker_finishes(seconds):
+            cache.set(entry_key("answer"), {"value": "theirs", "tags": {}, "expires": time.time() + 60, "delta": 0})
+
+        with patch("store.cache.time.sleep", side_effect=other_worker_finishes):
+            self.assertEqual(cached("answer", self.compute), "theirs")
+
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(cache_stats()["lock_waits"], 1)
+
+    def test_store_settings_are_read_once_until_saved(self):
+        StoreSettings.objects.create(pk=1)
+        StoreSettings.load()
+        with self.assertNumQueries(0):
+            StoreSettings.load()
+
+        store = StoreSettings.load()
+        store.store_name = "Second Life"
+        store.save()
+
+        self.assertEqual(StoreSettings.load().store_name, "Second Life")
+
+
+class VendorStorefrontTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.seller = User.objects.create_user(
+            email="seller@example.com", username="seller", password="pass1234", is_staff=True
+        )
+        self.vendor = VendorProfile.objects.create(user=self.seller, business_name="Ada Thrift", contact_phone="0800")
+        other = VendorProfile.objects.create(
+            user=User.objects.create_user(email="other@example.com", username="other", password="pass1234"),
+            business_name="Other Rack", contact_phone="0801",
+        )
+        self.own = Product.objects.create(
+            name="Ada Blazer", price=Decimal("8000.00"), quantity=1, image="products/1.png", size="M",
+            category="OUTER", vendor=self.vendor,
+        )
+        self.foreign = Product.objects.create(
+            name="Rack Skirt", price=Decimal("3000.00"), quantity=1, image="products/1.png", size="M",
+            category="BOTTOM", vendor=other,
+        )
+
+    def test_storefront_lists_only_the_vendors_products(self):
+        response = self.client.get(reverse("storefront", args=["ada-thrift"]))
+
+        self.assertContains(response, "Ada Blazer")
+        self.assertNotContains(response, "Rack Skirt")
+        self.assertEqual(response.context["summary"]["count"], 1)
+        self.assertEqual(self.client.get(reverse("storefront", args=["nobody"])).status_code, 404)
+
+    def test_storefront_summary_refreshes_when_a_listing_changes(self):
+        self.client.get(reverse("storefront", args=["ada-thrift"]))
+        self.own.is_available = False
+        self.own.save()
+
+        response = self.client.get(reverse("storefront", args=["ada-thrift"]))
+
+        self.assertEqual(response.context["summary"]["count"], 0)
+        self.assertNotContains(response, "Ada Blazer")
+
+    def test_vendor_studio_is_scoped_to_its_own_rows(self):
+        self.client.force_login(self.seller)
+
+        inventory = self.client.get(reverse("owner_inventory")).context["inventory_page"]
+        self.assertEqual([product.pk for product in inventory], [self.own.pk])
+        self.assertEqual(self.client.post(reverse("delete_product", args=[self.foreign.pk])).status_code, 404)
+
+        self.client.post(reverse("owner_bulk_products"), {"action": "hide", "ids": [self.own.pk, self.foreign.pk]})
+        self.foreign.refresh_from_db()
+        self.assertTrue(self.foreign.is_available)
+        self.assertFalse(Product.objects.get(pk=self.own.pk).is_available)
+
+    def test_mixed_cart_counts_towards_each_vendor(self):
+        other = VendorProfile.objects.get(business_name="Other Rack")
+        buyer = get_user_model().objects.create_user(email="mix@example.com", username="mix", password="pass1234")
+        cart = Cart.objects.create(user=buyer)
+        CartItem.objects.create(cart=cart, product=self.own, quantity=1)
+        CartItem.objects.create(cart=cart, product=self.foreign, quantity=1)
+        self.client.force_login(buyer)
+        self.client.get(reverse("complete_purchase"))
+        order = Order.objects.get(user=buyer)
+        self.assertIsNone(order.vendor_id)
+
+        def figures(vendor):
+            analytics = sales_analytics(vendor)
+            return analytics["total_sales"], analytics["paid_orders_count"], sum(week["units"] for week in analytics["weekly_units_sold"])
+
+        self.assertEqual(figures(self.vendor), (Decimal("8000.00"), 1, 1))
+        self.assertEqual(figures(other), (Decimal("3000.00"), 1, 1))
+        self.assertEqual(figures(None)[:2], (Decimal("11000.00"), 1))
+
+        # Archived, the order still counts for both vendors and once for the platform.
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=90))
+        call_command("archive_orders", days=60, stdout=StringIO())
+        self.assertEqual([sales_analytics(vendor)["total_sales"] for vendor in (self.vendor, other, None)],
+                         [Decimal("8000.00"), Decimal("3000.00"), Decimal("11000.00")])
+        self.assertEqual([sales_analytics(vendor)["paid_orders_count"] for vendor in (self.vendor, other, None)], [1, 1, 1])
+
+    def test_each_vendor_of_a_mixed_cart_manages_its_order(self):
+        other = VendorProfile.objects.get(business_name="Other Rack")
+        get_user_model().objects.filter(pk=other.user_id).update(is_staff=True)
+        buyer = get_user_model().objects.create_user(email="mix@example.com", username="mix", password="pass1234")
+        order = Order.objects.create(user=buyer, total_paid=Decimal("11000.00"))
+        OrderItem.objects.create(order=order, product=self.own, price=self.own.price)
+        OrderItem.objects.create(order=order, product=self.foreign, price=self.foreign.price)
+        loner = Order.objects.create(user=buyer, total_paid=Decimal("3000.00"), vendor=other, is_completed=True)
+        OrderItem.objects.create(order=loner, product=self.foreign, price=self.foreign.price)
+
+        self.client.force_login(self.seller)
+        recent = self.client.get(reverse("owner_dashboard")).context["recent_orders"]
+        self.assertEqual([row.pk for row in recent], [order.pk])
+        self.client.post(reverse("owner_toggle_order_status", args=[order.pk]))
+        self.assertTrue(Order.objects.get(pk=order.pk).is_completed)
+        # Only the order this vendor sold into changes.
+        self.client.post(reverse("owner_bulk_orders"), {"ids": [order.pk, loner.pk], "action": "mark_pending"})
+        self.assertFalse(Order.objects.get(pk=order.pk).is_completed)
+        self.assertTrue(Order.objects.get(pk=loner.pk).is_completed)
+
+        self.client.force_login(other.user)
+        recent = self.client.get(reverse("owner_dashboard")).context["recent_orders"]
+        self.assertEqual({row.pk for row in recent}, {order.pk, loner.pk})
+        self.client.post(reverse("owner_bulk_orders"), {"ids": [order.pk], "action": "mark_paid"})
+        self.assertTrue(Order.objects.get(pk=order.pk).is_completed)
+
+    def test_slug_collisions_are_resolved_in_one_query(self):
+        User = get_user_model()
+        VendorProfile.objects.create(
+            user=User.objects.create_user(email="ada2@example.com", username="ada2", password="pass1234"),
+            business_name="Ada Thrift", contact_phone="0802",
+        )
+        third = VendorProfile(
+            user=User.objects.create_user(email="ada3@example.com", username="ada3", password="pass1234"),
+            business_name="Ada Thrift", contact_phone="0803",
+        )
+
+        # One SELECT for the taken slugs, one INSERT.
+        with self.assertNumQueries(2):
+            third.save()
+        self.assertEqual(third.storefront_slug, "ada-thrift-3")
+
+
+class OrderIdTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="ids@example.com", username="ids", password="pass1234"
+        )
+        self.client.force_login(self.user)
+
+    def test_ulids_are_readable_and_strictly_increasing(self):
+        ids = [new_ulid() for _ in range(1000)]
+
+        self.assertEqual(ids, sorted(set(ids)))
+        self.assertTrue(all(is_ulid(value) and len(value) == 26 for value in ids))
+        self.assertFalse(set("ILOU") & set("".join(ids)))
+        self.assertLess(abs((ulid_time(ids[0]) - timezone.now()).total_seconds()), 5)
+
+    def test_order_history_pages_on_order_id(self):
+        Order.objects.bulk_create(
+            Order(user=self.user, order_id=new_ulid(), total_paid=Decimal("100.00"), is_completed=True)
+            for _ in range(25)
+        )
+        newest_first = list(Order.objects.order_by("-order_id").values_list("order_id", flat=True))
+
+        first = self.client.get(reverse("order_history"))
+        second = self.client.get(reverse("order_history"), {"before": first.context["next_cursor"]})
+
+        self.assertEqual([order.order_id for order in first.context["orders"]], newest_first[:20])
+        self.assertEqual([order.order_id for order in second.context["orders"]], newest_first[20:])
+        self.assertIsNone(second.context["next_cursor"])
+        self.assertEqual(first.context["total_spent"], Decimal("2500.00"))
+
+    def test_backfill_keeps_old_references_working(self):
+        old = Order.objects.create(user=self.user, order_id="3F2A9C1B7E4D", total_paid=Decimal("100.00"))
+        migration = import_module("store.migrations.0021_ulid_order_ids")
+
+        migration.backfill_ulids(django_apps, None)
+
+        old.refresh_from_db()
+        self.assertTrue(is_ulid(old.order_id))
+        self.assertEqual(old.legacy_order_id, "3F2A9C1B7E4D")
+        self.assertEqual(ulid_time(old.order_id).replace(microsecond=0), old.created_at.replace(microsecond=0))
+        response = self.client.get(reverse("download_invoice", args=["3F2A9C1B7E4D"]))
+        self.assertEqual(response.context["order"], old)
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="archive@example.com", username="archive", password="pass1234"
+        )
+        product = Product.objects.create(
+            name="Silk Scarf", price=Decimal("1500.00"), quantity=5, image="products/1.png", size="M", category="ACC"
+        )
+        long_ago = timezone.now() - timedelta(days=90)
+        self.old = []
+        for i, paid in enumerate([True, True, False]):
+            order = Order.objects.create(
+                user=self.user, order_id=new_ulid(long_ago + timedelta(minutes=i)), total_paid=Decimal("1500.00"), is_completed=paid
+            )
+            OrderItem.objects.create(order=order, product=product, price=Decimal("1500.00"))
+            self.old.append(order)
+        Order.objects.filter(pk__in=[order.pk for order in self.old]).update(created_at=long_ago)
+        self.recent = Order.objects.create(user=self.user, total_paid=Decimal("3000.00"), is_completed=True)
+
+    def test_moves_old_paid_orders_without_changing_figures(self):
+        before = sales_analytics()
+
+        call_command("archive_orders", days=60, chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(sorted(Order.objects.values_list("pk", flat=True)), sorted([self.old[2].pk, self.recent.pk]))
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=self.old[0].pk).count(), 1)
+        self.assertEqual(sales_analytics(), before)
+
+    def test_history_and_invoices_read_the_archive(self):
+        call_command("archive_orders", days=60, stdout=StringIO())
+        self.client.force_login(self.user)
+
+        history = self.client.get(reverse("order_history")).context
+        invoice = self.client.get(reverse("download_invoice", args=[self.old[0].order_id]))
+
+        self.assertEqual(
+            [order.order_id for order in history["orders"]],
+            [self.recent.order_id, self.old[1].order_id, self.old[0].order_id],
+        )
+        self.assertEqual(history["total_spent"], Decimal("6000.00"))
+        self.assertContains(invoice, "Silk Scarf")
+
+    def test_history_merges_old_orders_paid_after_archiving(self):
+        long_ago = timezone.now() - timedelta(days=90)
+        late = Order.objects.create(
+            user=self.user, order_id=new_ulid(long_ago - timedelta(minutes=5)), total_paid=Decimal("1500.00"), is_completed=False
+        )
+        Order.objects.filter(pk=late.pk).update(created_at=long_ago)
+        call_command("archive_orders", days=60, stdout=StringIO())
+        # Paid after the archive run, so it stays hot with its old id.
+        Order.objects.filter(pk=late.pk).update(is_completed=True)
+        self.client.force_login(self.user)
+
+        with patch("store.views.ORDER_HISTORY_PAGE_SIZE", 2):
+            first = self.client.get(reverse("order_history")).context
+            second = self.client.get(reverse("order_history"), {"before": first["next_cursor"]}).context
+
+        self.assertEqual(
+            [order.order_id for order in first["orders"] + second["orders"]],
+            [self.recent.order_id, self.old[1].order_id, self.old[0].order_id, late.order_id],
+        )
+        self.assertIsNone(second["next_cursor"])
+
+    def test_refuses_to_archive_the_sales_snapshot_window(self):
+        with self.assertRaises(CommandError):
+            call_command("archive_orders", days=7, stdout=StringIO())
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset_metrics()
+        User = get_user_model()
+        self.staff = User.objects.create_user(
+            email="ops@example.com", username="ops", password="pass1234", is_staff=True
+        )
+        self.buyer = User.objects.create_user(email="shopper@example.com", username="shopper", password="pass1234")
+        self.product = Product.objects.create(
+            name="Denim Jacket", price=Decimal("9000.00"), quantity=2, image="products/1.png", size="M", category="OUTER"
+        )
+
+    def test_renders_counters_and_cumulative_histogram_buckets(self):
+        metrics.CART_MUTATIONS.labels(action="add", outcome="ok").inc(2)
+        metrics.REQUEST_LATENCY.labels(view="cart", method="GET").observe(0.02)
+        metrics.REQUEST_LATENCY.labels(view="cart", method="GET").observe(3)
+
+        text = metrics.render()
+
+        self.assertIn("# TYPE store_cart_mutations_total counter", text)
+        self.assertIn('store_cart_mutations_total{action="add",outcome="ok"} 2', text)
+        self.assertIn('store_http_request_duration_seconds_bucket{view="cart",method="GET",le="0.01"} 0', text)
+        self.assertIn('store_http_request_duration_seconds_bucket{view="cart",method="GET",le="0.025"} 1', text)
+        self.assertIn('store_http_request_duration_seconds_bucket{view="cart",method="GET",le="+Inf"} 2', text)
+        self.assertIn('store_http_request_duration_seconds_count{view="cart",method="GET"} 2', text)
+        with self.assertRaises(ValueError):
+            metrics.CART_MUTATIONS.labels(action="add")
+        with self.assertRaises(ValueError):
+            metrics.CART_MUTATIONS.inc()
+
+    def test_adds_up_snapshots_from_other_processes(self):
+        metrics.ORDERS_PLACED.inc()
+        metrics.REQUESTS_IN_PROGRESS.set(1)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            metrics.flush(force=True)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            # A worker that has since exited: its counts stay, its gauges don't.
+            with open(os.path.join(directory, "metrics-gone.json"), "w") as handle:
+                json.dump({"pid": 2 ** 22 + 1, "metrics": {
+                    "store_orders_placed_total": [[[], 4]],
+                    "store_http_requests_in_progress": [[[], 7]],
+                }}, handle)
+
+            text = metrics.render()
+
+        self.assertIn("store_orders_placed_total 5", text)
+        self.assertIn("store_http_requests_in_progress 1", text)
+
+    def test_endpoint_is_for_platform_staff_or_the_token(self):
+        url = reverse("metrics")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username="shopper@example.com", password="pass1234")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.login(username="ops@example.com", password="pass1234")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertContains(response, 'store_http_requests_total{view="metrics",method="GET",status="403"} 2')
+
+        VendorProfile.objects.create(user=self.staff, business_name="Ops Rack", contact_phone="0800")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.logout()
+        with override_settings(METRICS_TOKEN="scrape-me"):
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION="Bearer scrape-me").status_code, 200)
+
+    def test_counts_cart_changes_and_checkout_outcomes(self):
+        Cart.objects.create(user=self.buyer)
+        self.client.login(username="shopper@example.com", password="pass1234")
+        self.client.get(reverse("complete_purchase"))
+        self.client.get(reverse("add_to_cart", args=[self.product.id]))
+        self.client.get(reverse("add_to_cart", args=[self.product.id]))
+        self.client.get(reverse("add_to_cart", args=[self.product.id]))
+
+        self.assertEqual(metrics.CHECKOUT_REJECTIONS.value(reason="empty_bag"), 1)
+        self.assertEqual(metrics.CART_MUTATIONS.value(action="add", outcome="ok"), 2)
+        self.assertEqual(metrics.CART_MUTATIONS.value(action="add", outcome="rejected"), 1)
+
+        with patch("store.views.EmailMessage.send", side_effect=OSError("smtp down")), \
+                self.assertLogs("store.email", "ERROR"):
+            response = self.client.get(reverse("complete_purchase"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.ORDERS_PLACED.value(), 1)
+        self.assertEqual(metrics.ORDER_REVENUE.value(), 18000)
+        self.assertEqual(metrics.EMAILS.value(kind="receipt", outcome="failed"), 1)
+        self.assertEqual(
+            metrics.REQUESTS.value(view="complete_purchase", method="GET", status="200"), 1
+        )
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=72)
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="fan@example.com", username="fan", password="pass1234"
+        )
+        self.client.force_login(self.user)
+        self.hot, self.warm, self.cold = [
+            Product.objects.create(
+                name=name, price=Decimal("5000.00"), quantity=5, image="products/1.png", size="M", category="TOP"
+            )
+            for name in ("Hot Tee", "Warm Tee", "Cold Tee")
+        ]
+        self.now = timezone.now()
+
+    def _sale(self, product, quantity, hours_ago):
+        order = Order.objects.create(user=self.user, total_paid=Decimal("5000.00"))
+        Order.objects.filter(pk=order.pk).update(created_at=self.now - timedelta(hours=hours_ago))
+        OrderItem.objects.create(order=order, product=product, price=product.price, quantity=quantity)
+
+    def _events(self):
+        Wishlist.objects.create(user=self.user, product=self.hot, added_at=self.now)
+        self._sale(self.hot, 2, hours_ago=72)
+        Wishlist.objects.create(user=self.user, product=self.warm, added_at=self.now - timedelta(hours=144))
+        self._sale(self.cold, 1, hours_ago=24 * 30)
+        Product.objects.filter(pk=self.cold.pk).update(trending_score=5)
+
+    def test_counters_follow_favorites_and_checkout(self):
+        url = reverse("toggle_wishlist", args=[self.hot.id])
+        self.client.get(url)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.favorites_count, 1)
+        self.client.get(url)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.favorites_count, 0)
+
+        # A favorite that never went through the view can't push the count below zero.
+        Wishlist.objects.create(user=self.user, product=self.warm)
+        self.client.get(reverse("toggle_wishlist", args=[self.warm.id]))
+        self.warm.refresh_from_db()
+        self.assertEqual(self.warm.favorites_count, 0)
+
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=self.hot, quantity=3)
+        self.client.get(reverse("complete_purchase"))
+        self.hot.refresh_from_db()
+        self.assertEqual((self.hot.units_sold, self.hot.quantity), (3, 2))
+
+    def test_scores_decay_by_half_life(self):
+        self._events()
+
+        with patch.object(trending, "numpy", None):
+            scored = trending.recompute_trending(now=self.now)
+
+        self.assertEqual(scored, 2)
+        scores = dict(Product.objects.values_list("name", "trending_score"))
+        # One favorite now, plus two units sold one half-life ago at weight 3.
+        self.assertAlmostEqual(scores["Hot Tee"], 1 + 2 * 3 * 0.5)
+        self.assertAlmostEqual(scores["Warm Tee"], 0.25)
+        self.assertEqual(scores["Cold Tee"], 0)
+
+    @skipUnless(trending.numpy, "NumPy is not installed (see requirements-optional.txt)")
+    def test_vectorized_scores_match_the_loop(self):
+        self._events()
+        args = (*trending.recent_events(self.now - timedelta(days=31)), self.now.timestamp(), 72 * 3600)
+
+        vectorized = trending.decayed_scores(*args)
+        with patch.object(trending, "numpy", None):
+            looped = trending.decayed_scores(*args)
+
+        self.assertEqual(vectorized.keys(), looped.keys())
+        for pk, score in looped.items():
+            self.assertAlmostEqual(vectorized[pk], score)
+
+    @override_settings(TRENDING_HALF_LIFE_HOURS=24 * 30)
+    def test_archived_sales_still_trend(self):
+        self._sale(self.cold, 2, hours_ago=24 * 60)
+        Order.objects.update(is_completed=True)
+        call_command("archive_orders", days=31, stdout=StringIO())
+
+        trending.recompute_trending(now=self.now)
+
+        self.cold.refresh_from_db()
+        self.assertAlmostEqual(self.cold.trending_score, 2 * 3 * 0.25)
+
+    def test_command_syncs_counters_and_api_sorts_by_score(self):
+        self._events()
+        Product.objects.filter(pk=self.warm.pk).update(favorites_count=9)
+
+        out = StringIO()
+        call_command("recompute_trending", sync_counters=True, stdout=out)
+
+        self.assertIn("Scored 2 trending product(s)", out.getvalue())
+        counters = {name: (favorites, sold) for name, favorites, sold in
+                    Product.objects.values_list("name", "favorites_count", "units_sold")}
+        self.assertEqual(counters, {"Hot Tee": (1, 2), "Warm Tee": (1, 0), "Cold Tee": (0, 1)})
+
+        url = reverse("api_v1_products")
+        first = self.client.get(url, {"sort": "trending", "limit": 1, "fields": "name"}).json()
+        second = self.client.get(
+            url, {"sort": "trending", "limit": 1, "fields": "name", "cursor": first["next_cursor"]}
+        ).json()
+        self.assertEqual([row["name"] for row in first["data"] + second["data"]], ["Hot Tee", "Warm Tee"])
+        best = self.client.get(url, {"sort": "best_selling", "fields": "name"}).json()
+        self.assertEqual([row["name"] for row in best["data"]], ["Hot Tee", "Cold Tee", "Warm Tee"])
+        self.assertEqual(self.client.get(url, {"sort": "cheapest"}).status_code, 400)
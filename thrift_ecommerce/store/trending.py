@@ -0,0 +1,110 @@
+"""Popularity counters and the time-decayed trending score on ``Product``.
+
+``favorites_count`` and ``units_sold`` are moved with ``F()`` as shoppers
+favorite and buy, so reading them costs nothing. ``trending_score`` is the
+sum of a product's recent favorites and units sold, each weighted down by
+half for every ``TRENDING_HALF_LIFE_HOURS`` of age. Every score decays at
+once as time passes, so rather than keep it live ``recompute_trending``
+rebuilds all of them in one pass over the recent events: NumPy does the
+weighting and the per-product sums when it is installed, a plain loop
+otherwise, with the same results.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedOrderItem, OrderItem, Product, Wishlist
+
+try:
+    import numpy
+except ImportError:  # Optional: without it the scores are summed in Python.
+    numpy = None
+
+# A unit sold says more about demand than a favorite does.
+FAVORITE_WEIGHT = 1.0
+SALE_WEIGHT = 3.0
+# Events older than this many half-lives add under 0.4% of their weight.
+WINDOW_HALF_LIVES = 8
+
+
+def recent_events(since):
+    """``(product_ids, timestamps, weights)`` for favorites and sales after ``since``."""
+    product_ids, timestamps, weights = [], [], []
+    favorites = Wishlist.objects.filter(added_at__gte=since).values_list('product_id', 'added_at')
+    for product_id, added_at in favorites.iterator(chunk_size=5000):
+        product_ids.append(product_id)
+        timestamps.append(added_at.timestamp())
+        weights.append(FAVORITE_WEIGHT)
+    # With a long half-life the window can reach past the retention period,
+    # so archived sales count too.
+    for lines in (OrderItem.objects, ArchivedOrderItem.objects):
+        sales = (
+            lines.filter(order__created_at__gte=since, product__isnull=False)
+            .values_list('product_id', 'order__created_at', 'quantity')
+        )
+        for product_id, placed_at, quantity in sales.iterator(chunk_size=5000):
+            product_ids.append(product_id)
+            timestamps.append(placed_at.timestamp())
+            weights.append(SALE_WEIGHT * quantity)
+    return product_ids, timestamps, weights
+
+
+def decayed_scores(product_ids, timestamps, weights, now, half_life):
+    """``{product_id: score}``: each weight halved for every ``half_life`` seconds before ``now``."""
+    if not product_ids:
+        return {}
+    if numpy is not None:
+        ids = numpy.asarray(product_ids, dtype=numpy.int64)
+        decay = numpy.exp2((numpy.asarray(timestamps) - now) / half_life)
+        unique_ids, positions = numpy.unique(ids, return_inverse=True)
+        sums = numpy.bincount(positions, weights=numpy.asarray(weights) * decay)
+        return dict(zip(unique_ids.tolist(), sums.tolist()))
+    scores = {}
+    for product_id, moment, weight in zip(product_ids, timestamps, weights):
+        scores[product_id] = scores.get(product_id, 0.0) + weight * 2.0 ** ((moment - now) / half_life)
+    return scores
+
+
+def recompute_trending(now=None, batch_size=500):
+    """Rebuild every product's ``trending_score``. Returns how many products scored above zero."""
+    now = now or timezone.now()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+    since = now - timedelta(seconds=half_life * WINDOW_HALF_LIVES)
+    scores = decayed_scores(*recent_events(since), now.timestamp(), half_life)
+
+    with transaction.atomic():
+        # Products with nothing recent drop to zero; the rest get their new
+        # score. Other connections see the old scores until this commits.
+        Product.objects.filter(trending_score__gt=0).update(trending_score=0)
+        Product.objects.bulk_update(
+            [Product(pk=pk, trending_score=score) for pk, score in scores.items()],
+            ['trending_score'],
+            batch_size=batch_size,
+        )
+    return len(scores)
+
+
+def sync_counters():
+    """Reset ``favorites_count`` and ``units_sold`` from the rows they count.
+
+    The F() updates miss changes made outside the views (a user deleted
+    with their wishlist, orders edited in the admin), so the periodic job
+    can put the counters back in step. Archived sales still count.
+    """
+    def total(queryset, aggregate):
+        return Coalesce(
+            Subquery(
+                queryset.filter(product=OuterRef('pk')).order_by()
+                .values('product').annotate(total=aggregate).values('total')
+            ),
+            0,
+        )
+
+    return Product.objects.update(
+        favorites_count=total(Wishlist.objects.all(), Count('pk')),
+        units_sold=total(OrderItem.objects.all(), Sum('quantity')) + total(ArchivedOrderItem.objects.all(), Sum('quantity')),
+    )
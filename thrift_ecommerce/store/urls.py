@@ -1,6 +1,6 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from . import views
+from . import api, views
 
 urlpatterns = [
     # --- PUBLIC PAGES ---
@@ -26,8 +26,12 @@ urlpatterns = [
     # --- CUSTOMER INTERFACE ---
     # Main user area showing personalized recommendations
     path('dashboard/', views.dashboard, name='dashboard'),
+    # A vendor's own storefront: only their listings, newest first
+    path('s/<slug:storefront_slug>/', views.storefront, name='storefront'),
     # Individual product page showing details and related items
     path('product/<int:product_id>/', views.product_detail, name='product_detail'),
+    # Server-sent stock updates for the products on screen (ASGI only)
+    path('stream/stock/', views.product_stock_stream, name='product_stock_stream'),
 
     # --- WISHLIST / FAVORITES ---
     # View to see all items the user has favorited
@@ -44,6 +48,9 @@ urlpatterns = [
     path('cart/', views.cart_view, name='cart'), 
     # Logic-only route: adds an item to the session cart
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'), 
+    # JSON versions of the cart mutations, used by static/js/cart.js
+    path('cart/api/add/<int:product_id>/', views.cart_add_json, name='cart_add_json'),
+    path('cart/api/item/<int:item_id>/<str:action>/', views.cart_item_json, name='cart_item_json'),
     # Finalizes the order, clears cart, and creates database records
     path('checkout/', views.complete_purchase, name='complete_purchase'),
     # View past successful orders
@@ -52,14 +59,30 @@ urlpatterns = [
     # --- OWNER / STAFF MANAGEMENT ---
     # Dashboard for staff to manage inventory
     path('owner/dashboard/', views.owner_dashboard, name='owner_dashboard'),
+    # Inventory panel fragment: search, sort, low-stock filter and paging
+    path('owner/inventory/', views.owner_inventory, name='owner_inventory'),
     path('store-admin/', views.owner_dashboard, name='store_admin_dashboard'),
     path('owner/product/add/', views.add_product, name='add_product'),
     path('store-admin/product/add/', views.add_product, name='store_admin_add_product'),
     path('owner/product/edit/<int:product_id>/', views.edit_product, name='edit_product'),
     path('management/', views.owner_dashboard, name='owner_dashboard'),
     path('management/order/<int:order_id>/toggle/', views.owner_toggle_order_status, name='owner_toggle_order_status'),
+    # Studio bulk actions (one UPDATE per action) and their undo
+    path('owner/bulk/products/', views.owner_bulk_products, name='owner_bulk_products'),
+    path('owner/bulk/orders/', views.owner_bulk_orders, name='owner_bulk_orders'),
+    path('owner/bulk/<int:operation_id>/undo/', views.owner_undo_bulk, name='owner_undo_bulk'),
     # Completely remove a product from the database
     path('management/delete/<int:product_id>/', views.delete_product, name='delete_product'),
     # Quickly flip a product between 'Available' and 'Sold'
     path('management/toggle/<int:product_id>/', views.toggle_availability, name='toggle_availability'),
+
+    # Prometheus scrape target (platform staff or DJANGO_METRICS_TOKEN)
+    path('metrics/', views.metrics_view, name='metrics'),
+
+    # --- JSON CATALOG API (v1) ---
+    path('api/v1/products/', api.product_list, name='api_v1_products'),
+    path('api/v1/products/<int:product_id>/', api.product_detail, name='api_v1_product'),
+    path('api/v1/products/changes/', api.product_changes, name='api_v1_product_changes'),
+    path('api/v1/categories/', api.category_list, name='api_v1_categories'),
+    path('api/v1/sizes/', api.size_list, name='api_v1_sizes'),
 ]
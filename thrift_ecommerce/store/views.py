@@ -1,8 +1,11 @@
+import hmac
+import logging
 import uuid
 from decimal import Decimal
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.utils import OperationalError, ProgrammingError
-from django.db.models import Sum
+from django.db.models import BooleanField, Count, F, Max, Sum, Value, prefetch_related_objects
+from django.db.models.functions import Greatest
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login
 from django.contrib.auth.forms import UserCreationForm
@@ -10,19 +13,34 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.core.mail import EmailMessage
-from django.http import JsonResponse
+from django.conf import settings as django_settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
 from django.utils import timezone
 from datetime import timedelta
 from urllib.parse import quote
 from django.views.decorators.http import require_POST
 from .forms import SignUpForm, ProductForm, StoreSettingsForm, VendorOnboardingStepOneForm
-from .models import Product, Order, OrderItem, Cart, CartItem, StoreSettings, PromoCode, VendorProfile
+from .models import CATEGORY_CHOICES, ArchivedOrder, BulkOperation, InventoryMovement, Product, Order, OrderItem, Cart, CartItem, StoreSettings, PromoCode, SalesRollup, VendorProfile, Wishlist
 from django.contrib.sites.shortcuts import get_current_site
+from django.core.paginator import Paginator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from .tokens import account_activation_token
+from .routers import read_from_replica
+from .events import StockEventStream, broker as stock_broker, stock_event
+from .reservations import available_stock, holds_cover
+from .cards import render_cards
+from .cart import add_to_bag, cart_totals, decrement_item, increment_item, remove_item
+from . import bulk
+from .inventory import save_product, units_sold_by_week
+from .archive import LINE_TOTAL, find_order
+from .cache import cached, invalidate_models, model_tag, vendor_tag
+from .ids import new_ulid
+from . import metrics
 
+email_logger = logging.getLogger('store.email')
 
 
 def build_whatsapp_checkout_link(settings, order):
@@ -55,12 +73,25 @@ def build_whatsapp_checkout_link(settings, order):
 def is_owner(user):
     return user.is_superuser or user.is_staff
 
+
+def studio_vendor(user):
+    """The vendor whose rows a studio user manages, or None to manage the whole platform.
+
+    Superusers, and staff without a vendor profile, run the platform; staff
+    who onboarded as vendors only see and change their own products and orders.
+    """
+    if user.is_superuser:
+        return None
+    return VendorProfile.objects.filter(user=user).first()
+
 # --- CLIENT VIEWS ---
 
 def landing_page(request):
     # Fetch recent products for the "Fresh Drops" section on landing
     recent_products = Product.objects.filter(is_available=True).order_by('-created_at')[:4]
-    return render(request, 'store/landing.html', {'recent_products': recent_products})
+    return render(request, 'store/landing.html', {
+        'recent_cards': render_cards(recent_products, request.user, 'store/partials/landing_card.html'),
+    })
 
 
 def help_support(request):
@@ -89,27 +120,30 @@ def personalized_signup(request):
 def dashboard(request):
     user_size = request.user.preferred_size
     # AI Logic: Prioritize user's size, but show everything available
-    all_available = Product.objects.filter(is_available=True).order_by('-created_at')
+    all_available = Product.objects.filter(is_available=True).with_favorite_flag(request.user).order_by('-created_at')
     
     # Filter for exact matches to highlight them in the UI if needed
     recommended = all_available.filter(size=user_size)
     
+    products = list(all_available)
     return render(request, 'store/dashboard.html', {
-        'products': all_available, # Show all, but you can highlight recommended in template
+        'products': products, # Show all, but you can highlight recommended in template
+        'cards': render_cards(products, request.user, 'store/partials/dashboard_card.html'),
         'recommended': recommended,
         'user_size': user_size
     })
 
 def product_detail(request, product_id):
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(Product.objects.select_related('vendor'), id=product_id)
     related_products = Product.objects.filter(
         category=product.category, 
         is_available=True
-    ).exclude(id=product.id)[:4]
+    ).exclude(id=product.id).with_favorite_flag(request.user)[:4]
     
     return render(request, 'store/product_detail.html', {
         'product': product,
-        'related_products': related_products
+        'related_products': related_products,
+        'related_cards': render_cards(related_products, request.user),
     })
 
 
@@ -165,37 +199,122 @@ def vendor_onboarding(request):
 @login_required
 def toggle_wishlist(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    if product.favorites.filter(id=request.user.id).exists():
-        product.favorites.remove(request.user)
+    removed, _ = Wishlist.objects.filter(user=request.user, product=product).delete()
+    if removed:
+        # Floored at zero in case a favorite was removed without passing through here.
+        Product.objects.filter(pk=product.pk).update(favorites_count=Greatest(F('favorites_count') - removed, 0))
     else:
-        product.favorites.add(request.user)
+        _, created = Wishlist.objects.get_or_create(user=request.user, product=product)
+        if created:
+            Product.objects.filter(pk=product.pk).update(favorites_count=F('favorites_count') + 1)
     return redirect(request.META.get('HTTP_REFERER', 'dashboard'))
 
 @login_required
 def wishlist(request):
-    products = request.user.favorites.all()
-    return render(request, 'store/wishlist.html', {'products': products})
+    # Everything on this page is a favorite, so skip the per-row EXISTS check.
+    products = (
+        Product.objects.filter(wishlist_entries__user=request.user)
+        .annotate(is_favorited=Value(True, output_field=BooleanField()))
+        .order_by('-wishlist_entries__added_at')
+    )
+    products = list(products)
+    return render(request, 'store/wishlist.html', {
+        'products': products,
+        'cards': render_cards(products, request.user),
+    })
+
+# --- VENDOR STOREFRONTS ---
+
+STOREFRONT_PAGE_SIZE = 24
+
+
+def storefront_summary(vendor):
+    """What a storefront shows above its shelf: listing count and categories."""
+    counts = dict(
+        Product.objects.for_vendor(vendor).filter(is_available=True)
+        .values_list('category').annotate(n=Count('pk')).order_by()
+    )
+    return {
+        'count': sum(counts.values()),
+        'categories': [(code, label, counts[code]) for code, label in CATEGORY_CHOICES if code in counts],
+    }
+
+
+def storefront(request, storefront_slug):
+    vendor = get_object_or_404(VendorProfile.objects.only('id', 'business_name', 'storefront_slug'), storefront_slug=storefront_slug)
+    summary = cached(f'storefront-summary:{vendor.pk}', lambda: storefront_summary(vendor), tags=[vendor_tag(vendor.pk)])
+
+    category = request.GET.get('category')
+    products = Product.objects.for_vendor(vendor).filter(is_available=True)
+    if category in dict(CATEGORY_CHOICES):
+        products = products.filter(category=category)
+    page = Paginator(
+        products.with_favorite_flag(request.user).order_by('-created_at'), STOREFRONT_PAGE_SIZE
+    ).get_page(request.GET.get('page'))
+
+    return render(request, 'store/storefront.html', {
+        'vendor': vendor,
+        'summary': summary,
+        'category': category,
+        'page': page,
+        'cards': render_cards(page.object_list, request.user),
+    })
+
+# --- LIVE STOCK (SERVER-SENT EVENTS) ---
+
+async def product_stock_stream(request):
+    """Stream stock changes for ``?products=1,2,3`` as server-sent events.
+
+    The stream starts with the current stock of every product, then sends
+    whatever ``store.events`` publishes. It needs an ASGI server: under WSGI
+    an endless stream would tie up a worker thread per viewer.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse('Live stock updates need the ASGI server.', status=503)
+    try:
+        product_ids = sorted({int(pk) for pk in request.GET.get('products', '').split(',') if pk.strip()})
+    except ValueError:
+        return HttpResponseBadRequest('products must be a comma-separated list of ids.')
+    if not product_ids or len(product_ids) > django_settings.STOCK_STREAM_MAX_PRODUCTS:
+        return HttpResponseBadRequest(
+            f'Watch between 1 and {django_settings.STOCK_STREAM_MAX_PRODUCTS} products.'
+        )
+
+    async def snapshot():
+        rows = Product.objects.filter(pk__in=product_ids).values_list('pk', 'quantity', 'is_available')
+        async for pk, quantity, is_available in rows:
+            yield stock_event(pk, quantity, is_available)
+
+    stream = StockEventStream(
+        stock_broker, product_ids, snapshot(), django_settings.STOCK_STREAM_HEARTBEAT_SECONDS
+    )
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 # --- DATABASE-BACKED CART ---
 
+def record_cart_change(action, ok):
+    metrics.CART_MUTATIONS.labels(action=action, outcome='ok' if ok else 'rejected').inc()
+
+
 @login_required
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    if not product.is_available or product.quantity == 0:
-        messages.warning(request, f"{product.name} is currently out of stock.")
-        return redirect('dashboard')
-
     cart, created = Cart.objects.get_or_create(user=request.user)
-    cart_item, item_created = CartItem.objects.get_or_create(cart=cart, product=product)
+    # Hold the units now so shoppers learn an item is gone before checkout.
+    item, ok, message = add_to_bag(cart, product)
+    record_cart_change('add', ok)
 
-    if item_created:
-        messages.success(request, f"Added {product.name} to your bag.")
-    elif cart_item.quantity < product.quantity:
-        cart_item.quantity += 1
-        cart_item.save()
+    if item is None:
+        messages.warning(request, message)
+        return redirect('dashboard')
+    if ok:
+        messages.success(request, message)
     else:
-        messages.warning(request, f"Only {product.quantity} units available for {product.name}.")
-
+        messages.warning(request, message)
     return redirect('cart')
 
 # store/views.py
@@ -209,8 +328,8 @@ def shop_view(request):
 def cart_view(request):
     cart, created = Cart.objects.get_or_create(user=request.user)
     store_settings = StoreSettings.load()
-    cart_items = cart.items.all()
-    total = cart.total_price
+    cart_items = list(cart.items.select_related('product', 'reservation'))
+    total = sum(item.get_total for item in cart_items)
 
     discount = Decimal('0.00')
     coupon_error = None
@@ -241,6 +360,7 @@ def cart_view(request):
             coupon_error = "Invalid Coupon Code"
 
     context = {
+        'checkout_key': uuid.uuid4().hex,
         'cart_items': cart_items,
         'total': total,
         'discount': discount,
@@ -253,55 +373,137 @@ def cart_view(request):
 
 
 
+CART_ACTIONS = {
+    'increment': increment_item,
+    'decrement': decrement_item,
+    'remove': remove_item,
+}
+
+
 @login_required
 def update_cart_quantity(request, item_id, action):
     # Try to get the item, but don't crash if it's not found
-    cart_item = CartItem.objects.filter(id=item_id, cart__user=request.user).first()
-    
+    cart_item = CartItem.objects.select_related('product').filter(id=item_id, cart__user=request.user).first()
+
     # If the item doesn't exist (already deleted), just go back to cart
     if not cart_item:
         return redirect('cart')
 
-    product = cart_item.product
-    
-    # 1. Handle explicit removal
     if request.GET.get('remove') == 'true':
-        cart_item.delete()
-        messages.success(request, f"Removed {product.name} from your bag.")
-    
-    # 2. Handle Increment
-    elif action == 'increment':
-        if cart_item.quantity < product.quantity:
-            cart_item.quantity += 1
-            cart_item.save()
-        else:
-            messages.warning(request, f"Only {product.quantity} units available.")
-            
-    # 3. Handle Decrement
-    elif action == 'decrement':
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-            cart_item.save()
-        else:
-            # If it was the last 1, delete it
-            cart_item.delete()
-            messages.success(request, f"Removed {product.name} from your bag.")
-            
+        action = 'remove'
+    change = CART_ACTIONS.get(action)
+    if change is not None:
+        item, ok, message = change(cart_item)
+        record_cart_change(action, ok)
+        if ok and message:
+            messages.success(request, message)
+        elif message:
+            messages.warning(request, message)
+
     return redirect('cart')
+
+
+# --- CART JSON ENDPOINTS ---
+# The +/- buttons and "add to bag" links post here from static/js/cart.js and
+# patch the page in place; without JavaScript they fall back to the views above.
+
+def cart_payload(cart, item, ok, message):
+    totals = cart_totals(cart)
+    payload = {
+        'ok': ok,
+        'message': message,
+        'cart': {**totals, 'subtotal': str(totals['subtotal'])},
+        'item': None,
+    }
+    if item is not None:
+        removed = item.pk is None
+        payload['item'] = {
+            'product_id': item.product_id,
+            'removed': removed,
+            'quantity': 0 if removed else item.quantity,
+            'line_total': str(Decimal('0.00') if removed else item.get_total),
+            # The most this line can grow to while everyone else's holds stand.
+            'max_quantity': 0 if removed else available_stock(item.product, exclude_cart_item=item),
+        }
+    return payload
+
+
+@login_required
+@require_POST
+def cart_add_json(request, product_id):
+    product = get_object_or_404(Product, id=product_id)
+    cart, created = Cart.objects.get_or_create(user=request.user)
+    item, ok, message = add_to_bag(cart, product)
+    record_cart_change('add', ok)
+    return JsonResponse(cart_payload(cart, item, ok, message), status=200 if ok else 409)
+
+
+@login_required
+@require_POST
+def cart_item_json(request, item_id, action):
+    change = CART_ACTIONS.get(action)
+    if change is None:
+        return JsonResponse({'ok': False, 'message': f"Unknown cart action '{action}'."}, status=400)
+    cart_item = get_object_or_404(
+        CartItem.objects.select_related('cart', 'product'), id=item_id, cart__user=request.user
+    )
+    item, ok, message = change(cart_item)
+    record_cart_change(action, ok)
+    return JsonResponse(cart_payload(cart_item.cart, item, ok, message), status=200 if ok else 409)
+
+
+def render_checkout_success(request, order, settings):
+    whatsapp_url = build_whatsapp_checkout_link(settings, order)
+
+    return render(request, 'store/success.html', {
+        'order': order,
+        'whatsapp_url': whatsapp_url,
+        'auto_open_whatsapp': bool(whatsapp_url and settings.auto_open_whatsapp_on_checkout),
+    })
+
+
+def placed_order(user, checkout_key):
+    """The order ``user`` already placed with ``checkout_key``, if any."""
+    if not checkout_key:
+        return None
+    return Order.objects.filter(checkout_key=checkout_key, user=user).first()
+
+
 @login_required
 def complete_purchase(request):
+    # Double-taps, retries and the payment redirect can all replay checkout.
+    # A key we've already seen returns its order without redoing any work.
+    checkout_key = (request.POST.get('checkout_key') or request.GET.get('checkout_key') or '')[:64] or None
+    placed = placed_order(request.user, checkout_key)
+    if placed:
+        return render_checkout_success(request, placed, StoreSettings.load())
+
     with transaction.atomic():
         cart = get_object_or_404(Cart.objects.select_for_update(), user=request.user)
-        cart_items = list(cart.items.select_related('product'))
+        # A duplicate that waited on the cart lock finds the bag emptied by
+        # the request that held it; look again now that we hold it.
+        placed = placed_order(request.user, checkout_key)
+        if placed:
+            return render_checkout_success(request, placed, StoreSettings.load())
+        cart_items = list(cart.items.select_related('product', 'reservation'))
 
         if not cart_items:
+            metrics.CHECKOUT_REJECTIONS.labels(reason='empty_bag').inc()
             messages.warning(request, "Your bag is empty.")
             return redirect('dashboard')
 
+        products = Product.objects.select_for_update().in_bulk([item.product_id for item in cart_items])
         order_total = Decimal('0.00')
         for item in cart_items:
-            product = Product.objects.select_for_update().get(pk=item.product_id)
-            if not product.is_available or product.quantity < item.quantity:
+            product = products[item.product_id]
+            if holds_cover(item):
+                # The bag's live hold already set these units aside.
+                enough = product.is_available and product.quantity >= item.quantity
+            else:
+                # Expired or missing hold: re-check against everyone else's holds.
+                enough = product.is_available and available_stock(product, exclude_cart_item=item) >= item.quantity
+            if not enough:
+                metrics.CHECKOUT_REJECTIONS.labels(reason='out_of_stock').inc()
                 messages.error(
                     request,
                     f"{product.name} no longer has enough stock. Please update your bag.",
@@ -311,26 +513,40 @@ def complete_purchase(request):
 
         store_settings = StoreSettings.load()
         if cart.fulfillment_method == 'PICKUP' and not store_settings.allow_pickup:
+            metrics.CHECKOUT_REJECTIONS.labels(reason='fulfillment_unavailable').inc()
             messages.error(request, 'Pickup is currently unavailable. Please choose another logistics option.')
             return redirect('cart')
         if cart.fulfillment_method == 'WAYBILL' and not store_settings.allow_waybill_delivery:
+            metrics.CHECKOUT_REJECTIONS.labels(reason='fulfillment_unavailable').inc()
             messages.error(request, 'Waybill delivery is currently unavailable. Please choose another logistics option.')
             return redirect('cart')
 
-        order = Order.objects.create(
-            user=request.user,
-            order_id=str(uuid.uuid4())[:12].upper(),
-            total_paid=order_total,
-            is_completed=True,
-            payment_date=timezone.now(),
-            fulfillment_method=cart.fulfillment_method,
-            logistics_note=cart.logistics_note,
-            receipt_channel_used=store_settings.receipt_channel,
-            pre_purchase_instruction_snapshot=store_settings.pre_purchase_instruction,
-        )
-
+        vendor_ids = {product.vendor_id for product in products.values()}
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(
+                    user=request.user,
+                    vendor_id=vendor_ids.pop() if len(vendor_ids) == 1 else None,
+                    order_id=new_ulid(),
+                    total_paid=order_total,
+                    is_completed=True,
+                    payment_date=timezone.now(),
+                    fulfillment_method=cart.fulfillment_method,
+                    logistics_note=cart.logistics_note,
+                    receipt_channel_used=store_settings.receipt_channel,
+                    pre_purchase_instruction_snapshot=store_settings.pre_purchase_instruction,
+                    checkout_key=checkout_key,
+                )
+        except IntegrityError:
+            if checkout_key is None:
+                raise
+            # A concurrent submission with the same key placed the order first.
+            placed = get_object_or_404(Order, checkout_key=checkout_key, user=request.user)
+            return render_checkout_success(request, placed, store_settings)
+
+        movements = []
         for item in cart_items:
-            product = Product.objects.select_for_update().get(pk=item.product_id)
+            product = products[item.product_id]
             OrderItem.objects.create(
                 order=order,
                 product=product,
@@ -339,10 +555,20 @@ def complete_purchase(request):
             )
             product.quantity -= item.quantity
             product.is_available = product.quantity > 0
-            product.save(update_fields=['quantity', 'is_available'])
-
+            # Same UPDATE as the stock change. The F() stays on the instance,
+            # which isn't saved again.
+            product.units_sold = F('units_sold') + item.quantity
+            product.save(update_fields=['quantity', 'is_available', 'units_sold'])
+            movements.append(InventoryMovement(product=product, kind='SALE', change=-item.quantity, order=order))
+        InventoryMovement.objects.bulk_create(movements)
+        invalidate_models(InventoryMovement)
+
+        # Deleting the bag items releases their holds along with them.
         cart.items.all().delete()
 
+    metrics.ORDERS_PLACED.inc()
+    metrics.ORDER_REVENUE.inc(float(order.total_paid))
+
     # SEND RECEIPT BASED ON OWNER CONFIG
     settings = StoreSettings.load()
     if settings.receipt_channel == 'EMAIL':
@@ -355,34 +581,60 @@ def complete_purchase(request):
             email = EmailMessage(mail_subject, html_message, to=[request.user.email])
             email.content_subtype = "html"
             email.send()
-        except Exception as e:
-            print(f"Email failed: {e}")
+            metrics.EMAILS.labels(kind='receipt', outcome='sent').inc()
+        except Exception:
+            metrics.EMAILS.labels(kind='receipt', outcome='failed').inc()
+            email_logger.exception('Receipt email for order %s failed', order.order_id)
     elif settings.receipt_channel == 'DM':
         messages.info(request, 'Receipt delivery is configured for direct message by the store owner.')
     elif settings.receipt_channel == 'SOCIAL_INBOX':
         messages.info(request, 'Receipt delivery is configured for social media inbox by the store owner.')
 
-    whatsapp_url = build_whatsapp_checkout_link(settings, order)
-
-    return render(request, 'store/success.html', {
-        'order': order,
-        'whatsapp_url': whatsapp_url,
-        'auto_open_whatsapp': bool(whatsapp_url and settings.auto_open_whatsapp_on_checkout),
-    })
+    return render_checkout_success(request, order, settings)
 
 
 
 # --- ORDER HISTORY & INVOICE ---
 
+ORDER_HISTORY_PAGE_SIZE = 20
+
+
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user, is_completed=True).order_by('-created_at')
-    total_spent = sum(order.total_paid for order in orders)
-    return render(request, 'store/order_history.html', {'orders': orders, 'total_spent': total_spent})
+    paid = Order.objects.filter(user=request.user, is_completed=True)
+    archived = ArchivedOrder.objects.filter(user=request.user)
+    # order_id sorts by creation time, so it is the page cursor: each page
+    # seeks straight to its place in the order_user_recent index.
+    before = request.GET.get('before')
+    archive = archived.aggregate(total=Sum('total_paid'), newest=Max('order_id'))
+    # The two tables overlap in time (an old order paid after the last
+    # archive run stays hot), so page both on the same cursor and merge.
+    orders = []
+    for source in [paid] + ([archived] if archive['newest'] else []):
+        page = source.order_by('-order_id')
+        if before:
+            page = page.filter(order_id__lt=before)
+        orders += page[:ORDER_HISTORY_PAGE_SIZE + 1]
+    orders.sort(key=lambda order: order.order_id, reverse=True)
+
+    next_cursor = orders[ORDER_HISTORY_PAGE_SIZE - 1].order_id if len(orders) > ORDER_HISTORY_PAGE_SIZE else None
+    orders = orders[:ORDER_HISTORY_PAGE_SIZE]
+    for model in (Order, ArchivedOrder):
+        prefetch_related_objects([order for order in orders if isinstance(order, model)], 'items__product')
+    total_spent = (paid.aggregate(total=Sum('total_paid'))['total'] or Decimal('0.00')) + (archive['total'] or Decimal('0.00'))
+    return render(request, 'store/order_history.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'total_spent': total_spent,
+    })
 
 @login_required
 def download_invoice(request, order_id):
-    order = get_object_or_404(Order, order_id=order_id, user=request.user)
+    # Links and receipts sent before the switch to ULIDs carry the old
+    # reference, and old orders may have moved to the archive.
+    order = find_order(request.user, order_id)
+    if order is None:
+        raise Http404('No such order.')
     return render(request, 'store/invoice.html', {'order': order})
 
 @login_required
@@ -408,12 +660,116 @@ def profile_settings(request):
     return render(request, 'store/profile.html')
 # --- OWNER STUDIO VIEWS ---
 
+# Sort keys offered by the studio inventory table; each maps onto an index.
+INVENTORY_SORTS = {
+    'newest': ('Newest', ('-created_at', '-id')),
+    'oldest': ('Oldest', ('created_at', 'id')),
+    'name': ('Name A-Z', ('name', 'id')),
+    'price_low': ('Price: low to high', ('price', 'id')),
+    'price_high': ('Price: high to low', ('-price', '-id')),
+    'stock_low': ('Stock: lowest first', ('quantity', 'id')),
+    'trending': ('Trending', ('-trending_score', '-id')),
+    'most_wanted': ('Most favorited', ('-favorites_count', '-id')),
+    'best_selling': ('Best selling', ('-units_sold', '-id')),
+}
+INVENTORY_PAGE_SIZE = 25
+LOW_STOCK_THRESHOLD = 2
+
+
+def inventory_context(request, vendor):
+    """One page of ``vendor``'s studio inventory, filtered and sorted from the query string."""
+    query = (request.GET.get('q') or '').strip()
+    sort = request.GET.get('sort') if request.GET.get('sort') in INVENTORY_SORTS else 'newest'
+    low_stock = request.GET.get('low_stock') == '1'
+
+    # The table never shows descriptions or images, so don't load them.
+    products = Product.objects.for_vendor(vendor).only('id', 'name', 'category', 'size', 'price', 'quantity', 'is_available')
+    if query:
+        products = products.filter(name__icontains=query)
+    if low_stock:
+        products = products.filter(quantity__lte=LOW_STOCK_THRESHOLD)
+    page = Paginator(products.order_by(*INVENTORY_SORTS[sort][1]), INVENTORY_PAGE_SIZE).get_page(request.GET.get('page'))
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    return {
+        'inventory_page': page,
+        'inventory_query': query,
+        'inventory_sort': sort,
+        'inventory_sorts': [(key, label) for key, (label, ordering) in INVENTORY_SORTS.items()],
+        'inventory_low_stock': low_stock,
+        'inventory_params': params.urlencode(),
+        'low_stock_threshold': LOW_STOCK_THRESHOLD,
+        'bulk_product_actions': bulk.PRODUCT_ACTIONS,
+        'category_choices': CATEGORY_CHOICES,
+    }
+
+
+@user_passes_test(is_owner)
+def owner_inventory(request):
+    """The studio inventory panel on its own, for in-place search, sorting and paging."""
+    return render(request, 'store/partials/owner_inventory.html', inventory_context(request, studio_vendor(request.user)))
+
+
+def paid_sales(vendor, **created):
+    """``(orders, total)`` for paid orders, narrowed by ``created_at`` lookups such as ``created_at__gte``.
+
+    A vendor's figures are summed from its own lines: a cart mixing vendors
+    makes one order with no ``Order.vendor``, and each vendor sold a part of it.
+    """
+    if vendor is None:
+        row = Order.objects.filter(is_completed=True, **created).aggregate(orders=Count('pk'), total=Sum('total_paid'))
+    else:
+        row = OrderItem.objects.filter(
+            product__vendor=vendor, order__is_completed=True, **{f'order__{lookup}': value for lookup, value in created.items()}
+        ).aggregate(orders=Count('order', distinct=True), total=Sum(LINE_TOTAL))
+    return row['orders'], row['total'] or Decimal('0.00')
+
+
+def sales_analytics(vendor=None):
+    """The studio dashboard's sales figures; cached, as every one of them scans the orders."""
+    with read_from_replica():
+        paid_count, paid_total = paid_sales(vendor)
+        window_count, window_total = paid_sales(vendor, created_at__gte=timezone.now() - timedelta(days=30))
+        if vendor is None:
+            pending_count = Order.objects.filter(is_completed=False).count()
+        else:
+            pending_count = OrderItem.objects.filter(
+                product__vendor=vendor, order__is_completed=False
+            ).aggregate(orders=Count('order', distinct=True))['orders']
+        # Archived orders only survive as monthly rollups; add them back in.
+        # Rows without a vendor hold the platform's totals, the rest each vendor's share.
+        rollups = SalesRollup.objects.filter(vendor=vendor)
+        archived = rollups.aggregate(orders=Sum('orders'), total=Sum('total_paid'))
+        archived_months = dict(rollups.values_list('month').annotate(total=Sum('total_paid')).order_by())
+
+        monthly_sales = []
+        for month_offset in range(5, -1, -1):
+            target = timezone.now().replace(day=1) - timedelta(days=month_offset * 30)
+            month_start = target.replace(day=1)
+            next_month = (month_start + timedelta(days=32)).replace(day=1)
+            month_count, month_total = paid_sales(vendor, created_at__gte=month_start, created_at__lt=next_month)
+            month_total += archived_months.get(month_start.date(), Decimal('0.00'))
+            monthly_sales.append({'month': month_start.strftime('%b %Y'), 'total': month_total})
+
+        return {
+            'total_sales': paid_total + (archived['total'] or Decimal('0.00')),
+            'paid_orders_count': paid_count + (archived['orders'] or 0),
+            'pending_orders_count': pending_count,
+            'sales_window_total': window_total,
+            'sales_window_orders': window_count,
+            'monthly_sales': monthly_sales,
+            'weekly_units_sold': units_sold_by_week(vendor=vendor),
+        }
+
 @user_passes_test(is_owner)
 def owner_dashboard(request):
-    products = Product.objects.all().order_by('-created_at')
+    vendor = studio_vendor(request.user)
+    products = Product.objects.for_vendor(vendor)
     settings = StoreSettings.load()
 
-    if request.method == 'POST' and 'update_settings' in request.POST:
+    # Branding is platform-wide, so vendors can't change it.
+    if request.method == 'POST' and 'update_settings' in request.POST and vendor is None:
         settings_form = StoreSettingsForm(request.POST, request.FILES, instance=settings)
         if settings_form.is_valid():
             try:
@@ -431,30 +787,19 @@ def owner_dashboard(request):
         settings_form = StoreSettingsForm(instance=settings)
 
     active_products_count = products.filter(is_available=True).count()
-    low_stock_count = products.filter(quantity__lte=2).count()
+    low_stock_count = products.filter(quantity__lte=LOW_STOCK_THRESHOLD).count()
 
     try:
-        recent_orders = Order.objects.select_related('user').prefetch_related('items').order_by('-created_at')[:10]
-        # Force query evaluation here so schema issues are caught by this guard
-        # instead of bubbling up during template rendering.
-        list(recent_orders)
-        paid_orders = Order.objects.filter(is_completed=True)
-        total_sales = paid_orders.aggregate(total=Sum('total_paid'))['total'] or Decimal('0.00')
-        paid_orders_count = paid_orders.count()
-        pending_orders_count = Order.objects.filter(is_completed=False).count()
-
-        sales_window_start = timezone.now() - timedelta(days=30)
-        sales_window = paid_orders.filter(created_at__gte=sales_window_start)
-        sales_window_total = sales_window.aggregate(total=Sum('total_paid'))['total'] or Decimal('0.00')
-        sales_window_orders = sales_window.count()
-
-        monthly_sales = []
-        for month_offset in range(5, -1, -1):
-            target = timezone.now().replace(day=1) - timedelta(days=month_offset * 30)
-            month_start = target.replace(day=1)
-            next_month = (month_start + timedelta(days=32)).replace(day=1)
-            month_total = paid_orders.filter(created_at__gte=month_start, created_at__lt=next_month).aggregate(total=Sum('total_paid'))['total'] or Decimal('0.00')
-            monthly_sales.append({'month': month_start.strftime('%b %Y'), 'total': month_total})
+        # Analytics tolerate replica lag, so keep them off the primary.
+        with read_from_replica():
+            recent_orders = Order.objects.for_vendor(vendor).select_related('user').prefetch_related('items').order_by('-created_at')[:10]
+            # Force query evaluation here so schema issues are caught by this guard
+            # instead of bubbling up during template rendering.
+            list(recent_orders)
+        if vendor is None:
+            analytics = cached('owner-analytics', sales_analytics, tags=[model_tag(Order), model_tag(InventoryMovement)])
+        else:
+            analytics = cached(f'owner-analytics:{vendor.pk}', lambda: sales_analytics(vendor), tags=[vendor_tag(vendor.pk)])
     except (OperationalError, ProgrammingError):
         messages.warning(
             request,
@@ -462,32 +807,39 @@ def owner_dashboard(request):
             'Run "python manage.py migrate" and refresh this page.'
         )
         recent_orders = Order.objects.none()
-        total_sales = Decimal('0.00')
-        paid_orders_count = 0
-        pending_orders_count = 0
-        sales_window_total = Decimal('0.00')
-        sales_window_orders = 0
-        monthly_sales = []
+        analytics = {
+            'total_sales': Decimal('0.00'),
+            'paid_orders_count': 0,
+            'pending_orders_count': 0,
+            'sales_window_total': Decimal('0.00'),
+            'sales_window_orders': 0,
+            'monthly_sales': [],
+            'weekly_units_sold': [],
+        }
+
+    undo_window_start = timezone.now() - timedelta(seconds=django_settings.BULK_UNDO_WINDOW_SECONDS)
+    # Snapshots can be large and the list only shows what happened.
+    undoable_operations = studio_operations(request.user, vendor).filter(
+        undone_at__isnull=True, created_at__gt=undo_window_start
+    ).only('id', 'summary', 'created_at', 'undone_at').order_by('-created_at')[:5]
 
     return render(request, 'store/owner_dashboard.html', {
-        'products': products,
+        **inventory_context(request, vendor),
+        'studio_vendor': vendor,
+        'bulk_order_actions': bulk.ORDER_ACTIONS,
+        'undoable_operations': undoable_operations,
+        **analytics,
         'recent_orders': recent_orders,
-        'total_sales': total_sales,
         'settings_form': settings_form,
         'settings': settings,
-        'paid_orders_count': paid_orders_count,
-        'pending_orders_count': pending_orders_count,
         'active_products_count': active_products_count,
         'low_stock_count': low_stock_count,
-        'sales_window_total': sales_window_total,
-        'sales_window_orders': sales_window_orders,
-        'monthly_sales': monthly_sales,
     })
 
 @user_passes_test(is_owner)
 @require_POST
 def owner_toggle_order_status(request, order_id):
-    order = get_object_or_404(Order, id=order_id)
+    order = get_object_or_404(Order.objects.for_vendor(studio_vendor(request.user)), id=order_id)
     order.is_completed = not order.is_completed
     if order.is_completed:
         order.payment_date = timezone.now()
@@ -495,12 +847,88 @@ def owner_toggle_order_status(request, order_id):
     messages.success(request, f"Order #{order.order_id} status updated.")
     return redirect('owner_dashboard')
 
+# --- OWNER BULK ACTIONS ---
+
+def selected_ids(request, queryset):
+    """The ticked ids that are in ``queryset``, i.e. that this studio user may change."""
+    ids = [int(value) for value in request.POST.getlist('ids') if value.isdigit()]
+    return list(queryset.filter(pk__in=ids).values_list('pk', flat=True))
+
+
+def studio_operations(user, vendor):
+    """Bulk changes the user may undo: all of them, or a vendor's own."""
+    operations = BulkOperation.objects.all()
+    return operations if vendor is None else operations.filter(user=user)
+
+
+@user_passes_test(is_owner)
+@require_POST
+def owner_bulk_products(request):
+    """Apply one action to every ticked product; with ``preview`` set, only count them."""
+    ids = selected_ids(request, Product.objects.for_vendor(studio_vendor(request.user)))
+    action = request.POST.get('action')
+    preview = 'preview' in request.POST
+    # Categories come from their own dropdown; every other action reads ``value``.
+    raw_value = request.POST.get('category') if action == 'set_category' else request.POST.get('value')
+    try:
+        value = bulk.parse_value(action, raw_value)
+    except bulk.BulkActionError as exc:
+        if preview:
+            return JsonResponse({'error': str(exc)}, status=400)
+        messages.error(request, str(exc))
+        return redirect('owner_dashboard')
+
+    if preview:
+        return JsonResponse({'count': bulk.product_targets(action, ids).count()})
+
+    operation = bulk.apply_product_action(request.user, action, ids, value)
+    if operation is None:
+        messages.info(request, 'None of the selected pieces needed that change.')
+    else:
+        messages.success(request, f"{operation.summary}. You can undo this for a few minutes.")
+    return redirect('owner_dashboard')
+
+
+@user_passes_test(is_owner)
+@require_POST
+def owner_bulk_orders(request):
+    ids = selected_ids(request, Order.objects.for_vendor(studio_vendor(request.user)))
+    action = request.POST.get('action')
+    if 'preview' in request.POST:
+        if action not in bulk.ORDER_ACTIONS:
+            return JsonResponse({'error': 'Choose a bulk action.'}, status=400)
+        return JsonResponse({'count': bulk.order_targets(action, ids).count()})
+
+    try:
+        operation = bulk.apply_order_action(request.user, action, ids)
+    except bulk.BulkActionError as exc:
+        messages.error(request, str(exc))
+        return redirect('owner_dashboard')
+    if operation is None:
+        messages.info(request, 'None of the selected orders needed that change.')
+    else:
+        messages.success(request, f"{operation.summary}. You can undo this for a few minutes.")
+    return redirect('owner_dashboard')
+
+
+@user_passes_test(is_owner)
+@require_POST
+def owner_undo_bulk(request, operation_id):
+    operation = get_object_or_404(studio_operations(request.user, studio_vendor(request.user)), id=operation_id)
+    try:
+        bulk.undo_operation(operation)
+    except bulk.BulkActionError as exc:
+        messages.error(request, str(exc))
+    else:
+        messages.success(request, f"Undid: {operation.summary}.")
+    return redirect('owner_dashboard')
+
 @user_passes_test(is_owner)
 @require_POST
 def quick_edit_product(request):
     """Handles the high-speed modal updates from the dashboard."""
     product_id = request.POST.get('product_id')
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(Product.objects.for_vendor(studio_vendor(request.user)), id=product_id)
     
     # Update price and availability directly
     product.price = request.POST.get('price')
@@ -514,7 +942,9 @@ def add_product(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            product = form.save(commit=False)
+            product.vendor = studio_vendor(request.user)
+            save_product(product, note='Listed in the studio')
             return redirect('owner_dashboard')
     else:
         form = ProductForm()
@@ -523,11 +953,11 @@ def add_product(request):
 @user_passes_test(is_owner)
 def edit_product(request, product_id):
     """Full edit page for detailed changes."""
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(Product.objects.for_vendor(studio_vendor(request.user)), id=product_id)
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
-            form.save()
+            save_product(form.save(commit=False), note='Edited in the studio')
             return redirect('owner_dashboard')
     else:
         form = ProductForm(instance=product)
@@ -535,17 +965,46 @@ def edit_product(request, product_id):
 
 @user_passes_test(is_owner)
 def delete_product(request, product_id):
-    get_object_or_404(Product, id=product_id).delete()
+    get_object_or_404(Product.objects.for_vendor(studio_vendor(request.user)), id=product_id).delete()
     return redirect('owner_dashboard')
 
 @user_passes_test(is_owner)
+@require_POST
 def toggle_availability(request, product_id):
     """Legacy toggle logic (kept for simple table buttons)."""
-    product = get_object_or_404(Product, id=product_id)
-    product.is_available = not product.is_available
-    product.save()
+    with transaction.atomic():
+        # Locked on the primary, and only the flag written back, so a stale
+        # copy of the row can never put sold stock back.
+        product = get_object_or_404(
+            Product.objects.select_for_update().for_vendor(studio_vendor(request.user)), id=product_id,
+        )
+        product.is_available = not product.is_available
+        product.save(update_fields=['is_available'])
     return redirect('owner_dashboard')
 
+
+# --- METRICS ---
+
+def metrics_token_valid(request):
+    token = django_settings.METRICS_TOKEN
+    sent = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode())
+
+
+def metrics_view(request):
+    """Prometheus scrape target: platform staff, or a scraper with the bearer token.
+
+    Vendors are staff too, but the figures cover the whole platform, so they
+    are left out. No login redirect: a scraper should see a plain 403.
+    """
+    user = request.user
+    if not metrics_token_valid(request) and not (
+        user.is_authenticated and is_owner(user) and studio_vendor(user) is None
+    ):
+        return HttpResponseForbidden('Metrics are for platform staff only.')
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 def signup(request):
     if request.method == 'POST':
         form = UserCreationForm(request.POST)